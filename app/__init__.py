@@ -63,7 +63,6 @@ from app.utils import (
     PathHolder,
     update_path,
     FrameCount,
-    setup_publisher,
     get_resource,
     check_resource,
     read_data,
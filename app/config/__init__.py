@@ -2,15 +2,42 @@
 
 from app.config.general import (
     PROCESS_FRAMES,
+    WINDOW_SLIDE,
     VIDEO_FOLDER,
     SIM_WEIGHT,
     LATENCY_WEIGHT,
+    REWARD_BATCH_SIZE,
+    REWARD_BATCH_TIMEOUT,
+    REWARD_WORKERS,
+    REWARD_THREADS,
+    REWARD_PREFETCH,
+    WRITE_BATCH_SIZE,
+    WRITE_INTERVAL,
+    WRITE_RETRIES,
+    FRAME_CODEC,
+    PNG_COMPRESSION,
+    JPEG_QUALITY,
+    FRAME_RING,
+    FRAME_RING_BUDGET,
+    FRAME_RING_SLOTS,
+    FRAME_RING_SLOT_SIZE,
+    FRAME_RING_MEMORY,
+    DEDUP_SIZE,
+    BLOB_CACHE_SIZE,
+    SORT_BATCH_SIZE,
+    SORT_BATCH_TIMEOUT,
+    POLL_BATCH_SIZE,
+    POLL_BATCH_TIMEOUT,
+    JOIN_SIZE,
+    JOIN_TTL,
+    JOIN_AUDIT,
 )
 
 
 from app.config.general import (
     Decision,
     Folder,
+    FrameCodec,
     Files
 )
 
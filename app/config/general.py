@@ -6,7 +6,11 @@ from enum import (
 
 # The number of frames to process before
 # a decision is made.
-PROCESS_FRAMES = os.getenv('FRAMES', 60)
+PROCESS_FRAMES = int(os.getenv('FRAMES', 60))
+
+# The number of frames between decisions. Windows of
+# PROCESS_FRAMES overlap if this is smaller.
+WINDOW_SLIDE = int(os.getenv('WINDOW_SLIDE', PROCESS_FRAMES))
 
 # Identifies the base folder, structured
 # as per the demonstration above.
@@ -20,6 +24,113 @@ SIM_WEIGHT = os.getenv('S_WEIGHT', 1.0)
 # in the reward model.
 LATENCY_WEIGHT = os.getenv('L_WEIGHT', 0.001)
 
+# The maximum number of frames scored together
+# in a single reward calculation pass.
+REWARD_BATCH_SIZE = int(os.getenv('REWARD_BATCH', 1))
+
+# The maximum time (in milliseconds) to wait for
+# a reward batch to fill before it is scored.
+REWARD_BATCH_TIMEOUT = int(os.getenv('REWARD_BATCH_MS', 50))
+
+# The number of reward worker processes
+# sharing the reward queue.
+REWARD_WORKERS = int(os.getenv('REWARD_WORKERS', 1))
+
+# The number of threads each reward worker may use.
+# Defaults to an equal share of the cores.
+REWARD_THREADS = int(os.getenv(
+    'REWARD_THREADS',
+    max(1, (os.cpu_count() or 1) // REWARD_WORKERS)
+))
+
+# The number of unacknowledged messages the broker
+# sends to each reward worker.
+REWARD_PREFETCH = int(os.getenv('REWARD_PREFETCH', 2 * REWARD_BATCH_SIZE))
+
+# The number of buffered results that triggers
+# a write to the database.
+WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH', 64))
+
+# The maximum time (in milliseconds) results
+# are buffered before they are written.
+WRITE_INTERVAL = int(os.getenv('WRITE_INTERVAL_MS', 200))
+
+# The number of times a failed write-behind flush is retried,
+# before its documents are dropped.
+WRITE_RETRIES = int(os.getenv('WRITE_RETRIES', 3))
+
+# The codec the emitters encode frames with: 'raw', 'png',
+# 'webp' (lossless), 'jpeg' or 'shm' (same host only).
+FRAME_CODEC = os.getenv('FRAME_CODEC', 'png')
+
+# The PNG compression level (0 to 9), trading
+# frame size for encoding time.
+PNG_COMPRESSION = int(os.getenv('PNG_COMPRESSION', 1))
+
+# The JPEG quality (0 to 100), trading
+# frame size for fidelity.
+JPEG_QUALITY = int(os.getenv('JPEG_QUALITY', 90))
+
+# The name prefix of the shared memory frame rings,
+# used by the 'shm' frame codec.
+FRAME_RING = os.getenv('FRAME_RING', 'kurf_frames')
+
+# The time (in milliseconds) a frame may take to reach the
+# reward calculator, through the sorter, MongoDB and the poller.
+FRAME_RING_BUDGET = int(os.getenv('FRAME_RING_BUDGET_MS', 10000))
+
+# The number of slots in each frame ring. Frames must be consumed
+# before the ring wraps around to their slot, so by default the
+# ring holds every frame emitted (one per 10 ms) within the budget.
+FRAME_RING_SLOTS = int(os.getenv('FRAME_RING_SLOTS', FRAME_RING_BUDGET // 10))
+
+# The size (in bytes) of each frame ring slot. Slots are sized
+# to the first frame written if this is 0, or smaller than it.
+FRAME_RING_SLOT_SIZE = int(os.getenv('FRAME_RING_SLOT_SIZE', 0))
+
+# The maximum size (in megabytes) of each frame ring, which caps
+# its slots. Containers share 64 MB of /dev/shm by default,
+# between both emitters; raise this with '--shm-size'.
+FRAME_RING_MEMORY = int(os.getenv('FRAME_RING_MB', 24))
+
+# The number of distinct frames each emitter remembers sending,
+# and only sends by digest thereafter. Deduplication is disabled
+# by default (0); set this, such as to 4096, on every stage to
+# store frames once in the blob store, referenced by digest.
+DEDUP_SIZE = int(os.getenv('DEDUP_SIZE', 0))
+
+# The maximum size (in megabytes) of the frames each
+# consumer caches to resolve deduplicated frames.
+BLOB_CACHE_SIZE = int(os.getenv('BLOB_CACHE_MB', 256))
+
+# The maximum number of partial frames the sorter
+# upserts together, in a single bulk write.
+SORT_BATCH_SIZE = int(os.getenv('SORT_BATCH', 256))
+
+# The maximum time (in milliseconds) to wait for
+# a sorter batch to fill before it is written.
+SORT_BATCH_TIMEOUT = int(os.getenv('SORT_BATCH_MS', 20))
+
+# The maximum number of complete frames the poller
+# receives from the change stream together.
+POLL_BATCH_SIZE = int(os.getenv('POLL_BATCH', 64))
+
+# The maximum time (in milliseconds) to wait for
+# a poller batch to fill before it is published.
+POLL_BATCH_TIMEOUT = int(os.getenv('POLL_BATCH_MS', 50))
+
+# The maximum number of partial frames the
+# stream join holds, awaiting their other parts.
+JOIN_SIZE = int(os.getenv('JOIN_SIZE', 4096))
+
+# The maximum time (in milliseconds) a partial
+# frame waits for its other parts.
+JOIN_TTL = int(os.getenv('JOIN_TTL_MS', 5000))
+
+# If the stream join also writes the joined
+# frames to the 'Frames' collection, for audit.
+JOIN_AUDIT = bool(int(os.getenv('JOIN_AUDIT', 0)))
+
 
 class Decision(IntEnum):
     """ Defines stream decision """
@@ -33,6 +144,15 @@ class Folder(str, Enum):
     LOCAL = 'local'
 
 
+class FrameCodec(str, Enum):
+    """ Defines the frame codecs """
+    RAW = 'raw'
+    PNG = 'png'
+    WEBP = 'webp'
+    JPEG = 'jpeg'
+    SHM = 'shm'
+
+
 class Files(str, Enum):
     """ Defines the file structure """
     REFERENCE = 'reference'
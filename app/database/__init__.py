@@ -1,8 +1,10 @@
 # flake8: noqa
 
 from app.database.models import (
+    HotQuery,
     MongoModel,
     Frames,
+    Blobs,
     Results,
 )
 
@@ -19,8 +21,22 @@ from app.database.config import (
 from app.database.config import (
     URL,
     DATABASE,
+    RESUME_COLLECTION,
+    BLOB_STORE,
+    BLOB_FOLDER,
+    BLOB_BUCKET,
+    BLOB_TTL,
 )
 
 from app.database.connection import (
     MongoDB
+)
+
+from app.database.blobs import (
+    BlobStore,
+    MongoBlobStore,
+    FileBlobStore,
+    GridFSBlobStore,
+    BLOB_STORES,
+    get_blob_store,
 )
\ No newline at end of file
@@ -0,0 +1,319 @@
+import os
+import tempfile
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from datetime import (
+    datetime,
+    timezone,
+)
+from gridfs import GridFS
+from gridfs.errors import (
+    FileExists,
+    NoFile,
+)
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+)
+from app.database import (
+    MongoDB,
+    Blobs,
+    field,
+    BLOB_FOLDER,
+    BLOB_BUCKET,
+)
+
+
+class BlobStore(ABC):
+    """
+    Content addressed store of encoded frames, by their digest.
+    Frames are stored once, and never change. Each frame records
+    when it was last stored or referenced, so frames that are no
+    longer referenced can be expired.
+    """
+
+    @abstractmethod
+    def get(self, digest: bytes) -> Optional[bytes]:
+        """
+        Retrieves a frame.
+
+        Args:
+            digest (bytes): The digest of the frame.
+
+        Returns:
+            Optional[bytes]: The encoded frame, if it was stored.
+        """
+
+    @abstractmethod
+    def put(self, digest: bytes, blob: bytes) -> None:
+        """
+        Stores a frame, unless it is already stored, in which
+        case it is marked as referenced now.
+
+        Args:
+            digest (bytes): The digest of the frame.
+            blob (bytes): The encoded frame.
+        """
+
+    def put_many(self, blobs: Dict[bytes, bytes]) -> None:
+        """
+        Stores several frames.
+
+        Args:
+            blobs (Dict[bytes, bytes]): The encoded frames, by digest.
+        """
+        for digest, blob in blobs.items():
+            self.put(digest, blob)
+
+    @abstractmethod
+    def touch_many(self, digests: Iterable[bytes]) -> None:
+        """
+        Marks stored frames as referenced now.
+
+        Args:
+            digests (Iterable[bytes]): The digests of the frames.
+        """
+
+    @abstractmethod
+    def expire(self, before: float) -> int:
+        """
+        Deletes the frames neither stored nor referenced since
+        the given time.
+
+        Args:
+            before (float): The time (since the epoch, in seconds)
+            frames must have been stored or referenced since.
+
+        Returns:
+            int: The number of frames deleted.
+        """
+
+
+class MongoBlobStore(BlobStore):
+    """ Stores frames as documents of the 'Blobs' collection """
+
+    def __init__(self, mongo_client: MongoDB) -> None:
+        """
+        Initialise the store.
+
+        Args:
+            mongo_client (MongoDB): The MongoDB client.
+        """
+        self._mongo_client = mongo_client
+
+    def get(self, digest: bytes) -> Optional[bytes]:
+        """ Retrieves a frame from the 'Blobs' collection """
+        document = self._mongo_client.find_document(
+            Blobs,
+            {field(Blobs, 'digest'): digest}
+        )
+        return document.blob if document else None
+
+    def put(self, digest: bytes, blob: bytes) -> None:
+        """ Stores a frame in the 'Blobs' collection """
+        self.put_many({digest: blob})
+
+    def put_many(self, blobs: Dict[bytes, bytes]) -> None:
+        """ Stores several frames, with a single bulk write """
+        now = datetime.now(timezone.utc)
+        self._mongo_client.upsert_documents(
+            Blobs,
+            [
+                (
+                    {field(Blobs, 'digest'): digest},
+                    {
+                        '$set': {field(Blobs, 'stored_at'): now},
+                        '$setOnInsert': {field(Blobs, 'blob'): blob}
+                    }
+                )
+                for digest, blob in blobs.items()
+            ],
+            ordered=False
+        )
+
+    def touch_many(self, digests: Iterable[bytes]) -> None:
+        """ Marks frames as referenced, with a single update """
+        digests = list(digests)
+        if not digests:
+            return
+        self._mongo_client.get_collection(Blobs).update_many(
+            {field(Blobs, 'digest'): {'$in': digests}},
+            {'$set': {field(Blobs, 'stored_at'): datetime.now(timezone.utc)}}
+        )
+
+    def expire(self, before: float) -> int:
+        """ Deletes the frames, over the 'stored_at' index """
+        result = self._mongo_client.get_collection(Blobs).delete_many({
+            field(Blobs, 'stored_at'): {
+                '$lt': datetime.fromtimestamp(before, timezone.utc)
+            }
+        })
+        return result.deleted_count
+
+
+class FileBlobStore(BlobStore):
+    """
+    Stores frames as files, named by their digest, in a folder
+    shared by the stages. Files are written to a temporary name
+    then renamed, so readers never see a partial frame. A frame's
+    modification time records when it was last referenced.
+    """
+
+    def __init__(self, folder: str = BLOB_FOLDER) -> None:
+        """
+        Initialise the store.
+
+        Args:
+            folder (str, optional): The folder holding the frames.
+        """
+        self.folder = folder
+
+    def _path(self, digest: bytes) -> str:
+        """ The path of a frame, fanned out by its first byte """
+        name = digest.hex()
+        return os.path.join(self.folder, name[:2], name)
+
+    def get(self, digest: bytes) -> Optional[bytes]:
+        """ Reads a frame from its file """
+        try:
+            with open(self._path(digest), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, digest: bytes, blob: bytes) -> None:
+        """ Writes a frame to its file """
+        path = self._path(digest)
+        try:
+            os.utime(path)
+            return
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=os.path.dirname(path)
+        )
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(blob)
+        os.replace(temporary, path)
+
+    def touch_many(self, digests: Iterable[bytes]) -> None:
+        """ Updates the modification time of the frames' files """
+        for digest in digests:
+            try:
+                os.utime(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def expire(self, before: float) -> int:
+        """ Deletes the files last modified before the time """
+        deleted = 0
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < before:
+                        os.remove(path)
+                        deleted += 1
+                except FileNotFoundError:
+                    # Expired concurrently by another stage.
+                    pass
+        return deleted
+
+
+class GridFSBlobStore(BlobStore):
+    """
+    Stores frames in a GridFS bucket, with the digest as
+    the file's _id. Frames are held in chunks, outside of
+    the working set of the 'Frames' collection. The file's
+    metadata records when it was last referenced.
+    """
+
+    def __init__(self, mongo_client: MongoDB) -> None:
+        """
+        Initialise the store.
+
+        Args:
+            mongo_client (MongoDB): The MongoDB client.
+        """
+        self._fs = GridFS(mongo_client.database, collection=BLOB_BUCKET)
+        self._files = mongo_client.database[f'{BLOB_BUCKET}.files']
+
+    def get(self, digest: bytes) -> Optional[bytes]:
+        """ Reads a frame from the GridFS bucket """
+        try:
+            return self._fs.get(digest.hex()).read()
+        except NoFile:
+            return None
+
+    def put(self, digest: bytes, blob: bytes) -> None:
+        """ Writes a frame to the GridFS bucket """
+        if self._fs.exists(digest.hex()):
+            self.touch_many([digest])
+            return
+        try:
+            self._fs.put(
+                blob,
+                _id=digest.hex(),
+                metadata={'touched': datetime.now(timezone.utc)}
+            )
+        except FileExists:
+            # Stored concurrently by another stage.
+            self.touch_many([digest])
+
+    def touch_many(self, digests: Iterable[bytes]) -> None:
+        """ Updates the frames' metadata, with a single update """
+        ids = [digest.hex() for digest in digests]
+        if not ids:
+            return
+        self._files.update_many(
+            {'_id': {'$in': ids}},
+            {'$set': {'metadata.touched': datetime.now(timezone.utc)}}
+        )
+
+    def expire(self, before: float) -> int:
+        """ Deletes the files, and their chunks, from the bucket """
+        expired = self._files.find(
+            {
+                'metadata.touched': {
+                    '$lt': datetime.fromtimestamp(before, timezone.utc)
+                }
+            },
+            {'_id': 1}
+        )
+        deleted = 0
+        for file in expired:
+            self._fs.delete(file['_id'])
+            deleted += 1
+        return deleted
+
+
+# The blob stores, by name.
+BLOB_STORES: Dict[str, Callable[[MongoDB], BlobStore]] = {
+    'mongo': MongoBlobStore,
+    'file': lambda _: FileBlobStore(),
+    'gridfs': GridFSBlobStore,
+}
+
+
+def get_blob_store(name: str, mongo_client: MongoDB) -> BlobStore:
+    """
+    Builds the blob store from its name.
+
+    Args:
+        name (str): The name of the blob store.
+        mongo_client (MongoDB): The MongoDB client.
+
+    Raises:
+        ValueError: If the blob store does not exist.
+
+    Returns:
+        BlobStore: The blob store.
+    """
+    if name not in BLOB_STORES:
+        raise ValueError(f'Unknown Blob Store: {name}')
+    return BLOB_STORES[name](mongo_client)
@@ -1,3 +1,4 @@
+import os
 from enum import Enum
 
 # The URL string for the local MongoDB server.
@@ -6,6 +7,24 @@ URL = "mongodb://localhost:27017/"
 # The database this pipeline works with.
 DATABASE = "simulation"
 
+# The collection persisting the change stream resume tokens,
+# which outlive the flushes of the pipeline's collections.
+RESUME_COLLECTION = "ResumeTokens"
+
+# Where frames are stored, out of the 'Frames' documents:
+# 'mongo' (the 'Blobs' collection), 'file' or 'gridfs'.
+BLOB_STORE = os.getenv('BLOB_STORE', 'mongo')
+
+# The folder of the content addressed 'file' blob store.
+BLOB_FOLDER = os.getenv('BLOB_FOLDER', 'blobs')
+
+# The GridFS bucket of the 'gridfs' blob store.
+BLOB_BUCKET = "FrameBlobs"
+
+# The time (in seconds) a stored frame is retained after
+# it was last stored or referenced.
+BLOB_TTL = int(os.getenv('BLOB_TTL_S', 3600))
+
 
 class Event(str, Enum):
     """ Codifies the operations that can be 'watched' on MongoDB """
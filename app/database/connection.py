@@ -1,17 +1,28 @@
+import logging
 from app.database import (
     MongoModel,
+    HotQuery,
     Event,
     URL,
     DATABASE,
+    RESUME_COLLECTION,
     generate_bson_schema,
 )
 from pymongo import (
     ASCENDING,
     MongoClient as connect,
+    UpdateOne,
 )
 from pymongo.collection import (
     Collection,
 )
+from pymongo.database import (
+    Database,
+)
+from pymongo.errors import (
+    CollectionInvalid,
+    OperationFailure,
+)
 from typing import (
     Generator,
     Optional,
@@ -20,8 +31,13 @@ from typing import (
     Type,
     Union,
     Dict,
+    Tuple,
 )
 from bson.objectid import ObjectId
+from time import monotonic
+
+# The error code of creating a collection that already exists.
+NAMESPACE_EXISTS = 48
 
 
 class MongoDB:
@@ -42,20 +58,111 @@ class MongoDB:
 
     def _connect(self) -> None:
         """ Connect to the MongoDB database """
-        self._client = connect(URL)[DATABASE]
+        self._client = connect(URL)
 
     def _create_database(self) -> None:
         """ Creates the MongoDB database """
         self._db = self._client[DATABASE]
 
     def _create_collections(self) -> None:
-        """ Creates the MongoDB collections (with schemas) """
+        """
+        Creates the MongoDB collections (with schemas) and their
+        indexes. Existing collections have their schema updated,
+        so every process can bootstrap the database, even whilst
+        other processes do the same.
+        """
+        existing = set(self._db.list_collection_names())
         for collection in MongoModel.__subclasses__():
             # Dynamic generation of MongoDB schema.
-            self._db.create_collection(
-                collection.__name__,
-                validator=generate_bson_schema(collection)
-            )
+            validator = generate_bson_schema(collection)
+            created = False
+            if collection.__name__ not in existing:
+                try:
+                    self._db.create_collection(
+                        collection.__name__,
+                        validator=validator
+                    )
+                    created = True
+                except CollectionInvalid:
+                    # Created by another process since it was listed.
+                    pass
+                except OperationFailure as error:
+                    # Created by another process whilst it was created.
+                    if error.code != NAMESPACE_EXISTS:
+                        raise
+            if not created:
+                self._db.command(
+                    'collMod',
+                    collection.__name__,
+                    validator=validator
+                )
+            # Creating an existing index is a no-op.
+            if collection.indexes:
+                self.get_collection(collection).create_indexes(
+                    collection.indexes
+                )
+
+    def uses_index(
+            self,
+            collection: Type[MongoModel],
+            query: HotQuery
+    ) -> Optional[str]:
+        """
+        Explains a query, to find the index it uses.
+
+        Args:
+            collection (Type[MongoModel]): The collection queried.
+            query (HotQuery): The filter and sort of the query.
+
+        Returns:
+            Optional[str]: The name of the index used, or None
+            if the query scans the collection.
+        """
+        filter, sort = query
+        cursor = self.get_collection(collection).find(filter)
+        if sort:
+            cursor = cursor.sort(sort, ASCENDING)
+        winning = cursor.explain()['queryPlanner']['winningPlan']
+        # The slot based engine nests the plan.
+        stages = [winning.get('queryPlan', winning)]
+        while stages:
+            stage = stages.pop()
+            if 'IXSCAN' in stage.get('stage', ''):
+                return stage.get('indexName')
+            if 'IDHACK' in stage.get('stage', ''):
+                return '_id_'
+            if 'inputStage' in stage:
+                stages.append(stage['inputStage'])
+            stages.extend(stage.get('inputStages', []))
+        return None
+
+    def index_report(self) -> str:
+        """
+        Reports the indexes of each collection, and the index
+        each of its hot queries uses.
+
+        Returns:
+            str: The report.
+        """
+        lines = ['MongoDB indexes:']
+        for collection in MongoModel.__subclasses__():
+            names = sorted(self.get_collection(collection).index_information())
+            lines.append(f'  {collection.__name__}: {", ".join(names)}')
+            for filter, sort in collection.hot_queries:
+                index = self.uses_index(collection, (filter, sort))
+                query = f'{filter} sorted by {sort}' if sort else filter
+                lines.append(f'    {query}: {index or "COLLECTION SCAN"}')
+        return '\n'.join(lines)
+
+    @property
+    def database(self) -> Database:
+        """
+        The MongoDB database of the pipeline.
+
+        Returns:
+            Database: The database.
+        """
+        return self._db
 
     def get_collection(
             self,
@@ -127,6 +234,25 @@ class MongoDB:
         )
         return collection(**result) if result else None
 
+    def find_document(
+            self,
+            collection: Type[MongoModel],
+            filter: Dict[str, Any]
+    ) -> Optional[MongoModel]:
+        """
+        Retrieve the first document matching the filter, if it
+        exists. The document is wrapped in the collection BaseModel.
+
+        Args:
+            collection (Type[MongoModel]): The collection to search from.
+            filter (Dict[str, Any]): The filter to match.
+
+        Returns:
+            Optional[MongoModel]: The document wrapped in the BaseModel.
+        """
+        result = self.get_collection(collection).find_one(filter)
+        return collection(**result) if result else None
+
     def get_documents(
             self,
             collection: Type[MongoModel],
@@ -185,6 +311,36 @@ class MongoDB:
             upsert=True
         )
 
+    def upsert_documents(
+            self,
+            collection: Type[MongoModel],
+            operations: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+            ordered: bool = True
+    ) -> None:
+        """
+        Upsert several documents into the MongoDB database
+        in a single round trip.
+
+        Args:
+            collection (Type[MongoModel]): The collection
+            to upsert into.
+
+            operations (List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+            The filter and update operations of each upsert.
+
+            ordered (bool, optional): If the upserts are applied
+            in order. Defaults to True.
+        """
+        if not operations:
+            return
+        self.get_collection(collection).bulk_write(
+            [
+                UpdateOne(filter, update, upsert=True)
+                for filter, update in operations
+            ],
+            ordered=ordered
+        )
+
     def insert_document(
             self,
             collection: Type[MongoModel],
@@ -208,16 +364,169 @@ class MongoDB:
             )
         )
 
+    def insert_documents(
+            self,
+            collection: Type[MongoModel],
+            records: List[MongoModel]
+    ) -> None:
+        """
+        Insert several documents into the MongoDB database
+        in a single round trip. Each document must be wrapped
+        in the appropriate MongoModel.
+
+        Args:
+            collection (Type[MongoModel]): The collection
+            to update to.
+
+            records (List[MongoModel]): The documents to upload.
+        """
+        if not records:
+            return
+        self.get_collection(collection).insert_many([
+            record.model_dump(
+                by_alias=True,
+                exclude_none=True
+            )
+            for record in records
+        ])
+
+    def delete_before(
+            self,
+            collection: Type[MongoModel],
+            id: ObjectId
+    ) -> None:
+        """
+        Delete the documents older than the given document,
+        with a single range delete over the _id index.
+
+        Args:
+            collection (Type[MongoModel]): The collection
+            to delete from.
+
+            id (ObjectId): The _id of the oldest document kept.
+        """
+        self.get_collection(collection).delete_many({'_id': {'$lt': id}})
+
     def flush_database(self) -> None:
-        """ Delete the documents """
+        """ Delete the documents of the flushed collections """
         for collection in MongoModel.__subclasses__():
-            self.get_collection(collection).remove({})
+            if collection.flushed:
+                self.get_collection(collection).delete_many({})
+
+    def _load_token(self, name: str) -> Optional[Dict[str, Any]]:
+        """ Loads the persisted resume token of a change stream """
+        document = self._db[RESUME_COLLECTION].find_one({'_id': name})
+        return document['token'] if document else None
+
+    def _save_token(self, name: str, token: Dict[str, Any]) -> None:
+        """ Persists the resume token of a change stream """
+        self._db[RESUME_COLLECTION].update_one(
+            {'_id': name},
+            {'$set': {'token': token}},
+            upsert=True
+        )
+
+    def watch_batches(
+            self,
+            collection: Type[MongoModel],
+            event: Event,
+            match: Optional[Dict[str, Any]] = None,
+            full_document: bool = False,
+            size: int = 1,
+            timeout: float = 1.0,
+            resume: Optional[str] = None
+    ) -> Generator[List[Union[ObjectId, MongoModel]], Any, Any]:
+        """
+        Applies a watch on a MongoDB collection for specific
+        operations (denoted by Event), delivering the changes
+        in batches.
+
+        Args:
+            collection (Type[MongoModel]): The collection
+            to 'watch'.
+
+            event (Event): The operation to filter by.
+
+            match (Optional[Dict[str, Any]], optional): A filter on
+            the changed document, applied by the server. This looks
+            up the full document.
+
+            full_document (bool, optional): Deliver the changed
+            documents, looked up at the time of the change, rather
+            than their _id.
+
+            size (int, optional): The maximum number of changes
+            in a batch.
+
+            timeout (float, optional): The maximum time (in seconds)
+            to wait for a batch to fill after its first change.
+
+            resume (Optional[str], optional): The name the resume
+            token is persisted under, once each batch is handled.
+            A restarted watch with the same name continues after
+            the last handled batch.
+
+        Yields:
+            Generator[List[Union[ObjectId, MongoModel]], Any, Any]:
+            The changed documents, or their _id.
+        """
+        full_document = full_document or match is not None
+        conditions: Dict[str, Any] = {
+            'operationType': {'$in': [Event(event).value]}
+        }
+        for name, condition in (match or {}).items():
+            conditions[f'fullDocument.{name}'] = condition
+        options: Dict[str, Any] = {
+            'full_document': 'updateLookup' if full_document else None,
+            'batch_size': size,
+            'max_await_time_ms': max(1, int(timeout * 1000)),
+        }
+        watched = self.get_collection(collection)
+        token = self._load_token(resume) if resume else None
+        try:
+            change_stream = watched.watch(
+                [{'$match': conditions}],
+                resume_after=token,
+                **options
+            )
+        except OperationFailure as error:
+            # The token is lost once it leaves the oplog.
+            logging.getLogger('KURF_SIMULATION').warning(
+                f'Change Stream {resume} Not Resumed: {error}'
+            )
+            change_stream = watched.watch([{'$match': conditions}], **options)
+
+        with change_stream:
+            while change_stream.alive:
+                batch = []
+                started = None
+                while len(batch) < size and change_stream.alive:
+                    change = change_stream.try_next()
+                    if change is not None:
+                        started = started or monotonic()
+                        if not full_document:
+                            batch.append(change['documentKey']['_id'])
+                        elif change.get('fullDocument'):
+                            # Documents deleted since are skipped.
+                            batch.append(
+                                collection(**change['fullDocument'])
+                            )
+                    elif started and monotonic() - started >= timeout:
+                        break
+                if not batch:
+                    continue
+                yield batch
+                if resume and change_stream.resume_token:
+                    self._save_token(resume, change_stream.resume_token)
 
     def watch_collection(
             self,
             collection: Type[MongoModel],
-            event: Event
-    ) -> Generator[ObjectId, Any, Any]:
+            event: Event,
+            match: Optional[Dict[str, Any]] = None,
+            full_document: bool = False,
+            resume: Optional[str] = None
+    ) -> Generator[Union[ObjectId, MongoModel], Any, Any]:
         """
         Applies a watch on a MongoDB collection for
         specific operations (denoted by Event).
@@ -228,14 +537,25 @@ class MongoDB:
 
             event (Event): The operation to filter by.
 
+            match (Optional[Dict[str, Any]], optional): A filter on
+            the changed document, applied by the server.
+
+            full_document (bool, optional): Deliver the changed
+            documents rather than their _id.
+
+            resume (Optional[str], optional): The name the resume
+            token is persisted under.
+
         Yields:
-            Generator[ObjectId, Any, Any]: The _id of the document that
-            has resulted in a 'watch' event.
-        """
-        change_stream = self.get_collection(collection).watch([{
-            '$match': {
-                'operationType': {'$in': [f'{event}']}
-            }
-        }])
-        for change in change_stream:
-            yield ObjectId(change['documentKey'])
+            Generator[Union[ObjectId, MongoModel], Any, Any]: The
+            changed document, or the _id of the document that has
+            resulted in a 'watch' event.
+        """
+        for batch in self.watch_batches(
+            collection,
+            event,
+            match=match,
+            full_document=full_document,
+            resume=resume
+        ):
+            yield from batch
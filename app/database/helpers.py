@@ -23,16 +23,20 @@ def generate_bson_schema(model_cls: Type[MongoModel]) -> Dict[str, Any]:
     type_map = {
         int: 'int',
         str: 'string',
+        bytes: 'binData',
         float: 'double',
         bool: 'bool'
     }
     required = []
     properties = {}
 
-    for field, type in model_cls.model_fields.items():
-        required.append(field)
-        properties[field] = {
-            'bsonType': type_map.get(type.annotation, 'string')
+    # The optional '_id' is generated by MongoDB.
+    for field, info in model_cls.model_fields.items():
+        if not info.is_required():
+            continue
+        required.append(info.alias or field)
+        properties[info.alias or field] = {
+            'bsonType': type_map.get(info.annotation, 'string')
         }
 
     return {
@@ -100,6 +104,7 @@ def get_other_fields(
         int: 0,
         float: 0.0,
         str: '',
+        bytes: b'',
         bool: False
     }
     other_fields = {}
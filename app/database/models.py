@@ -3,12 +3,26 @@ from pydantic import (
     ConfigDict,
     Field
 )
+from pymongo import (
+    ASCENDING,
+    IndexModel,
+)
 from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    List,
     Optional,
+    Tuple,
 )
 from bson.objectid import (
     ObjectId,
 )
+from datetime import datetime
+
+# A query the pipeline runs often: the filter, and the
+# field it is sorted by (if any).
+HotQuery = Tuple[Dict[str, Any], Optional[str]]
 
 
 class MongoModel(BaseModel):
@@ -20,9 +34,16 @@ class MongoModel(BaseModel):
     to forbid extra fields and can submit data to this model
     using the id (or _id alias).
 
+    Subclasses declare the indexes of their collection, which
+    are created at startup, and the queries those indexes serve.
+
     Args:
         BaseModel: Pydantic model superclass.
     """
+    indexes: ClassVar[List[IndexModel]] = []
+    hot_queries: ClassVar[List[HotQuery]] = []
+    # If the documents are deleted when the database is flushed.
+    flushed: ClassVar[bool] = True
     id: Optional[ObjectId] = Field(default=None, alias="_id")
     model_config = ConfigDict(
         extra='forbid',
@@ -45,10 +66,57 @@ class Frames(MongoModel):
     Args:
         MongoModel: Custom Pydantic model superclass.
     """
+    # Partial frames are upserted by their frame number.
+    indexes: ClassVar[List[IndexModel]] = [
+        IndexModel([('frame_number', ASCENDING)], unique=True)
+    ]
+    hot_queries: ClassVar[List[HotQuery]] = [
+        ({'frame_number': 0}, None)
+    ]
+    # The fields set by the partial frames. Each is recorded in
+    # 'parts' once set, so a frame is complete once all are.
+    partial_fields: ClassVar[List[str]] = [
+        'frame_latency',
+        'reference_frame',
+        'streamed_frame',
+    ]
     frame_number: int
-    reference_frame: str
-    streamed_frame: str
+    reference_frame: bytes
+    streamed_frame: bytes
     frame_latency: float
+    parts: List[str] = []
+
+
+class Blobs(MongoModel):
+    """
+    The 'Blobs' collection. This embodies the storage of
+    a deduplicated frame.
+
+    Frames that are sent many times are stored once, and
+    referenced by their digest in the 'Frames' collection.
+    Frames are retained whilst they are referenced, and swept
+    once unreferenced for the BLOB_TTL.
+
+    This is the format of its storage in the MongoDB database.
+
+    Args:
+        MongoModel: Custom Pydantic model superclass.
+    """
+    # Frames are stored, and resolved, by their digest. They are
+    # content addressed, so they outlive the flushes.
+    flushed: ClassVar[bool] = False
+    indexes: ClassVar[List[IndexModel]] = [
+        IndexModel([('digest', ASCENDING)], unique=True),
+        IndexModel([('stored_at', ASCENDING)])
+    ]
+    hot_queries: ClassVar[List[HotQuery]] = [
+        ({'digest': b''}, None),
+        ({'stored_at': {'$lt': datetime(1970, 1, 1)}}, None)
+    ]
+    digest: bytes
+    blob: bytes
+    # When the frame was last stored or referenced.
+    stored_at: Optional[datetime] = None
 
 
 class Results(MongoModel):
@@ -64,5 +132,14 @@ class Results(MongoModel):
     Args:
         MongoModel: Custom Pydantic model superclass.
     """
+    # Results are read oldest first, through the '_id' index,
+    # and looked up (with their result) by frame number.
+    indexes: ClassVar[List[IndexModel]] = [
+        IndexModel([('frame_number', ASCENDING), ('result', ASCENDING)])
+    ]
+    hot_queries: ClassVar[List[HotQuery]] = [
+        ({}, '_id'),
+        ({'frame_number': 0}, None)
+    ]
     frame_number: int
     result: float
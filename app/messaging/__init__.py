@@ -1,12 +1,41 @@
 # flake8: noqa
 
+from app.messaging.config import (
+    HOST,
+    BROKER,
+    PUBLISH_WINDOW,
+    PUBLISH_RETRIES,
+    PUBLISH_RETRY_DELAY,
+    SORT_PARTITIONS,
+    QUEUE_MAX_LENGTH,
+    QUEUE_TTL,
+    QUEUE_OVERFLOW,
+    DEAD_LETTER_MAX_LENGTH,
+    SHED_REPORT_INTERVAL,
+    PUBLISH_REPORT_INTERVAL,
+    CONSUMER_PREFETCH,
+    ACK_BATCH_SIZE,
+    ACK_INTERVAL,
+    FLOW_POLICY,
+    FLOW_HIGH_WATER,
+    FLOW_LOW_WATER,
+    FLOW_PROBE_INTERVAL,
+    FLOW_MAX_SLOWDOWN,
+    Broker,
+    FlowPolicy,
+    Overflow,
+    ContentType,
+)
+
 from app.messaging.exchanges import (
+    ExchangeType,
     Exchange,
     FILE_EXCHNAGE,
     AGGREGATE_EXCHANGE,
     REWARD_EXCHANGE,
     LOGS_EXCHANGE,
-    DECISION_EXCHANGE
+    DECISION_EXCHANGE,
+    DEAD_LETTER_EXCHANGE,
 )
 
 
@@ -19,6 +48,11 @@ from app.messaging.messages import (
     PartialMessage
 )
 
+from app.messaging.codecs import (
+    encode_message,
+    decode_message,
+)
+
 from app.messaging.queues import (
     Queue,
     STREAM_QUEUE,
@@ -29,12 +63,32 @@ from app.messaging.queues import (
     T_LOG_QUEUE,
     F_LOG_QUEUE,
     RELAY_QUEUE,
+    DEAD_LETTER_QUEUE,
+    FLOW_QUEUES,
 )
 
-from app.messaging.config import (
-    HOST,
+from app.messaging.flow import (
+    FlowController,
+)
+
+from app.messaging.memory import (
+    InMemoryBroker,
+    InMemoryConnection,
 )
 
 from app.messaging.connection import (
     RabbitMQ,
+)
+
+from app.messaging.acknowledger import (
+    Acknowledger,
+)
+
+from app.messaging.confirms import (
+    Outgoing,
+    ConfirmTracker,
+)
+
+from app.messaging.async_connection import (
+    AsyncRabbitMQ,
 )
\ No newline at end of file
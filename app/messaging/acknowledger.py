@@ -0,0 +1,185 @@
+import functools
+import logging
+from pika.channel import Channel
+from pika.spec import (
+    Basic,
+    BasicProperties,
+)
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+)
+from app.messaging import (
+    RabbitMQ,
+)
+
+
+class Acknowledger:
+    """
+    Acknowledges messages once their callback has completed.
+
+    Successful messages are acknowledged together, with a single
+    'multiple' acknowledgement every 'every' messages or 'interval'
+    seconds after the first unacknowledged message - whichever
+    happens first. Messages whose callback raises are rejected.
+    Batches are settled together, as soon as their callback returns.
+    """
+
+    def __init__(
+            self,
+            client: RabbitMQ,
+            every: int,
+            interval: float
+    ) -> None:
+        """
+        Initialise the acknowledger.
+
+        Args:
+            client (RabbitMQ): The RabbitMQ client consuming.
+            every (int): The number of messages per acknowledgement.
+            interval (float): The maximum time (in seconds) a
+            message waits to be acknowledged.
+        """
+        self._client = client
+        self._every = every
+        self._interval = interval
+        self._last_tag = 0
+        self._pending = 0
+        self._timer: Optional[object] = None
+
+    def _on_timer(self) -> None:
+        """ Acknowledges the messages waiting on the timer """
+        self._timer = None
+        self.flush()
+
+    def flush(self) -> None:
+        """ Acknowledges every completed message """
+        if self._timer is not None:
+            self._client.conn.remove_timeout(self._timer)
+            self._timer = None
+        if self._pending:
+            self._client.channel.basic_ack(
+                delivery_tag=self._last_tag,
+                multiple=True
+            )
+            self._pending = 0
+
+    def ack(self, delivery_tag: int) -> None:
+        """
+        Marks the message as completed.
+
+        Args:
+            delivery_tag (int): The delivery tag of the message.
+        """
+        self._last_tag = delivery_tag
+        self._pending += 1
+        if self._pending >= self._every:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self._client.conn.call_later(
+                self._interval,
+                self._on_timer
+            )
+
+    def nack(self, delivery_tag: int) -> None:
+        """
+        Rejects the message, without requeueing it, so a message
+        that always fails cannot block the queue.
+
+        Args:
+            delivery_tag (int): The delivery tag of the message.
+        """
+        # The earlier messages are settled first, so the
+        # next 'multiple' acknowledgement cannot cover this one.
+        self.flush()
+        self._client.channel.basic_nack(
+            delivery_tag=delivery_tag,
+            requeue=False
+        )
+
+    def wrap(
+            self,
+            handler: Callable[
+                [Channel, Basic.Deliver, BasicProperties, bytes], Any]
+    ) -> Callable[[Channel, Basic.Deliver, BasicProperties, bytes], Any]:
+        """
+        Ties the acknowledgement of messages to the handler.
+
+        Args:
+            handler (Callable[
+                [Channel, Basic.Deliver, BasicProperties, bytes], Any
+            ]): The consumer callback.
+
+        Returns:
+            Callable[[Channel, Basic.Deliver, BasicProperties, bytes], Any]:
+            The consumer callback, acknowledging each message once
+            the handler returns and rejecting it if the handler raises.
+        """
+        @functools.wraps(handler)
+        def wrapper(
+            ch: Channel,
+            method: Basic.Deliver,
+            properties: BasicProperties,
+            body: bytes
+        ) -> Any:
+            try:
+                result = handler(ch, method, properties, body)
+            except Exception:
+                logging.getLogger('KURF_SIMULATION').exception(
+                    f'Rejected Message From {method.routing_key}'
+                )
+                self.nack(method.delivery_tag)
+                return None
+            self.ack(method.delivery_tag)
+            return result
+        return wrapper
+
+    def wrap_batch(
+            self,
+            handler: Callable[
+                [List[Tuple[Basic.Deliver, BasicProperties, bytes]]], Any]
+    ) -> Callable[
+            [List[Tuple[Basic.Deliver, BasicProperties, bytes]]], Any]:
+        """
+        Ties the acknowledgement of batches to the handler.
+
+        Args:
+            handler (Callable[
+                [List[Tuple[Basic.Deliver, BasicProperties, bytes]]], Any
+            ]): The batch consumer callback.
+
+        Returns:
+            Callable[[List[Tuple[Basic.Deliver, BasicProperties, bytes]]],
+            Any]: The batch consumer callback, acknowledging the batch
+            once the handler returns and rejecting the whole batch
+            (to the dead letter exchange) if the handler raises.
+        """
+        @functools.wraps(handler)
+        def wrapper(
+            batch: List[Tuple[Basic.Deliver, BasicProperties, bytes]]
+        ) -> Any:
+            last_tag = batch[-1][0].delivery_tag
+            try:
+                result = handler(batch)
+            except Exception:
+                logging.getLogger('KURF_SIMULATION').exception(
+                    f'Rejected Batch Of {len(batch)} Messages From '
+                    f'{batch[-1][0].routing_key}'
+                )
+                self.flush()
+                self._client.channel.basic_nack(
+                    delivery_tag=last_tag,
+                    multiple=True,
+                    requeue=False
+                )
+                return None
+            self.flush()
+            self._client.channel.basic_ack(
+                delivery_tag=last_tag,
+                multiple=True
+            )
+            return result
+        return wrapper
@@ -0,0 +1,390 @@
+import asyncio
+import logging
+from pika import BasicProperties
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.channel import Channel
+from pika.spec import (
+    Basic,
+)
+from typing import (
+    Any,
+    Callable,
+    Optional,
+    Set,
+)
+from app.messaging import (
+    ConfirmTracker,
+    Exchange,
+    Outgoing,
+    Queue,
+    RabbitMQModel,
+    HOST,
+    BROKER,
+    PUBLISH_WINDOW,
+    Broker,
+    InMemoryConnection,
+    encode_message,
+)
+
+
+def resolve(future: asyncio.Future) -> Callable[..., None]:
+    """
+    Creates a pika callback completing the future with its
+    first argument, so pika operations can be awaited.
+
+    Args:
+        future (asyncio.Future): The future to complete.
+
+    Returns:
+        Callable[..., None]: The pika callback.
+    """
+    def callback(result: Any = None, *_) -> None:
+        if not future.done():
+            future.set_result(result)
+    return callback
+
+
+class AsyncRabbitMQ:
+    """
+    Asyncio RabbitMQ helper, with the surface of 'RabbitMQ'.
+
+    A single connection carries any number of channels, and runs
+    on the event loop, so one process can consume and publish
+    concurrently without threads. Publishes use confirms, with at
+    most 'window' messages unconfirmed on the default channel.
+    Once the connection closes, publishing raises, rather than
+    waiting forever on the window, so the node fails and can be
+    restarted.
+    """
+
+    def __init__(self, window: int = PUBLISH_WINDOW) -> None:
+        """
+        Initialise the client. 'connect' must be awaited before use.
+
+        Args:
+            window (int, optional): The maximum number of
+            unconfirmed messages.
+        """
+        self._window_size = window
+        self._conn: Optional[AsyncioConnection] = None
+        self._channel: Optional[Channel] = None
+        self._closed: Optional[asyncio.Future] = None
+        self._declared: Set[str] = set()
+        self.confirms: Optional[ConfirmTracker] = None
+
+    async def connect(self) -> 'AsyncRabbitMQ':
+        """
+        Connect to the RabbitMQ service and open the default channel.
+
+        Raises:
+            ConnectionError: If the connection could not be opened.
+
+        Returns:
+            AsyncRabbitMQ: This client, once connected.
+        """
+        loop = asyncio.get_running_loop()
+        opened = loop.create_future()
+        self._closed = loop.create_future()
+        self._window = asyncio.Semaphore(self._window_size)
+
+        def failed(_, error: Exception) -> None:
+            if not opened.done():
+                opened.set_exception(ConnectionError(error))
+
+        if BROKER == Broker.MEMORY:
+            self._conn = InMemoryConnection(
+                loop,
+                on_close_callback=self._on_close
+            )
+            opened.set_result(self._conn)
+        else:
+            self._conn = AsyncioConnection(
+                HOST,
+                on_open_callback=resolve(opened),
+                on_open_error_callback=failed,
+                on_close_callback=self._on_close,
+                custom_ioloop=loop
+            )
+        await opened
+        self._channel = await self.open_channel()
+        self.confirms = ConfirmTracker(
+            publish=self._send,
+            call_later=loop.call_later,
+            release=self._release
+        )
+        confirming = loop.create_future()
+        self._channel.confirm_delivery(
+            self.confirms.on_confirm,
+            callback=resolve(confirming)
+        )
+        await confirming
+        return self
+
+    async def open_channel(self) -> Channel:
+        """
+        Opens another channel over the connection.
+
+        Returns:
+            Channel: The opened channel.
+        """
+        opened = asyncio.get_running_loop().create_future()
+        self._conn.channel(on_open_callback=resolve(opened))
+        return await opened
+
+    async def declare_exchange(
+            self,
+            exchange: Exchange,
+            channel: Optional[Channel] = None
+    ) -> None:
+        """
+        Declare the Exchange on the RabbitMQ service.
+        Each exchange is only declared once.
+
+        Args:
+            exchange (Exchange): The exchange to declare.
+            channel (Optional[Channel], optional): The channel to
+            declare on. Defaults to the default channel.
+        """
+        if exchange.name in self._declared:
+            return
+        declared = asyncio.get_running_loop().create_future()
+        (channel or self._channel).exchange_declare(
+            exchange=exchange.name,
+            exchange_type=exchange.exchange_type,
+            callback=resolve(declared)
+        )
+        await declared
+        self._declared.add(exchange.name)
+
+    async def declare_queue(
+            self,
+            queue: Queue,
+            channel: Optional[Channel] = None
+    ) -> None:
+        """
+        Declare and bind the queue on the RabbitMQ service,
+        along with its dead letter exchange.
+
+        Args:
+            queue (Queue): The queue to declare and bind.
+            channel (Optional[Channel], optional): The channel to
+            declare on. Defaults to the default channel.
+        """
+        channel = channel or self._channel
+        if queue.dead_letter:
+            await self.declare_exchange(queue.dead_letter, channel)
+        loop = asyncio.get_running_loop()
+        declared, bound = loop.create_future(), loop.create_future()
+        channel.queue_declare(
+            queue=queue.name,
+            exclusive=queue.exclusive,
+            arguments=queue.arguments,
+            callback=resolve(declared)
+        )
+        channel.queue_bind(
+            exchange=queue.exchange.name,
+            queue=queue.name,
+            routing_key=queue.routing,
+            callback=resolve(bound)
+        )
+        await asyncio.gather(declared, bound)
+
+    async def queue_depth(self, queue: Queue) -> int:
+        """
+        The number of messages ready in the queue.
+        The queue is declared if it does not exist.
+
+        Args:
+            queue (Queue): The queue to probe.
+
+        Returns:
+            int: The number of messages ready for delivery.
+        """
+        declared = asyncio.get_running_loop().create_future()
+        self._channel.queue_declare(
+            queue=queue.name,
+            exclusive=queue.exclusive,
+            arguments=queue.arguments,
+            callback=resolve(declared)
+        )
+        return (await declared).method.message_count
+
+    async def declare_queue_exchange(
+            self,
+            queue: Queue,
+            channel: Optional[Channel] = None
+    ) -> None:
+        """
+        Declare the queue and it's associated exchange.
+
+        Args:
+            queue (Queue): The queue to declare (and its exchange).
+            channel (Optional[Channel], optional): The channel to
+            declare on. Defaults to the default channel.
+        """
+        await self.declare_exchange(queue.exchange, channel)
+        await self.declare_queue(queue, channel)
+
+    def _on_close(self, _: Any, reason: Optional[Exception]) -> None:
+        """
+        Marks the client closed once the connection closes,
+        waking the publishers waiting on the window.
+        """
+        if self.confirms and self.confirms.unconfirmed:
+            logging.getLogger('KURF_SIMULATION').warning(
+                f'RabbitMQ Closed With {self.confirms.unconfirmed} '
+                f'Unconfirmed: {reason}'
+            )
+        resolve(self._closed)()
+        # Each woken publisher wakes the next, as it raises.
+        self._window.release()
+
+    def _check_open(self) -> None:
+        """
+        Checks the connection is still open.
+
+        Raises:
+            ConnectionError: If the connection has closed.
+        """
+        if self._closed.done():
+            raise ConnectionError('RabbitMQ Connection Closed')
+
+    def _send(self, outgoing: Outgoing) -> None:
+        """ Publishes a message on the default channel """
+        if self._closed.done():
+            # Retries scheduled before the connection closed.
+            return
+        exchange, routing, body, content_type = outgoing
+        self._channel.basic_publish(
+            exchange=exchange.name,
+            routing_key=routing,
+            body=body,
+            properties=BasicProperties(content_type=content_type)
+        )
+
+    def _release(self, settled: int) -> None:
+        """ Frees the places of settled messages in the window """
+        for _ in range(settled):
+            self._window.release()
+
+    async def publish(
+            self,
+            exchange: Exchange,
+            message: RabbitMQModel,
+            routing: str = ''
+    ) -> None:
+        """
+        Publishes messages on the exchange.
+        This waits whilst the window of unconfirmed messages is full.
+
+        Args:
+            exchange (Exchange): The exchange to publish to.
+            message (RabbitMQModel): The message to send.
+            routing (str, optional): The queue's routing key.
+
+        Raises:
+            ConnectionError: If the connection has closed.
+        """
+        self._check_open()
+        await self.declare_exchange(exchange)
+        body, content_type = encode_message(message)
+        await self._window.acquire()
+        if self._closed.done():
+            self._window.release()
+            self._check_open()
+        self.confirms.send((exchange, routing, body, content_type))
+
+    async def publish_to_queue(
+            self,
+            queue: Queue,
+            message: RabbitMQModel
+    ) -> None:
+        """
+        Publish messages to the defined queue.
+
+        Args:
+            queue (Queue): The queue to publish messages to.
+            message (RabbitMQModel): The message to send.
+        """
+        await self.publish(queue.exchange, message, queue.routing)
+
+    def report(self) -> str:
+        """
+        Summarises the publish rate and confirm latency.
+
+        Returns:
+            str: The summary.
+        """
+        return self.confirms.report()
+
+    async def consume(
+            self,
+            queue: Queue,
+            callback: Callable[
+                [Channel, Basic.Deliver, BasicProperties, bytes], Any],
+            ack: bool = True,
+            prefetch: Optional[int] = None,
+            channel: Optional[Channel] = None
+    ) -> None:
+        """
+        Helper to consume RabbitMQ messages.
+        Messages are delivered to the callback on the event loop.
+
+        Args:
+            queue (Queue): The queue to subscribe to.
+
+            callback (Callable[
+                [Channel, Basic.Deliver, BasicProperties, bytes], Any
+            ]): The callback method when a message enters the queue.
+
+            ack (bool, optional): Acknowledge messages on delivery,
+            rather than by the callback. Defaults to True.
+
+            prefetch (Optional[int], optional): The maximum number of
+            unacknowledged messages. Defaults to no limit.
+
+            channel (Optional[Channel], optional): The channel to
+            consume on. Defaults to the default channel.
+        """
+        channel = channel or self._channel
+        if prefetch:
+            limited = asyncio.get_running_loop().create_future()
+            channel.basic_qos(
+                prefetch_count=prefetch,
+                callback=resolve(limited)
+            )
+            await limited
+        consuming = asyncio.get_running_loop().create_future()
+        channel.basic_consume(
+            queue=queue.name,
+            on_message_callback=callback,
+            auto_ack=ack,
+            callback=resolve(consuming)
+        )
+        await consuming
+
+    async def close(self) -> None:
+        """ Closes the connection, and every channel over it """
+        if not self._conn.is_closed:
+            self._conn.close()
+        await self._closed
+
+    @property
+    def conn(self) -> AsyncioConnection:
+        """
+        The physical connection for the RabbitMQ service.
+
+        Returns:
+            AsyncioConnection: The physical connection.
+        """
+        return self._conn
+
+    @property
+    def channel(self) -> Channel:
+        """
+        The default virtual connection to the RabbitMQ service.
+
+        Returns:
+            Channel: The virtual connection.
+        """
+        return self._channel
@@ -0,0 +1,114 @@
+import json
+import struct
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+)
+from app.messaging import (
+    ContentType,
+    RabbitMQModel,
+)
+
+# The frame header: frame number, presence flags, latency and the
+# length of the streamed and reference frames (-1 when absent).
+FRAME_HEADER = struct.Struct('<qBdii')
+# The presence flag of the latency, so any latency, even NaN,
+# is carried as sent.
+LATENCY_PRESENT = 0x01
+# The frame fields, in the order they follow the header.
+FRAME_FIELDS = ('streamed_frame', 'reference_frame')
+
+
+def encode_frame(payload: Dict[str, Any]) -> bytes:
+    """
+    Encodes frame data as the typed header followed by the raw
+    encoded frames, so the frames are neither base64 wrapped
+    nor parsed as JSON strings.
+
+    Args:
+        payload (Dict[str, Any]): The frame data to encode.
+
+    Returns:
+        bytes: The encoded frame data.
+    """
+    frames = [payload.get(name) for name in FRAME_FIELDS]
+    latency = payload.get('latency')
+    header = FRAME_HEADER.pack(
+        payload['frame_number'],
+        0 if latency is None else LATENCY_PRESENT,
+        0.0 if latency is None else latency,
+        *[-1 if frame is None else len(frame) for frame in frames]
+    )
+    return b''.join([header] + [frame for frame in frames if frame])
+
+
+def decode_frame(payload: bytes) -> Dict[str, Any]:
+    """
+    Decodes frame data encoded by 'encode_frame'.
+    Absent fields are left out of the decoded data.
+
+    Args:
+        payload (bytes): The encoded frame data.
+
+    Raises:
+        ValueError: If the frame lengths do not match the payload.
+
+    Returns:
+        Dict[str, Any]: The decoded frame data.
+    """
+    frame_number, flags, latency, *lengths = FRAME_HEADER.unpack_from(
+        payload
+    )
+    decoded = {'frame_number': frame_number}
+    if flags & LATENCY_PRESENT:
+        decoded['latency'] = latency
+
+    view = memoryview(payload)
+    offset = FRAME_HEADER.size
+    for name, length in zip(FRAME_FIELDS, lengths):
+        if length < 0:
+            continue
+        decoded[name] = bytes(view[offset:offset + length])
+        offset += length
+    if offset != len(payload):
+        raise ValueError('Frame Length Mismatch')
+    return decoded
+
+
+def encode_message(message: RabbitMQModel) -> Tuple[bytes, str]:
+    """
+    Encodes the message with the codec of its content type.
+
+    Args:
+        message (RabbitMQModel): The message to encode.
+
+    Returns:
+        Tuple[bytes, str]: The message body and its content type.
+    """
+    payload = message.model_dump(by_alias=True, exclude_none=True)
+    if message.content_type == ContentType.FRAME:
+        return encode_frame(payload), message.content_type.value
+    return json.dumps(payload).encode('utf-8'), message.content_type.value
+
+
+def decode_message(
+        body: bytes,
+        content_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Decodes a message body with the codec of its content type.
+    Bodies without a content type are decoded as JSON.
+
+    Args:
+        body (bytes): The message body.
+        content_type (Optional[str], optional): The content type
+        the message was published with.
+
+    Returns:
+        Dict[str, Any]: The decoded message fields.
+    """
+    if content_type == ContentType.FRAME.value:
+        return decode_frame(body)
+    return json.loads(body)
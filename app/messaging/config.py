@@ -1,4 +1,115 @@
+import os
+from enum import Enum
 from pika import ConnectionParameters
 
 # RabbitMQ configuration for localhost.
 HOST = ConnectionParameters('localhost')
+
+# The message broker: 'rabbitmq', or 'memory' to run
+# every node within a single process.
+BROKER = os.getenv('BROKER', 'rabbitmq')
+
+# The maximum number of published messages
+# awaiting a confirm from the broker.
+PUBLISH_WINDOW = int(os.getenv('PUBLISH_WINDOW', 256))
+
+# The number of times a message rejected by the
+# broker is published again, before it is dropped.
+PUBLISH_RETRIES = int(os.getenv('PUBLISH_RETRIES', 5))
+
+# The time (in milliseconds) before a rejected message is
+# first published again, doubling with each retry.
+PUBLISH_RETRY_DELAY = int(os.getenv('PUBLISH_RETRY_MS', 50))
+
+# The maximum number of unacknowledged messages
+# the broker sends to each consumer.
+CONSUMER_PREFETCH = int(os.getenv('CONSUMER_PREFETCH', 64))
+
+# The number of completed messages
+# acknowledged together.
+ACK_BATCH_SIZE = int(os.getenv('ACK_BATCH', 16))
+
+# The maximum time (in milliseconds) a completed
+# message waits to be acknowledged.
+ACK_INTERVAL = int(os.getenv('ACK_INTERVAL_MS', 100))
+
+# The number of messages published between
+# reports of the publishing statistics.
+PUBLISH_REPORT_INTERVAL = int(os.getenv('PUBLISH_REPORT', 1000))
+
+# The number of sorter queues (and workers) the partial
+# frames are partitioned over, by their frame number.
+SORT_PARTITIONS = int(os.getenv('SORT_PARTITIONS', 1))
+
+# The maximum number of messages held by the reward
+# queue (0 is unbounded).
+QUEUE_MAX_LENGTH = int(os.getenv('QUEUE_MAX_LENGTH', 4096))
+
+# The time (in milliseconds) a frame message may
+# wait in the reward queue (0 is unlimited).
+QUEUE_TTL = int(os.getenv('QUEUE_TTL_MS', 0))
+
+# What a full reward queue does with new messages:
+# 'drop-head' or 'reject-publish'.
+QUEUE_OVERFLOW = os.getenv('QUEUE_OVERFLOW', 'drop-head')
+
+# The maximum number of messages held by the
+# dead letter queue.
+DEAD_LETTER_MAX_LENGTH = int(os.getenv('DEAD_LETTER_MAX_LENGTH', 10000))
+
+# The time (in seconds) between reports
+# of the shed messages.
+SHED_REPORT_INTERVAL = int(os.getenv('SHED_REPORT_S', 10))
+
+# How the pipeline responds to a backlog downstream:
+# 'none', 'slow', 'pause' or 'drop'.
+FLOW_POLICY = os.getenv('FLOW_POLICY', 'slow')
+
+# The queue depth at which the emitters respond
+# to the backlog.
+FLOW_HIGH_WATER = int(os.getenv('FLOW_HIGH_WATER', 512))
+
+# The queue depth at which the emitters resume
+# their normal rate.
+FLOW_LOW_WATER = int(os.getenv('FLOW_LOW_WATER', 128))
+
+# The time (in milliseconds) between probes
+# of the queue depths.
+FLOW_PROBE_INTERVAL = int(os.getenv('FLOW_PROBE_MS', 250))
+
+# The maximum factor the 'slow' policy
+# stretches the publish interval by.
+FLOW_MAX_SLOWDOWN = int(os.getenv('FLOW_MAX_SLOWDOWN', 8))
+
+
+class Broker(str, Enum):
+    """ The message brokers """
+    RABBITMQ = 'rabbitmq'
+    MEMORY = 'memory'
+
+
+class Overflow(str, Enum):
+    """ The responses of a full queue to new messages """
+    # Discard (or dead letter) the oldest message.
+    DROP_HEAD = 'drop-head'
+    # Reject the new message, which confirming publishers resend.
+    REJECT = 'reject-publish'
+
+
+class FlowPolicy(str, Enum):
+    """ The responses of the emitters to a backlog """
+    NONE = 'none'
+    # Stretch the publish interval with the backlog.
+    SLOW = 'slow'
+    # Stop reading frames until the backlog clears.
+    PAUSE = 'pause'
+    # Keep reading frames in real-time, dropping whole frames
+    # where they are joined.
+    DROP = 'drop'
+
+
+class ContentType(str, Enum):
+    """ The codecs used for the message bodies """
+    JSON = 'application/json'
+    # Typed header followed by the raw encoded frames.
+    FRAME = 'application/x-kurf-frame'
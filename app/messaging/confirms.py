@@ -0,0 +1,170 @@
+import numpy as np
+from collections import deque
+from functools import partial
+from time import monotonic
+from pika.frame import Method
+from pika.spec import Basic
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Optional,
+    Tuple,
+)
+from app.messaging import (
+    Exchange,
+    PUBLISH_RETRIES,
+    PUBLISH_RETRY_DELAY,
+)
+
+# A message ready to publish: the exchange, routing key,
+# body and content type.
+Outgoing = Tuple[Exchange, str, bytes, str]
+
+
+class ConfirmTracker:
+    """
+    Tracks the messages published on a channel with confirms.
+
+    Each message is held until the broker confirms it. Rejected
+    messages are published again after a backoff, doubling with
+    each retry, and dropped once they have been retried 'retries'
+    times. Confirmed and dropped messages leave the window of
+    unconfirmed messages. The publish rate and confirm latency
+    are recorded for the report.
+    """
+
+    def __init__(
+            self,
+            publish: Callable[[Outgoing], None],
+            call_later: Callable[[float, Callable[[], None]], Any],
+            release: Callable[[int], None],
+            retries: int = PUBLISH_RETRIES,
+            retry_delay: float = PUBLISH_RETRY_DELAY / 1000
+    ) -> None:
+        """
+        Initialise the tracker.
+
+        Args:
+            publish (Callable[[Outgoing], None]): Publishes a message
+            on the confirming channel.
+            call_later (Callable[[float, Callable[[], None]], Any]):
+            Schedules a callback on the channel's loop, after a delay
+            (in seconds).
+            release (Callable[[int], None]): Frees the given number
+            of places in the window of unconfirmed messages.
+            retries (int, optional): The number of times a rejected
+            message is published again.
+            retry_delay (float, optional): The time (in seconds)
+            before the first retry.
+        """
+        self._publish = publish
+        self._call_later = call_later
+        self._release = release
+        self._retries = retries
+        self._retry_delay = retry_delay
+        # The unconfirmed messages: when they were first sent,
+        # how often they were rejected, and the message.
+        self._in_flight: Dict[int, Tuple[float, int, Outgoing]] = {}
+        self._delivery_tag = 0
+        # Publishing statistics.
+        self._started = monotonic()
+        self.published = 0
+        self.confirmed = 0
+        self.rejected = 0
+        self.dropped = 0
+        self._latencies: Deque[float] = deque(maxlen=10000)
+
+    def send(
+            self,
+            outgoing: Outgoing,
+            sent: Optional[float] = None,
+            attempts: int = 0
+    ) -> None:
+        """
+        Publishes a message, holding it until it is confirmed.
+        This must be called on the channel's loop.
+
+        Args:
+            outgoing (Outgoing): The message to publish.
+            sent (Optional[float], optional): When the message was
+            first published, if it is being published again.
+            attempts (int, optional): The number of times the
+            message was rejected.
+        """
+        self._publish(outgoing)
+        self._delivery_tag += 1
+        self._in_flight[self._delivery_tag] = (
+            sent or monotonic(),
+            attempts,
+            outgoing
+        )
+        if sent is None:
+            self.published += 1
+
+    def on_confirm(self, frame: Method) -> None:
+        """
+        Settles the messages confirmed by the broker. Rejected
+        messages are published again after a backoff, so a full
+        queue is not flooded with retries, until they are dropped.
+
+        Args:
+            frame (Method): The 'Basic.Ack' or 'Basic.Nack' frame.
+        """
+        method = frame.method
+        tags = [method.delivery_tag]
+        if method.multiple:
+            tags = [
+                tag
+                for tag in self._in_flight
+                if tag <= method.delivery_tag
+            ]
+        now = monotonic()
+        settled = 0
+        for tag in tags:
+            sent, attempts, outgoing = self._in_flight.pop(tag)
+            if isinstance(method, Basic.Nack):
+                self.rejected += 1
+                if attempts < self._retries:
+                    # The message keeps its place in the window.
+                    self._call_later(
+                        self._retry_delay * 2 ** attempts,
+                        partial(self.send, outgoing, sent, attempts + 1)
+                    )
+                    continue
+                self.dropped += 1
+            else:
+                self._latencies.append(now - sent)
+                self.confirmed += 1
+            settled += 1
+        if settled:
+            self._release(settled)
+
+    @property
+    def unconfirmed(self) -> int:
+        """
+        The number of messages awaiting a confirm.
+
+        Returns:
+            int: The number of unconfirmed messages.
+        """
+        return len(self._in_flight)
+
+    def report(self) -> str:
+        """
+        Summarises the publish rate and confirm latency.
+
+        Returns:
+            str: The summary.
+        """
+        rate = self.published / (monotonic() - self._started)
+        latencies = np.array(self._latencies) * 1000
+        if not len(latencies):
+            latencies = np.zeros(1)
+        return (
+            f'published {self.published} ({rate:.1f}/s), '
+            f'confirm latency {latencies.mean():.2f} ms '
+            f'(p99 {np.percentile(latencies, 99):.2f} ms), '
+            f'{self.rejected} rejected, {self.dropped} dropped'
+        )
@@ -15,15 +15,23 @@ from app.messaging import (
     Exchange,
     Queue,
     RabbitMQModel,
-    HOST
+    HOST,
+    BROKER,
+    Broker,
+    InMemoryConnection,
+    encode_message,
 )
 from typing import (
     Callable,
+    Generator,
+    Optional,
+    List,
+    Set,
+    Tuple,
     Any,
 )
-from app.utils import (
-    dict_to_bytes as convert,
-)
+from collections import deque
+from time import monotonic
 
 
 class RabbitMQ:
@@ -39,9 +47,14 @@ class RabbitMQ:
         return cls._instance
 
     def _connect(self) -> None:
-        """ Connect to the RabbitMQ service """
-        self._conn = connection(HOST)
+        """ Connect to the RabbitMQ service, or the in-process broker """
+        if BROKER == Broker.MEMORY:
+            self._conn = InMemoryConnection()
+        else:
+            self._conn = connection(HOST)
         self._channel = self._conn.channel()
+        # The exchanges and queues declared on this channel.
+        self._declared: Set[str] = set()
 
     def declare_exchange(
         self,
@@ -49,34 +62,63 @@ class RabbitMQ:
     ) -> None:
         """
         Declare the Exchange on the RabbitMQ service.
+        Each exchange is only declared once.
 
         Args:
             exchange (Exchange): The exchange to declare.
         """
+        if exchange.name in self._declared:
+            return
         self.channel.exchange_declare(
             exchange=exchange.name,
             exchange_type=exchange.exchange_type
         )
+        self._declared.add(exchange.name)
 
     def declare_queue(
             self,
             queue: Queue
     ) -> None:
         """
-        Declare and bind the queue on the RabbitMQ service.
+        Declare and bind the queue on the RabbitMQ service,
+        along with its dead letter exchange.
 
         Args:
             queue (Queue): The queue to declare and bind.
         """
+        if queue.dead_letter:
+            self.declare_exchange(queue.dead_letter)
         self.channel.queue_declare(
             queue=queue.name,
-            exclusive=queue.exclusive
+            exclusive=queue.exclusive,
+            arguments=queue.arguments
         )
         self.channel.queue_bind(
             exchange=queue.exchange.name,
-            queue=queue.name
+            queue=queue.name,
+            routing_key=queue.routing
         )
 
+    def queue_depth(
+            self,
+            queue: Queue
+    ) -> int:
+        """
+        The number of messages ready in the queue.
+        The queue is declared if it does not exist.
+
+        Args:
+            queue (Queue): The queue to probe.
+
+        Returns:
+            int: The number of messages ready for delivery.
+        """
+        return self.channel.queue_declare(
+            queue=queue.name,
+            exclusive=queue.exclusive,
+            arguments=queue.arguments
+        ).method.message_count
+
     def declare_queue_exchange(
             self,
             queue: Queue
@@ -98,6 +140,8 @@ class RabbitMQ:
     ) -> None:
         """
         Publishes messages on the exchange.
+        The body is encoded with the codec of the message's
+        content type, which is sent along with the message.
 
         Args:
             exchange (Exchange): The exchange to publish to.
@@ -105,10 +149,12 @@ class RabbitMQ:
             routing (str, optional): The queue's routing key.
         """
         self.declare_exchange(exchange)
+        body, content_type = encode_message(message)
         self.channel.basic_publish(
             exchange=exchange.name,
             routing_key=routing,
-            body=convert(message.model_dump(by_alias=True, exclude_none=True))
+            body=body,
+            properties=BasicProperties(content_type=content_type)
         )
 
     def publish_to_queue(
@@ -125,8 +171,8 @@ class RabbitMQ:
         """
         self.publish(
             queue.exchange,
-            queue.routing,
-            message
+            message,
+            queue.routing
         )
 
     def consume(
@@ -134,7 +180,8 @@ class RabbitMQ:
             queue: Queue,
             callback: Callable[
                 [Channel, Basic.Deliver, BasicProperties, bytes], Any],
-            ack: bool = True
+            ack: bool = True,
+            prefetch: Optional[int] = None
     ) -> None:
         """
         Helper to consume RabbitMQ messages.
@@ -146,14 +193,70 @@ class RabbitMQ:
                 [Channel, Basic.Deliver, BasicProperties, bytes], Any
             ]): The callback method when a message enters the queue.
 
-            ack (bool, optional): Message acknowledgement. Defaults to True.
+            ack (bool, optional): Acknowledge messages on delivery,
+            rather than by the callback. Defaults to True.
+
+            prefetch (Optional[int], optional): The maximum number of
+            unacknowledged messages. Defaults to no limit.
         """
+        if prefetch:
+            self.channel.basic_qos(prefetch_count=prefetch)
         self.channel.basic_consume(
             queue=queue.name,
             on_message_callback=callback,
             auto_ack=ack
         )
 
+    def consume_batch(
+            self,
+            queue: Queue,
+            size: int,
+            timeout: float,
+            prefetch: Optional[int] = None
+    ) -> Generator[
+            List[Tuple[Basic.Deliver, BasicProperties, bytes]], Any, Any]:
+        """
+        Helper to consume RabbitMQ messages in batches.
+
+        A batch is yielded once 'size' messages have arrived, or
+        'timeout' seconds after the first message of the batch
+        arrived - whichever happens first. The consumer settles
+        each batch, such as with 'Acknowledger.wrap_batch'.
+
+        Args:
+            queue (Queue): The queue to subscribe to.
+            size (int): The maximum number of messages in a batch.
+            timeout (float): The maximum time (in seconds) to wait
+            for a batch to fill.
+            prefetch (Optional[int], optional): The maximum number of
+            unacknowledged messages. Defaults to two batches.
+
+        Yields:
+            Generator[List[Tuple[Basic.Deliver, BasicProperties, bytes]],
+            Any, Any]: The batch of delivered messages.
+        """
+        pending = deque()
+        # Allows the next batch to stream in whilst the current
+        # batch is being processed.
+        self.channel.basic_qos(prefetch_count=prefetch or 2 * size)
+        self.channel.basic_consume(
+            queue=queue.name,
+            on_message_callback=lambda _, *message: pending.append(message),
+            auto_ack=False
+        )
+        while True:
+            # Blocks until the first message of the batch arrives.
+            while not pending:
+                self.conn.process_data_events(time_limit=None)
+            deadline = monotonic() + timeout
+            while len(pending) < size:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                self.conn.process_data_events(time_limit=remaining)
+
+            yield [pending.popleft() for _ in range(min(size, len(pending)))]
+
     @property
     def conn(self) -> connection:
         """
@@ -58,6 +58,14 @@ REWARD_EXCHANGE = Exchange(
     expected_message=FrameMessage
 )
 
+# Collecting the messages shed by bounded queues,
+# or rejected by their consumers, of any message type.
+DEAD_LETTER_EXCHANGE = Exchange(
+    name='dead.letters',
+    exchange_type=ExchangeType.FANOUT,
+    expected_message=RabbitMQModel
+)
+
 # Emitting partial frame data for grouping into the MongoDB
 # database as 'PartialMessage'[s]
 AGGREGATE_EXCHANGE = Exchange(
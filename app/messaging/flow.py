@@ -0,0 +1,158 @@
+from collections import OrderedDict
+from time import monotonic
+from app.messaging import (
+    FLOW_POLICY,
+    FLOW_HIGH_WATER,
+    FLOW_LOW_WATER,
+    FLOW_PROBE_INTERVAL,
+    FLOW_MAX_SLOWDOWN,
+    FlowPolicy,
+)
+
+
+class FlowController:
+    """
+    Paces an emitter by the depth of the queues downstream.
+
+    The backlog starts once the depth reaches the high water mark,
+    and clears once it falls to the low water mark. Whilst it lasts,
+    the emitter slows down, pauses or drops frames, by the policy.
+    The lag behind real-time and the dropped frames are counted.
+
+    Frames are dropped by the stages holding every part of a frame,
+    rather than by each emitter, so a frame is always dropped whole.
+    """
+
+    def __init__(
+            self,
+            policy: FlowPolicy = FLOW_POLICY,
+            high: int = FLOW_HIGH_WATER,
+            low: int = FLOW_LOW_WATER,
+            interval: float = FLOW_PROBE_INTERVAL / 1000,
+            max_slowdown: int = FLOW_MAX_SLOWDOWN,
+            memory: int = 4096
+    ) -> None:
+        """
+        Initialise the controller.
+
+        Args:
+            policy (FlowPolicy, optional): The response to a backlog.
+            high (int, optional): The depth starting the backlog.
+            low (int, optional): The depth clearing the backlog.
+            interval (float, optional): The time (in seconds)
+            between probes of the queue depths.
+            max_slowdown (int, optional): The maximum factor the
+            publish interval is stretched by.
+            memory (int, optional): The number of frames whose
+            decision is remembered, for their later parts.
+        """
+        self.policy = FlowPolicy(policy)
+        self.high = high
+        self.low = low
+        self.interval = interval
+        self.max_slowdown = max_slowdown
+        self.depth = 0
+        self.congested = False
+        self.lag = 0.0
+        self.dropped = 0
+        self.memory = memory
+        self._probed = float('-inf')
+        # The recent decisions, by frame number.
+        self._admitted: OrderedDict[int, bool] = OrderedDict()
+
+    def due(self) -> bool:
+        """
+        If the queue depths should be probed again.
+
+        Returns:
+            bool: If the last probe is older than the interval.
+        """
+        return (
+            self.policy != FlowPolicy.NONE and
+            monotonic() - self._probed >= self.interval
+        )
+
+    def update(self, depth: int) -> None:
+        """
+        Records a probe of the queue depths.
+
+        Args:
+            depth (int): The depth of the deepest queue downstream.
+        """
+        self._probed = monotonic()
+        self.depth = depth
+        if depth >= self.high:
+            self.congested = True
+        elif depth <= self.low:
+            self.congested = False
+
+    @property
+    def paused(self) -> bool:
+        """
+        If the emitter should stop reading frames.
+
+        Returns:
+            bool: If the backlog pauses the emitter.
+        """
+        return self.congested and self.policy == FlowPolicy.PAUSE
+
+    def admit(self, frame_number: int) -> bool:
+        """
+        Decides if a frame is kept. The decision is remembered,
+        so every part of the frame is kept or dropped together.
+
+        Args:
+            frame_number (int): The frame number of the frame.
+
+        Returns:
+            bool: If the frame is kept, otherwise it is dropped.
+        """
+        if frame_number in self._admitted:
+            self._admitted.move_to_end(frame_number)
+            return self._admitted[frame_number]
+        admitted = not (self.congested and self.policy == FlowPolicy.DROP)
+        if not admitted:
+            self.dropped += 1
+        self._admitted[frame_number] = admitted
+        if len(self._admitted) > self.memory:
+            self._admitted.popitem(last=False)
+        return admitted
+
+    def delay(self, base: float) -> float:
+        """
+        The time to wait before the next frame.
+
+        Args:
+            base (float): The time (in seconds) between frames.
+
+        Returns:
+            float: The time to wait, stretched by the backlog
+            under the 'slow' policy.
+        """
+        if self.policy != FlowPolicy.SLOW or self.depth <= self.low:
+            return base
+        factor = min(self.depth / max(self.low, 1), self.max_slowdown)
+        self.lag += base * (factor - 1)
+        return base * factor
+
+    def pause(self) -> float:
+        """
+        The time to wait whilst paused.
+
+        Returns:
+            float: The time (in seconds) until the next probe.
+        """
+        self.lag += self.interval
+        return self.interval
+
+    def report(self) -> str:
+        """
+        Summarises the backlog, lag and dropped frames.
+
+        Returns:
+            str: The summary.
+        """
+        return (
+            f'flow ({self.policy.value}): depth {self.depth}, '
+            f'lag {self.lag:.2f} s, {self.dropped} dropped'
+        )
@@ -0,0 +1,573 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+from types import SimpleNamespace
+from pika.spec import (
+    Basic,
+    BasicProperties,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+from app.messaging import (
+    ExchangeType,
+)
+
+# A routed message: the exchange, routing key, properties and body.
+Message = Tuple[str, str, BasicProperties, bytes]
+# The consumer whose callback the current thread is running.
+local = threading.local()
+
+
+class InMemoryBroker:
+    """
+    Singleton in-process stand-in for the RabbitMQ service.
+
+    Fanout exchanges route to every bound queue, whilst direct
+    (and topic) exchanges route on an exact routing key match.
+    Queues honour their maximum length, overflow and dead letter
+    exchange, but not their message TTL.
+    """
+    _instance = None
+
+    def __new__(cls):
+        """ Method to ensure InMemoryBroker class is singleton """
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._lock = threading.Lock()
+            # The type of each exchange, the queues (and binding keys)
+            # bound to each exchange, the messages of each queue
+            # and the arguments each queue was declared with.
+            cls._instance._exchanges = {}
+            cls._instance._bindings = defaultdict(list)
+            cls._instance._queues = {}
+            cls._instance._arguments = {}
+        return cls._instance
+
+    def declare_exchange(self, name: str, exchange_type: str) -> None:
+        """ Declares the exchange, if it does not exist """
+        with self._lock:
+            self._exchanges.setdefault(name, exchange_type)
+
+    def declare_queue(
+            self,
+            name: str,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> queue.Queue:
+        """ Declares the queue, if it does not exist """
+        with self._lock:
+            self._arguments.setdefault(name, arguments or {})
+            return self._queues.setdefault(name, queue.Queue())
+
+    def bind(self, queue_name: str, exchange: str, routing_key: str) -> None:
+        """ Binds the queue to the exchange """
+        with self._lock:
+            if (queue_name, routing_key) not in self._bindings[exchange]:
+                self._bindings[exchange].append((queue_name, routing_key))
+
+    def route(self, message: Message) -> bool:
+        """
+        Routes the message to the queues bound to its exchange.
+
+        Args:
+            message (Message): The message to route.
+
+        Returns:
+            bool: If no full queue rejected the message.
+        """
+        exchange, routing_key = message[:2]
+        with self._lock:
+            fanout = self._exchanges.get(exchange) == ExchangeType.FANOUT
+            targets = [
+                queue_name
+                for queue_name, key in self._bindings[exchange]
+                if fanout or key == routing_key
+            ]
+        accepted = True
+        for queue_name in targets:
+            target = self._queues[queue_name]
+            arguments = self._arguments[queue_name]
+            limit = arguments.get('x-max-length')
+            if limit and target.qsize() >= limit:
+                if arguments.get('x-overflow') == 'reject-publish':
+                    accepted = False
+                    continue
+                try:
+                    self.dead_letter(
+                        queue_name,
+                        target.get_nowait(),
+                        'maxlen'
+                    )
+                except queue.Empty:
+                    pass
+            target.put(message)
+        return accepted
+
+    def dead_letter(
+            self,
+            queue_name: str,
+            message: Message,
+            reason: str
+    ) -> None:
+        """
+        Routes a message shed by a queue to its dead letter
+        exchange (if any), recording why in the 'x-death' header.
+
+        Args:
+            queue_name (str): The queue that shed the message.
+            message (Message): The shed message.
+            reason (str): Why the message was shed.
+        """
+        exchange = self._arguments[queue_name].get('x-dead-letter-exchange')
+        if not exchange:
+            return
+        _, routing_key, properties, body = message
+        headers = dict(properties.headers or {})
+        headers['x-death'] = [{
+            'queue': queue_name,
+            'reason': reason,
+            'count': 1,
+            'exchange': message[0],
+            'routing-keys': [routing_key],
+        }] + list(headers.get('x-death', []))
+        self.route((
+            exchange,
+            routing_key,
+            BasicProperties(
+                content_type=properties.content_type,
+                headers=headers
+            ),
+            body
+        ))
+
+
+class InMemoryConsumer(threading.Thread):
+    """
+    Delivers the messages of a queue to a consumer callback,
+    on a worker thread of its own. At most 'prefetch' messages
+    are unacknowledged at a time.
+    """
+
+    def __init__(
+            self,
+            channel: 'InMemoryChannel',
+            queue_name: str,
+            messages: queue.Queue,
+            callback: Callable[
+                [Any, Basic.Deliver, BasicProperties, bytes], Any],
+            auto_ack: bool,
+            prefetch: int,
+            tag: str
+    ) -> None:
+        """
+        Initialise the consumer. 'start' begins the deliveries.
+
+        Args:
+            channel (InMemoryChannel): The channel consuming.
+            queue_name (str): The name of the queue.
+            messages (queue.Queue): The messages of the queue.
+            callback (Callable[
+                [Any, Basic.Deliver, BasicProperties, bytes], Any
+            ]): The callback method when a message enters the queue.
+            auto_ack (bool): Acknowledge messages on delivery.
+            prefetch (int): The maximum number of unacknowledged
+            messages, or 0 for no limit.
+            tag (str): The consumer tag.
+        """
+        super().__init__(name=tag, daemon=True)
+        self.channel = channel
+        self.queue_name = queue_name
+        self.messages = messages
+        self.callback = callback
+        self.auto_ack = auto_ack
+        self.tag = tag
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self._credit = (
+            threading.Semaphore(prefetch)
+            if prefetch and not auto_ack else None
+        )
+
+    def release(self) -> None:
+        """ Frees the place of an acknowledged message """
+        if self._credit:
+            self._credit.release()
+
+    def run(self) -> None:
+        """ Delivers messages until the consumer is stopped """
+        local.consumer = self
+        while not self.stopped.is_set():
+            if self._credit and not self._credit.acquire(timeout=0.1):
+                continue
+            try:
+                message = self.messages.get(timeout=0.1)
+            except queue.Empty:
+                self.release()
+                continue
+            exchange, routing_key, properties, body = message
+            method = Basic.Deliver(
+                consumer_tag=self.tag,
+                delivery_tag=self.channel.track(self, message),
+                exchange=exchange,
+                routing_key=routing_key
+            )
+            self.channel.connection.dispatch(
+                self.lock,
+                self.callback,
+                self.channel, method, properties, body
+            )
+
+
+class InMemoryChannel:
+    """
+    In-process stand-in for a pika channel, covering the
+    operations used by 'RabbitMQ' and 'AsyncRabbitMQ'.
+    Operations complete immediately, and their completion
+    callbacks (if any) are dispatched like deliveries.
+    """
+
+    def __init__(self, connection: 'InMemoryConnection') -> None:
+        """
+        Initialise the channel.
+
+        Args:
+            connection (InMemoryConnection): The connection it is over.
+        """
+        self.connection = connection
+        self._broker = InMemoryBroker()
+        self._lock = threading.Lock()
+        self._delivery_tag = 0
+        self._publish_tag = 0
+        self._prefetch = 0
+        self._unacked: Dict[int, Tuple[InMemoryConsumer, Message]] = {}
+        self._confirm: Optional[Callable[[Any], None]] = None
+        self._consumers: List[InMemoryConsumer] = []
+        self._stopped = threading.Event()
+
+    def _done(
+            self,
+            callback: Optional[Callable[..., None]],
+            result: Any = None
+    ) -> Any:
+        """ Dispatches the completion callback of an operation """
+        if callback:
+            self.connection.dispatch(None, callback, result)
+        return result
+
+    def exchange_declare(
+            self,
+            exchange: str,
+            exchange_type: str = ExchangeType.DIRECT,
+            callback: Optional[Callable[..., None]] = None,
+            **_
+    ) -> None:
+        """ Declares the exchange on the broker """
+        self._broker.declare_exchange(exchange, exchange_type)
+        self._done(callback)
+
+    def queue_declare(
+            self,
+            queue: str,
+            arguments: Optional[Dict[str, Any]] = None,
+            callback: Optional[Callable[..., None]] = None,
+            **_
+    ) -> SimpleNamespace:
+        """ Declares the queue on the broker, with its depth """
+        messages = self._broker.declare_queue(queue, arguments)
+        return self._done(
+            callback,
+            SimpleNamespace(
+                method=SimpleNamespace(message_count=messages.qsize())
+            )
+        )
+
+    def queue_bind(
+            self,
+            queue: str,
+            exchange: str,
+            routing_key: Optional[str] = None,
+            callback: Optional[Callable[..., None]] = None,
+            **_
+    ) -> None:
+        """ Binds the queue to the exchange on the broker """
+        # Like RabbitMQ, the queue name is the default binding key.
+        self._broker.bind(
+            queue,
+            exchange,
+            queue if routing_key is None else routing_key
+        )
+        self._done(callback)
+
+    def basic_qos(
+            self,
+            prefetch_count: int = 0,
+            callback: Optional[Callable[..., None]] = None,
+            **_
+    ) -> None:
+        """ Limits the unacknowledged messages of later consumers """
+        self._prefetch = prefetch_count
+        self._done(callback)
+
+    def confirm_delivery(
+            self,
+            ack_nack_callback: Callable[[Any], None],
+            callback: Optional[Callable[..., None]] = None
+    ) -> None:
+        """ Confirms every later publish, once it is routed """
+        self._confirm = ack_nack_callback
+        self._done(callback)
+
+    def basic_publish(
+            self,
+            exchange: str,
+            routing_key: str,
+            body: bytes,
+            properties: Optional[BasicProperties] = None,
+            **_
+    ) -> None:
+        """ Routes the message through the broker """
+        accepted = self._broker.route(
+            (exchange, routing_key, properties or BasicProperties(), body)
+        )
+        if self._confirm:
+            with self._lock:
+                self._publish_tag += 1
+                tag = self._publish_tag
+            confirm = Basic.Ack if accepted else Basic.Nack
+            self.connection.dispatch(
+                None,
+                self._confirm,
+                SimpleNamespace(method=confirm(delivery_tag=tag))
+            )
+
+    def basic_consume(
+            self,
+            queue: str,
+            on_message_callback: Callable[
+                [Any, Basic.Deliver, BasicProperties, bytes], Any],
+            auto_ack: bool = False,
+            callback: Optional[Callable[..., None]] = None,
+            **_
+    ) -> str:
+        """ Starts a consumer, delivering on its own thread """
+        consumer = InMemoryConsumer(
+            self,
+            queue,
+            self._broker.declare_queue(queue),
+            on_message_callback,
+            auto_ack,
+            self._prefetch,
+            f'{queue}-{len(self._consumers)}'
+        )
+        self._consumers.append(consumer)
+        consumer.start()
+        self._done(callback)
+        return consumer.tag
+
+    def track(self, consumer: InMemoryConsumer, message: Message) -> int:
+        """
+        Assigns the delivery tag of a message, keeping the
+        message until it is acknowledged.
+
+        Args:
+            consumer (InMemoryConsumer): The consumer receiving it.
+            message (Message): The delivered message.
+
+        Returns:
+            int: The delivery tag.
+        """
+        with self._lock:
+            self._delivery_tag += 1
+            if not consumer.auto_ack:
+                self._unacked[self._delivery_tag] = (consumer, message)
+            return self._delivery_tag
+
+    def _settle(
+            self,
+            delivery_tag: int,
+            multiple: bool
+    ) -> List[Tuple[InMemoryConsumer, Message]]:
+        """
+        Removes the settled messages from the unacknowledged.
+        Stages in one process share the 'RabbitMQ' channel, so
+        'multiple' only covers the messages of the same consumer.
+        """
+        with self._lock:
+            tags = [delivery_tag]
+            if multiple and delivery_tag in self._unacked:
+                owner = self._unacked[delivery_tag][0]
+                tags = [
+                    tag
+                    for tag, (consumer, _) in self._unacked.items()
+                    if tag <= delivery_tag and consumer is owner
+                ]
+            settled = [
+                self._unacked.pop(tag)
+                for tag in tags
+                if tag in self._unacked
+            ]
+        for consumer, _ in settled:
+            consumer.release()
+        return settled
+
+    def basic_ack(
+            self,
+            delivery_tag: int = 0,
+            multiple: bool = False
+    ) -> None:
+        """ Acknowledges the delivered messages """
+        self._settle(delivery_tag, multiple)
+
+    def basic_nack(
+            self,
+            delivery_tag: int = 0,
+            multiple: bool = False,
+            requeue: bool = True
+    ) -> None:
+        """ Rejects the delivered messages """
+        for consumer, message in self._settle(delivery_tag, multiple):
+            if requeue:
+                consumer.messages.put(message)
+            else:
+                self._broker.dead_letter(
+                    consumer.queue_name,
+                    message,
+                    'rejected'
+                )
+
+    def start_consuming(self) -> None:
+        """ Blocks, as consumers deliver on their own threads """
+        self._stopped.wait()
+
+    def stop_consuming(self) -> None:
+        """ Stops every consumer on the channel """
+        for consumer in self._consumers:
+            consumer.stopped.set()
+        self._stopped.set()
+
+
+class InMemoryConnection:
+    """
+    In-process stand-in for a pika connection, to the singleton
+    'InMemoryBroker'. This runs the pipeline without a RabbitMQ
+    service, for profiling the pipeline within a single process.
+
+    Callbacks are run on the thread of the delivering consumer,
+    one at a time per consumer, or on the event loop if given.
+    Timers run under the lock of the consumer that set them, so
+    they never overlap with that consumer's callbacks.
+    """
+
+    def __init__(
+            self,
+            loop: Optional[asyncio.AbstractEventLoop] = None,
+            on_close_callback: Optional[Callable[..., None]] = None
+    ) -> None:
+        """
+        Initialise the connection.
+
+        Args:
+            loop (Optional[asyncio.AbstractEventLoop], optional):
+            The event loop to run callbacks on.
+            on_close_callback (Optional[Callable[..., None]], optional):
+            Called once the connection is closed.
+        """
+        self._loop = loop
+        self._on_close = on_close_callback
+        self._lock = threading.RLock()
+        self._delivered = threading.Condition()
+        # The number of callbacks dispatched, and the number each
+        # thread has seen, so a wait never misses a delivery made
+        # since the thread last processed events.
+        self._deliveries = 0
+        self._seen = threading.local()
+        self._channels: List[InMemoryChannel] = []
+        self.is_closed = False
+
+    def dispatch(
+            self,
+            lock: Optional[threading.Lock],
+            callback: Callable[..., Any],
+            *args: Any
+    ) -> None:
+        """
+        Runs a callback, as pika would on the connection's thread.
+
+        Args:
+            lock (Optional[threading.Lock]): The lock of the consumer
+            the callback belongs to.
+            callback (Callable[..., Any]): The callback to run.
+        """
+        if self._loop:
+            self._loop.call_soon_threadsafe(callback, *args)
+        else:
+            with lock or self._lock:
+                callback(*args)
+        with self._delivered:
+            self._deliveries += 1
+            self._delivered.notify_all()
+
+    def channel(
+            self,
+            on_open_callback: Optional[Callable[..., None]] = None
+    ) -> InMemoryChannel:
+        """ Opens a channel over the connection """
+        channel = InMemoryChannel(self)
+        self._channels.append(channel)
+        if on_open_callback:
+            self.dispatch(None, on_open_callback, channel)
+        return channel
+
+    def process_data_events(self, time_limit: Optional[float] = 0) -> None:
+        """
+        Waits for a delivery, as the consumers deliver themselves.
+        Returns at once if a callback ran since the last call.
+        """
+        with self._delivered:
+            if time_limit != 0:
+                self._delivered.wait_for(
+                    lambda: (
+                        self._deliveries !=
+                        getattr(self._seen, 'deliveries', 0)
+                    ),
+                    time_limit
+                )
+            self._seen.deliveries = self._deliveries
+
+    def call_later(
+            self,
+            delay: float,
+            callback: Callable[[], None]
+    ) -> threading.Timer:
+        """ Runs the callback after the delay (in seconds) """
+        consumer = getattr(local, 'consumer', None)
+        timer = threading.Timer(
+            delay,
+            self.dispatch,
+            (consumer.lock if consumer else None, callback)
+        )
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def remove_timeout(self, timer: threading.Timer) -> None:
+        """ Cancels a callback set by 'call_later' """
+        timer.cancel()
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        """ Runs the callback, from any thread """
+        self.dispatch(None, callback)
+
+    def close(self) -> None:
+        """ Stops every consumer and closes the connection """
+        for channel in self._channels:
+            channel.stop_consuming()
+        self.is_closed = True
+        if self._on_close:
+            self.dispatch(None, self._on_close, self, None)
@@ -4,10 +4,12 @@ from pydantic import (
     model_validator
 )
 from typing import (
+    ClassVar,
     Self,
     Optional
 )
 from app.config import Decision
+from app.messaging import ContentType
 
 
 class RabbitMQModel(BaseModel):
@@ -19,6 +21,8 @@ class RabbitMQModel(BaseModel):
         BaseModel: Pydantic Base Model.
     """
     model_config = ConfigDict(extra='forbid')
+    # The codec used to carry the message.
+    content_type: ClassVar[ContentType] = ContentType.JSON
 
 
 class LogMessage(RabbitMQModel):
@@ -29,9 +33,10 @@ class LogMessage(RabbitMQModel):
 
 class FrameMessage(RabbitMQModel):
     """ Represent complete frame data """
+    content_type: ClassVar[ContentType] = ContentType.FRAME
     frame_number: int
-    streamed_frame: str
-    reference_frame: str
+    streamed_frame: bytes
+    reference_frame: bytes
     latency: float
 
 
@@ -47,9 +52,10 @@ class DecisionMessage(RabbitMQModel):
 
 class PartialMessage(RabbitMQModel):
     """ Represent partial message for frame data """
+    content_type: ClassVar[ContentType] = ContentType.FRAME
     frame_number: int
-    streamed_frame: Optional[str] = None
-    reference_frame: Optional[str] = None
+    streamed_frame: Optional[bytes] = None
+    reference_frame: Optional[bytes] = None
     latency: Optional[float] = None
 
     @model_validator(mode='after')
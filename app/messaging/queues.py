@@ -1,11 +1,27 @@
-from dataclasses import dataclass
+from dataclasses import (
+    dataclass,
+    replace,
+)
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
 from app.messaging import (
+    SORT_PARTITIONS,
+    QUEUE_MAX_LENGTH,
+    QUEUE_TTL,
+    QUEUE_OVERFLOW,
+    DEAD_LETTER_MAX_LENGTH,
+    Overflow,
     Exchange,
     FILE_EXCHNAGE,
     AGGREGATE_EXCHANGE,
     REWARD_EXCHANGE,
     LOGS_EXCHANGE,
-    DECISION_EXCHANGE
+    DECISION_EXCHANGE,
+    DEAD_LETTER_EXCHANGE,
 )
 
 
@@ -14,11 +30,86 @@ class Queue:
     """
     Mapping to Queues in RabbitMQ.
     Stores the Exchange to bind to.
+
+    A partitioned queue stands for 'partitions' queues, each with
+    its own name and routing key. Messages are routed to the
+    partition of their key, so messages sharing a key always
+    reach the same consumer.
+
+    A bounded queue holds at most 'max_length' messages, each for
+    at most 'ttl' milliseconds. Messages shed by the bound, and
+    messages rejected by the consumer, go to the 'dead_letter'
+    exchange (if any).
     """
     name: str
     routing: str
     exchange: Exchange
     exclusive: bool = True
+    partitions: int = 1
+    max_length: Optional[int] = None
+    ttl: Optional[int] = None
+    overflow: Overflow = Overflow.DROP_HEAD
+    dead_letter: Optional[Exchange] = None
+
+    @property
+    def arguments(self) -> Dict[str, Any]:
+        """
+        The RabbitMQ arguments declaring the queue's bounds.
+
+        Returns:
+            Dict[str, Any]: The optional queue arguments.
+        """
+        arguments: Dict[str, Any] = {}
+        if self.max_length:
+            arguments['x-max-length'] = self.max_length
+            arguments['x-overflow'] = Overflow(self.overflow).value
+        if self.ttl:
+            arguments['x-message-ttl'] = self.ttl
+        if self.dead_letter:
+            arguments['x-dead-letter-exchange'] = self.dead_letter.name
+        return arguments
+
+    def partition(self, index: int) -> 'Queue':
+        """
+        The queue of a partition.
+
+        Args:
+            index (int): The index of the partition.
+
+        Returns:
+            Queue: The queue of the partition, or this queue
+            if it is not partitioned.
+        """
+        if self.partitions == 1:
+            return self
+        return replace(
+            self,
+            name=f'{self.name}.{index}',
+            routing=f'{self.routing}.{index}',
+            partitions=1
+        )
+
+    def route(self, key: int) -> 'Queue':
+        """
+        The queue of the partition a key belongs to.
+
+        Args:
+            key (int): The partition key, such as the frame number.
+
+        Returns:
+            Queue: The queue of the key's partition.
+        """
+        return self.partition(key % self.partitions)
+
+    @property
+    def shards(self) -> List['Queue']:
+        """
+        The queues of every partition.
+
+        Returns:
+            List[Queue]: The queues, in partition order.
+        """
+        return [self.partition(index) for index in range(self.partitions)]
 
 
 # Receive file paths to extract stream frames.
@@ -42,18 +133,34 @@ LATENCY_QUEUE = Queue(
     exchange=FILE_EXCHNAGE
 )
 
-# Receive partial frame data to aggregate.
+# Receive partial frame data to aggregate, partitioned
+# by frame number over the sorter workers.
+# Probed by the emitters for flow control, so it is not exclusive.
+# Unbounded, as each deduplicated frame is only defined once, and
+# shedding its definition would orphan every later reference.
+# The emitters' flow control bounds it instead.
 AGGREGATE_QUEUE = Queue(
     name='aggregate.frames',
     routing='sort',
-    exchange=AGGREGATE_EXCHANGE
+    exchange=AGGREGATE_EXCHANGE,
+    exclusive=False,
+    partitions=SORT_PARTITIONS,
+    dead_letter=DEAD_LETTER_EXCHANGE
 )
 
 # Receive complete frame data to calculate reward.
+# Shared by every reward worker, so it is not exclusive.
+# Its frames are references to the blob store, so shedding
+# them loses those frames alone.
 REWARD_QUEUE = Queue(
     name='calculate.reward',
     routing='reward',
-    exchange=REWARD_EXCHANGE
+    exchange=REWARD_EXCHANGE,
+    exclusive=False,
+    max_length=QUEUE_MAX_LENGTH,
+    ttl=QUEUE_TTL,
+    overflow=QUEUE_OVERFLOW,
+    dead_letter=DEAD_LETTER_EXCHANGE
 )
 
 # Recieve log messages.
@@ -76,3 +183,17 @@ RELAY_QUEUE = Queue(
     routing='switch',
     exchange=DECISION_EXCHANGE
 )
+
+# Receive the messages shed by the reward queue, and
+# the messages rejected by the frame consumers.
+# Bounded itself, so shed frames cannot pile up either.
+DEAD_LETTER_QUEUE = Queue(
+    name='dead.letters',
+    routing='',
+    exchange=DEAD_LETTER_EXCHANGE,
+    exclusive=False,
+    max_length=DEAD_LETTER_MAX_LENGTH
+)
+
+# The queues whose depth throttles the emitters.
+FLOW_QUEUES = (*AGGREGATE_QUEUE.shards, REWARD_QUEUE)
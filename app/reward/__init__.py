@@ -0,0 +1,77 @@
+# flake8: noqa
+
+from app.reward.config import (
+    CACHE_SIZE,
+    CACHE_FOLDER,
+    CACHE_DISK_SIZE,
+    CACHE_REPORT_INTERVAL,
+    FEATURE_STORE,
+    PRECOMPUTE_WORKERS,
+    PRECOMPUTE_BATCH,
+    SIMILARITY_BACKEND,
+    SIMILARITY_LAYER,
+    SIMILARITY_SIZE,
+    PSNR_CAP,
+    BENCHMARK_FRAMES,
+    BENCHMARK_BATCH,
+    INFERENCE_ENGINE,
+    INFERENCE_PRECISION,
+    CHANNELS_LAST,
+    CALIBRATION_FRAMES,
+    Engine,
+    Precision,
+)
+
+from app.reward.cache import (
+    KEY_SIZE,
+    frame_key,
+    FeatureCache,
+)
+
+from app.reward.store import (
+    FeatureStore,
+    write_store,
+)
+
+from app.reward.preprocess import (
+    REDUCED_DECODING,
+    Preprocessor,
+)
+
+from app.reward.extractor import (
+    device,
+    preprocess,
+    transform,
+    limit_threads,
+    load_vgg,
+    extract_features,
+)
+
+from app.reward.benchmark import (
+    sample_frames,
+    rank_correlation,
+    throughput,
+)
+
+from app.reward.engine import (
+    InferenceEngine,
+    quantize,
+    build_engine,
+)
+
+from app.reward.backends import (
+    cosine_similarity,
+    batch_cosine_similarity,
+    calibrate,
+    SimilarityBackend,
+    FeatureBackend,
+    VGGBackend,
+    PooledVGGBackend,
+    PixelBackend,
+    SSIMBackend,
+    PSNRBackend,
+    BACKENDS,
+    is_feature_backend,
+    backend_layer,
+    get_backend,
+)
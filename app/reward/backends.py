@@ -0,0 +1,525 @@
+import os
+import cv2
+import numpy as np
+import torch
+from functools import partial
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from app.utils import (
+    bytes_to_image,
+    check_image,
+)
+from app.reward import (
+    FeatureCache,
+    FeatureStore,
+    frame_key,
+    load_vgg,
+    extract_features,
+    build_engine,
+    CACHE_SIZE,
+    CACHE_FOLDER,
+    CACHE_DISK_SIZE,
+    FEATURE_STORE,
+    INFERENCE_PRECISION,
+    SIMILARITY_LAYER,
+    SIMILARITY_SIZE,
+    PSNR_CAP,
+)
+
+
+def cosine_similarity(
+        vec1: np.ndarray,
+        vec2: np.ndarray
+) -> float:
+    """
+    Calculate the similarity between frames.
+    This calculation is often done between the streamed
+    and the reference frames.
+
+    Args:
+        vec1 (np.ndarray): Frame to compare.
+        vec2 (np.ndarray): Frame to compare with.
+
+    Returns:
+        float: Cosine similarity of the frames.
+    """
+    return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+
+
+def batch_cosine_similarity(
+        vecs1: np.ndarray,
+        vecs2: np.ndarray
+) -> np.ndarray:
+    """
+    Calculate the row-wise similarity between two batches
+    of frame features.
+
+    Args:
+        vecs1 (np.ndarray): Frames to compare, one row per frame.
+        vecs2 (np.ndarray): Frames to compare with, one row per frame.
+
+    Returns:
+        np.ndarray: Cosine similarity of each pair of frames.
+    """
+    return np.einsum('ij,ij->i', vecs1, vecs2) / (
+        np.linalg.norm(vecs1, axis=1) * np.linalg.norm(vecs2, axis=1)
+    )
+
+
+def calibrate(
+        baseline: torch.nn.Module,
+        optimised: torch.nn.Module,
+        streamed: List[np.ndarray],
+        reference: List[np.ndarray]
+) -> Tuple[float, float]:
+    """
+    Measures how far the cosine similarity of an optimised
+    feature extractor drifts from the float32 baseline.
+
+    Args:
+        baseline (torch.nn.Module): The float32 feature extractor.
+        optimised (torch.nn.Module): The optimised feature extractor.
+        streamed (List[np.ndarray]): The decoded streamed frames.
+        reference (List[np.ndarray]): The matching reference frames.
+
+    Returns:
+        Tuple[float, float]: The mean and maximum absolute drift
+        of the similarity.
+    """
+    def similarity(model: torch.nn.Module) -> np.ndarray:
+        return batch_cosine_similarity(
+            extract_features(model, streamed),
+            extract_features(model, reference)
+        )
+
+    drift = np.abs(similarity(optimised) - similarity(baseline))
+    return float(drift.mean()), float(drift.max())
+
+
+class SimilarityBackend(ABC):
+    """ Scores the similarity of streamed and reference frames """
+    name: str
+
+    @abstractmethod
+    def similarity(
+            self,
+            streamed: List[bytes],
+            reference: List[bytes]
+    ) -> np.ndarray:
+        """
+        Scores each pair of streamed and reference frames.
+
+        Args:
+            streamed (List[bytes]): The encoded streamed frames.
+            reference (List[bytes]): The encoded reference frames.
+
+        Returns:
+            np.ndarray: The similarity of each pair of frames.
+        """
+
+    def report(self) -> str:
+        """
+        Summary of the backend counters, if it keeps any.
+
+        Returns:
+            str: The summary, or an empty string.
+        """
+        return ''
+
+
+class FeatureBackend(SimilarityBackend):
+    """
+    Scores similarity as the cosine similarity of frame features.
+
+    Features are looked up in the feature store, then the feature
+    cache. Only the frames missing from both are decoded and
+    passed through the model.
+    """
+
+    def __init__(
+            self,
+            cache: Optional[FeatureCache] = None,
+            store: Optional[FeatureStore] = None
+    ) -> None:
+        """
+        Initialise the backend.
+
+        Args:
+            cache (Optional[FeatureCache], optional): The cache of
+            previously extracted features.
+            store (Optional[FeatureStore], optional): The features
+            precomputed offline with this backend.
+        """
+        self.cache = cache
+        self.store = store
+
+    @abstractmethod
+    def extract(self, frames: List[Union[bytes, np.ndarray]]) -> np.ndarray:
+        """
+        Runs the model over the frames.
+
+        Args:
+            frames (List[Union[bytes, np.ndarray]]): The encoded frames,
+            or frames already decoded to BGR arrays.
+
+        Returns:
+            np.ndarray: extracted features, one row per frame.
+        """
+
+    def features(self, frames: List[bytes]) -> np.ndarray:
+        """
+        Retrieves the features of the encoded frames.
+
+        Args:
+            frames (List[bytes]): The encoded frames.
+
+        Raises:
+            StaleFrameError: If a shared memory frame was overwritten.
+
+        Returns:
+            np.ndarray: The features, one row per frame.
+        """
+        keys = [frame_key(frame) for frame in frames]
+        features = {
+            key: self.store.get(key) if self.store else None
+            for key in set(keys)
+        }
+        if self.cache:
+            for key, value in features.items():
+                if value is None:
+                    features[key] = self.cache.get(key)
+        missing = {
+            key: frame
+            for key, frame in zip(keys, frames)
+            if features[key] is None
+        }
+        if missing:
+            extracted = self.extract(list(missing.values()))
+            for key, row in zip(missing, extracted):
+                if self.cache:
+                    self.cache.put(key, row.copy())
+                features[key] = row
+        return np.stack([features[key] for key in keys])
+
+    def similarity(
+            self,
+            streamed: List[bytes],
+            reference: List[bytes]
+    ) -> np.ndarray:
+        """ Cosine similarity of the streamed and reference features """
+        streamed_features, reference_features = np.split(
+            self.features(streamed + reference), 2
+        )
+        return batch_cosine_similarity(
+            streamed_features,
+            reference_features
+        )
+
+    def report(self) -> str:
+        """ Summary of the feature cache and store counters """
+        reports = []
+        if self.cache:
+            reports.append(str(self.cache))
+        if self.store:
+            reports.append(f'feature store: {self.store.hits} hits')
+        return ', '.join(reports)
+
+
+class VGGBackend(FeatureBackend):
+    """
+    Features of the VGG16 convolutional layers.
+    The network can be truncated to trade accuracy for speed.
+    """
+
+    def __init__(self, layer: Optional[int] = None) -> None:
+        """
+        Initialise the backend, loading the model.
+
+        Args:
+            layer (Optional[int], optional): The number of feature
+            layers to keep. The full network is used if not provided.
+        """
+        super().__init__()
+        model = load_vgg()
+        self.model = build_engine(model[:layer] if layer else model)
+
+    def extract(self, frames: List[Union[bytes, np.ndarray]]) -> np.ndarray:
+        """ Flattened feature maps of the model """
+        return extract_features(self.model, frames)
+
+
+class PooledVGGBackend(VGGBackend):
+    """
+    Global-average-pooled features of the VGG16 convolutional
+    layers. This gives a short vector per frame that is cheap
+    to cache and compare.
+    """
+
+    def extract(self, frames: List[Union[bytes, np.ndarray]]) -> np.ndarray:
+        """ Feature maps of the model, averaged per channel """
+        return extract_features(self.model, frames, pool=True)
+
+
+class PixelBackend(SimilarityBackend):
+    """
+    Scores similarity directly on the pixels of the frames.
+    Frames are resized to a common size and compared as a batch.
+    """
+
+    def __init__(self, size: int = SIMILARITY_SIZE) -> None:
+        """
+        Initialise the backend.
+
+        Args:
+            size (int, optional): The side length to resize frames to.
+        """
+        self.size = size
+
+    def decode(self, frames: List[bytes]) -> np.ndarray:
+        """
+        Decodes and resizes the frames into a single array.
+
+        Args:
+            frames (List[bytes]): The encoded frames.
+
+        Raises:
+            StaleFrameError: If a shared memory frame was overwritten
+            whilst it was being resized.
+
+        Returns:
+            np.ndarray: The frames, stacked along the first axis.
+        """
+        resized = []
+        for frame in frames:
+            resized.append(cv2.resize(
+                bytes_to_image(frame),
+                (self.size, self.size),
+                interpolation=cv2.INTER_AREA
+            ))
+            # The decoded frame may be a view of a frame ring.
+            check_image(frame)
+        return np.stack(resized)
+
+    @abstractmethod
+    def compare(
+            self,
+            streamed: np.ndarray,
+            reference: np.ndarray
+    ) -> np.ndarray:
+        """
+        Scores each pair of decoded frames.
+
+        Args:
+            streamed (np.ndarray): The streamed frames.
+            reference (np.ndarray): The reference frames.
+
+        Returns:
+            np.ndarray: The similarity of each pair of frames.
+        """
+
+    def similarity(
+            self,
+            streamed: List[bytes],
+            reference: List[bytes]
+    ) -> np.ndarray:
+        """ Compares the decoded streamed and reference frames """
+        return self.compare(self.decode(streamed), self.decode(reference))
+
+
+class SSIMBackend(PixelBackend):
+    """
+    Structural similarity of the greyscale frames.
+
+    The whole batch is filtered at once by stacking the frames
+    as the channels of a single image.
+    """
+    # Constants from the original SSIM definition.
+    C1 = (0.01 * 255) ** 2
+    C2 = (0.03 * 255) ** 2
+    # OpenCV filters images of up to 512 channels.
+    CHANNELS = 512
+
+    def _blur(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Gaussian blur of every frame in the batch.
+
+        Args:
+            frames (np.ndarray): The frames, as (height, width, count).
+
+        Returns:
+            np.ndarray: The blurred frames.
+        """
+        return np.concatenate([
+            cv2.GaussianBlur(
+                np.ascontiguousarray(
+                    frames[..., start:start + self.CHANNELS]
+                ),
+                (11, 11),
+                1.5
+            ).reshape(*frames.shape[:2], -1)
+            for start in range(0, frames.shape[-1], self.CHANNELS)
+        ], axis=-1)
+
+    def compare(
+            self,
+            streamed: np.ndarray,
+            reference: np.ndarray
+    ) -> np.ndarray:
+        """ Mean SSIM of each pair of frames """
+        def grey(frames: np.ndarray) -> np.ndarray:
+            weights = np.array([0.114, 0.587, 0.299], np.float32)
+            return np.ascontiguousarray(
+                (frames.astype(np.float32) @ weights).transpose(1, 2, 0)
+            )
+
+        x, y = grey(streamed), grey(reference)
+        mu_x, mu_y = self._blur(x), self._blur(y)
+        var_x = self._blur(x * x) - mu_x * mu_x
+        var_y = self._blur(y * y) - mu_y * mu_y
+        covar = self._blur(x * y) - mu_x * mu_y
+        ssim = (
+            (2 * mu_x * mu_y + self.C1) * (2 * covar + self.C2) /
+            ((mu_x ** 2 + mu_y ** 2 + self.C1) * (var_x + var_y + self.C2))
+        )
+        return ssim.mean(axis=(0, 1))
+
+
+class PSNRBackend(PixelBackend):
+    """
+    Peak signal-to-noise ratio of the frames, scaled so that
+    PSNR_CAP (or more) scores 1 and identical frames score 1.
+    """
+
+    def __init__(
+            self,
+            cap: float = PSNR_CAP,
+            size: int = SIMILARITY_SIZE
+    ) -> None:
+        """
+        Initialise the backend.
+
+        Args:
+            cap (float, optional): The PSNR (in dB) that scores 1.
+            size (int, optional): The side length to resize frames to.
+        """
+        super().__init__(size)
+        self.cap = cap
+
+    def compare(
+            self,
+            streamed: np.ndarray,
+            reference: np.ndarray
+    ) -> np.ndarray:
+        """ Scaled PSNR of each pair of frames """
+        error = (
+            streamed.astype(np.float32) - reference.astype(np.float32)
+        ) ** 2
+        mse = error.reshape(len(error), -1).mean(axis=1)
+        with np.errstate(divide='ignore'):
+            psnr = 10 * np.log10((255.0 ** 2) / mse)
+        return np.minimum(psnr, self.cap) / self.cap
+
+
+# The similarity backends, by name.
+BACKENDS: Dict[str, Callable[[], SimilarityBackend]] = {
+    'vgg': VGGBackend,
+    'vgg-truncated': partial(VGGBackend, layer=SIMILARITY_LAYER),
+    'vgg-pooled': PooledVGGBackend,
+    'ssim': SSIMBackend,
+    'psnr': PSNRBackend,
+}
+
+
+def is_feature_backend(name: str) -> bool:
+    """
+    Checks if the backend scores similarity from frame features,
+    without loading the backend.
+
+    Args:
+        name (str): The name of the backend.
+
+    Returns:
+        bool: True if the backend is a feature backend.
+    """
+    factory = BACKENDS[name]
+    return issubclass(getattr(factory, 'func', factory), FeatureBackend)
+
+
+def backend_layer(name: str) -> Optional[int]:
+    """
+    Retrieves the number of feature layers the backend keeps,
+    without loading the backend.
+
+    Args:
+        name (str): The name of the backend.
+
+    Returns:
+        Optional[int]: The number of layers kept, or None if the
+        full network is used.
+    """
+    return getattr(BACKENDS[name], 'keywords', {}).get('layer')
+
+
+def get_backend(
+        name: str,
+        cached: bool = True
+) -> SimilarityBackend:
+    """
+    Builds the similarity backend from its name.
+
+    Feature backends are given the feature cache and, if it was
+    precomputed with the same backend, layer and inference
+    precision, the feature store. Features differ between layers
+    and precisions, so the cache is kept apart for each of them.
+
+    Args:
+        name (str): The name of the backend.
+        cached (bool, optional): Attach the feature cache and store.
+
+    Raises:
+        ValueError: If the backend does not exist.
+
+    Returns:
+        SimilarityBackend: The similarity backend.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f'Unknown Similarity Backend: {name}')
+    backend = BACKENDS[name]()
+    backend.name = name
+    if not cached or not isinstance(backend, FeatureBackend):
+        return backend
+
+    layer = backend_layer(name)
+    store = FeatureStore(FEATURE_STORE) if FEATURE_STORE else None
+    if store and (store.backend, store.layer, store.precision) == (
+        name,
+        layer,
+        INFERENCE_PRECISION
+    ):
+        backend.store = store
+    # Each backend, layer and precision has its own disk tier,
+    # as the features differ.
+    folder = None
+    if CACHE_FOLDER:
+        folder = os.path.join(
+            CACHE_FOLDER,
+            name,
+            f'layer{layer}' if layer else 'full',
+            INFERENCE_PRECISION
+        )
+    backend.cache = FeatureCache(
+        size=CACHE_SIZE,
+        folder=folder,
+        disk_size=CACHE_DISK_SIZE
+    )
+    return backend
@@ -0,0 +1,111 @@
+import os
+import numpy as np
+from time import perf_counter
+from typing import (
+    Callable,
+    List,
+    Tuple,
+)
+from app.config import (
+    Files,
+)
+from app.utils import (
+    get_resource,
+    read_data,
+    source_files,
+)
+
+
+def sample_frames(
+        folder: str,
+        count: int
+) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Samples pairs of streamed and reference frames, spread
+    evenly across the sources of the video folder.
+
+    Args:
+        folder (str): The base video folder.
+        count (int): The number of frame pairs to sample.
+
+    Returns:
+        Tuple[List[np.ndarray], List[np.ndarray]]: The streamed
+        frames and the matching reference frames.
+    """
+    sources = sorted({os.path.dirname(path) for path in source_files(folder)})
+    per_source = max(1, -(-count // max(1, len(sources))))
+    streamed, reference = [], []
+    for source in sources:
+        streamed_video = get_resource(
+            os.path.join(folder, source, Files.STREAMED.value), None
+        )
+        reference_video = get_resource(
+            os.path.join(folder, source, Files.REFERENCE.value), None
+        )
+        for _ in range(per_source):
+            streamed_read, streamed_frame = read_data(streamed_video)
+            reference_read, reference_frame = read_data(reference_video)
+            if not (streamed_read and reference_read):
+                break
+            streamed.append(streamed_frame)
+            reference.append(reference_frame)
+        streamed_video.release()
+        reference_video.release()
+    return streamed[:count], reference[:count]
+
+
+def rank_correlation(
+        values1: np.ndarray,
+        values2: np.ndarray
+) -> float:
+    """
+    Spearman rank correlation of two sets of scores.
+    Tied scores, such as capped PSNR scores, share their
+    average rank, so ties do not add a correlation.
+
+    Args:
+        values1 (np.ndarray): The scores to compare.
+        values2 (np.ndarray): The scores to compare with.
+
+    Returns:
+        float: The rank correlation, between -1 and 1. This is
+        NaN if either set of scores is constant.
+    """
+    def rank(values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values)
+        order = np.argsort(values, kind='stable')
+        ordered = values[order]
+        # The first position of each run of tied scores.
+        starts = np.r_[True, ordered[1:] != ordered[:-1]]
+        first = np.flatnonzero(starts)
+        counts = np.diff(np.r_[first, len(values)])
+        ranks = np.empty(len(values))
+        ranks[order] = (first + (counts - 1) / 2)[np.cumsum(starts) - 1]
+        return ranks
+
+    return float(np.corrcoef(rank(values1), rank(values2))[0, 1])
+
+
+def throughput(
+        func: Callable[[int, int], object],
+        count: int,
+        batch: int
+) -> float:
+    """
+    Measures how many items per second a batched function handles.
+    The first batch is run once beforehand as a warm up.
+
+    Args:
+        func (Callable[[int, int], object]): Function processing the
+        items between the start and end index.
+        count (int): The number of items.
+        batch (int): The number of items per call.
+
+    Returns:
+        float: The items processed per second.
+    """
+    func(0, min(batch, count))
+    start = perf_counter()
+    for index in range(0, count, batch):
+        func(index, min(index + batch, count))
+    return count / (perf_counter() - start)
@@ -0,0 +1,259 @@
+import os
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from numpy.lib.format import open_memmap
+from typing import (
+    Dict,
+    Optional,
+    Union,
+)
+from app.utils import (
+    frame_content,
+)
+
+# The size (in bytes) of the frame content hash.
+KEY_SIZE = 16
+
+
+def frame_key(payload: Union[str, bytes]) -> bytes:
+    """
+    Content hash of an encoded frame.
+    Identical frames always map to the same key. Shared memory
+    frames are hashed by their pixels, not their ring handle.
+
+    Args:
+        payload (Union[str, bytes]): The encoded frame, as carried
+        in the frame messages.
+
+    Raises:
+        StaleFrameError: If a shared memory frame was overwritten.
+
+    Returns:
+        bytes: The hash of the encoded frame.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode('ascii')
+    return hashlib.blake2b(
+        frame_content(payload),
+        digest_size=KEY_SIZE
+    ).digest()
+
+
+class DiskTier:
+    """
+    Memory-mapped feature store that survives restarts.
+
+    Features are written into a fixed number of slots which are
+    reused in a round robin fashion, so the files never grow
+    beyond 'capacity' feature vectors.
+    """
+
+    def __init__(self, folder: str, capacity: int) -> None:
+        """
+        Opens the on-disk tier. The feature files are only
+        created once the size of a feature vector is known.
+
+        Args:
+            folder (str): The folder holding the memory-mapped files.
+            capacity (int): The number of feature vectors to hold.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self._folder = folder
+        self._capacity = capacity
+        self._index: Dict[bytes, int] = {}
+        self._keys = None
+        self._features = None
+        self._cursor = None
+        if os.path.exists(self._path('features')):
+            self._open()
+
+    def _path(self, name: str) -> str:
+        """ The path of a memory-mapped file in the folder """
+        return os.path.join(self._folder, f'{name}.npy')
+
+    def _open(self) -> None:
+        """ Opens the existing files and rebuilds the key index """
+        self._keys = open_memmap(self._path('keys'), mode='r+')
+        self._features = open_memmap(self._path('features'), mode='r+')
+        self._cursor = open_memmap(self._path('cursor'), mode='r+')
+        # Files written with a different capacity are discarded.
+        if len(self._keys) != self._capacity:
+            self._features = None
+            return
+        self._index = {
+            key.tobytes(): slot
+            for slot, key in enumerate(self._keys)
+            if key.any()
+        }
+
+    def _create(self, size: int) -> None:
+        """
+        Creates the memory-mapped files.
+
+        Args:
+            size (int): The size of a single feature vector.
+        """
+        self._keys = open_memmap(
+            self._path('keys'),
+            mode='w+',
+            dtype=np.uint8,
+            shape=(self._capacity, KEY_SIZE)
+        )
+        self._features = open_memmap(
+            self._path('features'),
+            mode='w+',
+            dtype=np.float32,
+            shape=(self._capacity, size)
+        )
+        self._cursor = open_memmap(
+            self._path('cursor'),
+            mode='w+',
+            dtype=np.int64,
+            shape=(1,)
+        )
+        self._index = {}
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """
+        Retrieves the features for the key, if they exist.
+
+        Args:
+            key (bytes): The frame content hash.
+
+        Returns:
+            Optional[np.ndarray]: A copy of the stored features.
+        """
+        slot = self._index.get(key)
+        if slot is None:
+            return None
+        return np.array(self._features[slot])
+
+    def put(self, key: bytes, features: np.ndarray) -> None:
+        """
+        Stores the features for the key, overwriting the
+        oldest slot once the tier is full.
+
+        Args:
+            key (bytes): The frame content hash.
+            features (np.ndarray): The features to store.
+        """
+        if (
+            self._features is None or
+            self._features.shape[1] != features.size
+        ):
+            self._create(features.size)
+        slot = int(self._cursor[0]) % self._capacity
+        self._index.pop(self._keys[slot].tobytes(), None)
+        # The key is written last, so a partially written
+        # slot is never indexed after a restart.
+        self._keys[slot] = 0
+        self._features[slot] = features.ravel()
+        self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+        self._cursor[0] += 1
+        self._index[key] = slot
+
+
+class FeatureCache:
+    """
+    Two tier cache of the extracted frame features.
+
+    The in-memory tier is a bounded LRU cache. The optional
+    on-disk tier is memory-mapped and survives restarts.
+    """
+
+    def __init__(
+            self,
+            size: int,
+            folder: Optional[str] = None,
+            disk_size: int = 0
+    ) -> None:
+        """
+        Initialise the cache.
+
+        Args:
+            size (int): The number of feature vectors held in memory.
+            folder (Optional[str], optional): The folder of the on-disk
+            tier. The tier is disabled if not provided.
+            disk_size (int, optional): The number of feature vectors
+            held on disk.
+        """
+        self._size = size
+        self._memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._disk = DiskTier(folder, disk_size) if folder else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: bytes, features: np.ndarray) -> None:
+        """ Places the features in the in-memory tier """
+        self._memory[key] = features
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """
+        Retrieves the features for the key.
+        Features found on disk are promoted to memory.
+
+        Args:
+            key (bytes): The frame content hash.
+
+        Returns:
+            Optional[np.ndarray]: The features, if cached.
+        """
+        features = self._memory.get(key)
+        if features is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return features
+        if self._disk:
+            features = self._disk.get(key)
+            if features is not None:
+                self._remember(key, features)
+                self.hits += 1
+                self.disk_hits += 1
+                return features
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, features: np.ndarray) -> None:
+        """
+        Stores the features for the key in every tier.
+
+        Args:
+            key (bytes): The frame content hash.
+            features (np.ndarray): The features to cache.
+        """
+        self._remember(key, features)
+        if self._disk:
+            self._disk.put(key, features)
+
+    @property
+    def lookups(self) -> int:
+        """
+        The number of lookups made against the cache.
+
+        Returns:
+            int: The sum of the hits and misses.
+        """
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The fraction of lookups answered by the cache.
+
+        Returns:
+            float: The hit rate, or 0 if no lookups were made.
+        """
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def __str__(self) -> str:
+        """ Summary of the cache counters """
+        return (
+            f'feature cache: {self.hits} hits '
+            f'({self.disk_hits} from disk), {self.misses} misses, '
+            f'{self.hit_rate:.1%} hit rate'
+        )
@@ -0,0 +1,81 @@
+import os
+from enum import Enum
+
+# The number of feature vectors held in memory
+# by the feature cache.
+CACHE_SIZE = int(os.getenv('FEATURE_CACHE_SIZE', 1024))
+
+# The folder holding the on-disk tier of the
+# feature cache. The tier is disabled if unset.
+CACHE_FOLDER = os.getenv('FEATURE_CACHE')
+
+# The number of feature vectors held on disk
+# by the feature cache.
+CACHE_DISK_SIZE = int(os.getenv('FEATURE_CACHE_DISK_SIZE', 16384))
+
+# The number of cache lookups between each
+# report of the cache statistics.
+CACHE_REPORT_INTERVAL = int(os.getenv('FEATURE_CACHE_REPORT', 1000))
+
+# The folder holding the precomputed feature store.
+# The store is not consulted if unset.
+FEATURE_STORE = os.getenv('FEATURE_STORE')
+
+# The number of processes used to precompute
+# the feature store.
+PRECOMPUTE_WORKERS = int(os.getenv('PRECOMPUTE_WORKERS', os.cpu_count()))
+
+# The number of frames passed through the model
+# at once whilst precomputing the feature store.
+PRECOMPUTE_BATCH = int(os.getenv('PRECOMPUTE_BATCH', 16))
+
+# The metric used to score the similarity of the
+# streamed and reference frames.
+SIMILARITY_BACKEND = os.getenv('SIMILARITY', 'vgg')
+
+# The number of VGG16 feature layers kept by
+# the truncated VGG similarity backend.
+SIMILARITY_LAYER = int(os.getenv('SIMILARITY_LAYER', 16))
+
+# The side length frames are resized to before
+# the SSIM and PSNR similarity is measured.
+SIMILARITY_SIZE = int(os.getenv('SIMILARITY_SIZE', 224))
+
+# The PSNR (in dB) treated as identical frames
+# by the PSNR similarity backend.
+PSNR_CAP = float(os.getenv('PSNR_CAP', 50.0))
+
+# The number of frame pairs sampled from the
+# video folder by the benchmarks.
+BENCHMARK_FRAMES = int(os.getenv('BENCHMARK_FRAMES', 256))
+
+# The number of frame pairs scored at once
+# by the benchmarks.
+BENCHMARK_BATCH = int(os.getenv('BENCHMARK_BATCH', 16))
+
+# The execution engine used for model inference.
+INFERENCE_ENGINE = os.getenv('INFERENCE_ENGINE', 'eager')
+
+# The numeric precision used for model inference.
+INFERENCE_PRECISION = os.getenv('INFERENCE_PRECISION', 'fp32')
+
+# Run inference with the channels_last memory layout.
+CHANNELS_LAST = os.getenv('CHANNELS_LAST', '0') == '1'
+
+# The number of frame pairs used to calibrate
+# and check the inference engine.
+CALIBRATION_FRAMES = int(os.getenv('CALIBRATION_FRAMES', 32))
+
+
+class Engine(str, Enum):
+    """ Defines the model execution engines """
+    EAGER = 'eager'
+    SCRIPT = 'script'
+    COMPILE = 'compile'
+
+
+class Precision(str, Enum):
+    """ Defines the model inference precisions """
+    FP32 = 'fp32'
+    BF16 = 'bf16'
+    INT8 = 'int8'
@@ -0,0 +1,157 @@
+import numpy as np
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import (
+    prepare_fx,
+    convert_fx,
+)
+from typing import (
+    List,
+    Optional,
+)
+from app.config import (
+    VIDEO_FOLDER,
+)
+from app.reward import (
+    Engine,
+    Precision,
+    INFERENCE_ENGINE,
+    INFERENCE_PRECISION,
+    CHANNELS_LAST,
+    CALIBRATION_FRAMES,
+    device,
+    preprocess,
+    sample_frames,
+)
+
+
+class InferenceEngine(torch.nn.Module):
+    """
+    Wraps a feature extractor with the CPU inference options.
+    The output is always float32, whatever the precision.
+    """
+
+    def __init__(
+            self,
+            model: torch.nn.Module,
+            precision: Precision,
+            channels_last: bool
+    ) -> None:
+        """
+        Initialise the engine.
+
+        Args:
+            model (torch.nn.Module): The feature extractor.
+            precision (Precision): The inference precision.
+            channels_last (bool): Use the channels_last memory layout.
+        """
+        super().__init__()
+        self.model = model
+        self.precision = precision
+        self.channels_last = channels_last
+
+    def forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """
+        Runs the feature extractor over the batch.
+
+        Args:
+            batch (torch.Tensor): The preprocessed frames.
+
+        Returns:
+            torch.Tensor: The float32 features.
+        """
+        if self.channels_last:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        if self.precision == Precision.BF16:
+            with torch.autocast(device.type, dtype=torch.bfloat16):
+                return self.model(batch).float()
+        return self.model(batch)
+
+
+def quantize(
+        model: torch.nn.Module,
+        calibration: torch.Tensor
+) -> torch.nn.Module:
+    """
+    Quantizes the model weights and activations to int8.
+
+    Dynamic quantization only covers linear and recurrent layers,
+    so the convolutional extractor is statically quantized instead,
+    with the activation ranges observed on the calibration frames.
+
+    Args:
+        model (torch.nn.Module): The float32 feature extractor.
+        calibration (torch.Tensor): Preprocessed calibration frames.
+
+    Returns:
+        torch.nn.Module: The int8 feature extractor (CPU only).
+    """
+    prepared = prepare_fx(
+        model.cpu().eval(),
+        get_default_qconfig_mapping('x86'),
+        example_inputs=(calibration[:1],)
+    )
+    with torch.no_grad():
+        prepared(calibration)
+    return convert_fx(prepared)
+
+
+def build_engine(
+        model: torch.nn.Module,
+        engine: str = INFERENCE_ENGINE,
+        precision: str = INFERENCE_PRECISION,
+        channels_last: bool = CHANNELS_LAST,
+        calibration: Optional[List[np.ndarray]] = None
+) -> torch.nn.Module:
+    """
+    Applies the inference options to the feature extractor.
+
+    Args:
+        model (torch.nn.Module): The float32 feature extractor.
+        engine (str, optional): The execution engine.
+        precision (str, optional): The inference precision.
+        channels_last (bool, optional): Use the channels_last layout.
+        calibration (Optional[List[np.ndarray]], optional): Decoded
+        frames to calibrate int8 quantization with. Frames are sampled
+        from the video folder if not provided.
+
+    Raises:
+        ValueError: If the engine or precision does not exist.
+
+    Returns:
+        torch.nn.Module: The feature extractor, with the same inputs
+        and outputs as the original model.
+    """
+    engine, precision = Engine(engine), Precision(precision)
+    if (
+        engine == Engine.EAGER and
+        precision == Precision.FP32 and
+        not channels_last
+    ):
+        return model
+
+    if precision == Precision.INT8:
+        if calibration is None:
+            streamed, reference = sample_frames(
+                VIDEO_FOLDER,
+                CALIBRATION_FRAMES
+            )
+            calibration = streamed + reference
+        model = quantize(model, preprocess(calibration))
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+
+    wrapped = InferenceEngine(model, precision, channels_last).eval()
+    if engine == Engine.SCRIPT:
+        # Quantized models only run on the CPU.
+        example = torch.rand(
+            1, 3, 224, 224,
+            device='cpu' if precision == Precision.INT8 else device
+        )
+        with torch.no_grad():
+            traced = torch.jit.trace(wrapped, example)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    if engine == Engine.COMPILE:
+        # Batches vary in size, so avoid recompiling for each size.
+        return torch.compile(wrapped, dynamic=True)
+    return wrapped
@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+import torch
+import torchvision.models as models
+import torchvision.transforms as transforms
+from torchvision.models import VGG16_Weights
+from typing import (
+    List,
+    Union,
+)
+from app.reward import (
+    Preprocessor,
+)
+
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# Decodes and resizes frames into the model input.
+preprocess = Preprocessor(224)
+
+# The original PIL based preprocessing, kept for comparison.
+transform = transforms.Compose([
+    transforms.ToPILImage(),
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+])
+
+
+def limit_threads(threads: int) -> None:
+    """
+    Limits the threads used for inference in this process, so
+    that several workers can share the host without contention.
+
+    Args:
+        threads (int): The number of threads to use.
+    """
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    cv2.setNumThreads(threads)
+
+
+def load_vgg() -> torch.nn.Module:
+    """
+    Loads the pretrained VGG16 feature extractor.
+
+    Returns:
+        torch.nn.Module: The convolutional part of VGG16,
+        ready for inference.
+    """
+    return models.vgg16(
+        weights=VGG16_Weights.IMAGENET1K_V1
+    ).features.to(device).eval()
+
+
+def extract_features(
+        model: torch.nn.Module,
+        frames: List[Union[bytes, np.ndarray]],
+        pool: bool = False
+) -> np.ndarray:
+    """
+    Extract features from several frames with a single
+    forward pass of the model.
+
+    Args:
+        model (torch.nn.Module): The feature extractor.
+        frames (List[Union[bytes, np.ndarray]]): The encoded frames,
+        or frames already decoded to BGR arrays.
+        pool (bool, optional): Global-average-pool each feature
+        map into a single value per channel.
+
+    Returns:
+        np.ndarray: extracted features, one row per frame.
+    """
+    batch = preprocess(frames).to(device)
+    with torch.no_grad():
+        features = model(batch)
+        if pool:
+            features = features.mean(dim=(2, 3))
+    return features.cpu().numpy().reshape(len(frames), -1)
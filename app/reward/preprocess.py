@@ -0,0 +1,119 @@
+import cv2
+import numpy as np
+import torch
+from typing import (
+    List,
+    Union,
+)
+from app.utils import (
+    bytes_to_image,
+    image_size,
+    check_image,
+)
+
+# The decoding flags for each size reduction factor.
+REDUCED_DECODING = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class Preprocessor:
+    """
+    Turns frames into the model input without any PIL images.
+
+    Frames are decoded at the smallest size that still covers the
+    model input, as read from the frame's header, resized straight
+    into a reused batch buffer and converted to an RGB float tensor
+    scaled to [0, 1].
+    """
+
+    def __init__(self, size: int = 224) -> None:
+        """
+        Initialise the preprocessor.
+
+        Args:
+            size (int, optional): The side length of the model input.
+        """
+        self.size = size
+        self._buffer = np.empty((0, size, size, 3), np.uint8)
+
+    def _reserve(self, count: int) -> np.ndarray:
+        """
+        Retrieves a batch buffer for 'count' frames.
+        The buffer only grows, so it is allocated rarely.
+
+        Args:
+            count (int): The number of frames in the batch.
+
+        Returns:
+            np.ndarray: The batch buffer.
+        """
+        if len(self._buffer) < count:
+            self._buffer = np.empty(
+                (max(count, 2 * len(self._buffer)), self.size, self.size, 3),
+                np.uint8
+            )
+        return self._buffer[:count]
+
+    def decode(self, frame: bytes) -> np.ndarray:
+        """
+        Decodes the frame at a reduced size, where possible.
+
+        The reduction is chosen from the size in the frame's header,
+        so every frame is decoded the same way, whatever its order.
+        Frames without a size in their header are decoded in full.
+
+        Args:
+            frame (bytes): The encoded frame.
+
+        Returns:
+            np.ndarray: The decoded BGR frame.
+        """
+        size = image_size(frame)
+        reduction = 1
+        if size is not None:
+            reduction = max(
+                factor
+                for factor in REDUCED_DECODING
+                if factor == 1 or min(size) // factor >= self.size
+            )
+        return bytes_to_image(frame, REDUCED_DECODING[reduction])
+
+    def __call__(
+            self,
+            frames: List[Union[bytes, np.ndarray]]
+    ) -> torch.Tensor:
+        """
+        Preprocesses a batch of frames.
+
+        Args:
+            frames (List[Union[bytes, np.ndarray]]): The encoded frames,
+            or frames already decoded to BGR arrays.
+
+        Raises:
+            StaleFrameError: If a shared memory frame was overwritten
+            whilst it was being preprocessed.
+
+        Returns:
+            torch.Tensor: The float batch, as (count, 3, size, size).
+        """
+        buffer = self._reserve(len(frames))
+        for slot, frame in zip(buffer, frames):
+            image = frame
+            if not isinstance(frame, np.ndarray):
+                image = self.decode(frame)
+            cv2.resize(
+                image,
+                (self.size, self.size),
+                dst=slot,
+                interpolation=cv2.INTER_LINEAR
+            )
+            if not isinstance(frame, np.ndarray):
+                # The decoded frame may be a view of a frame ring.
+                check_image(frame)
+            cv2.cvtColor(slot, cv2.COLOR_BGR2RGB, dst=slot)
+        # The permuted batch is left in the channels_last layout.
+        return torch.from_numpy(buffer).permute(0, 3, 1, 2).float().div_(255)
@@ -0,0 +1,166 @@
+import os
+import json
+import numpy as np
+from numpy.lib.format import open_memmap
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+from app.reward import (
+    KEY_SIZE,
+)
+
+# The files making up a feature store.
+FEATURES_FILE = 'features.npy'
+KEYS_FILE = 'keys.npy'
+INDEX_FILE = 'index.json'
+
+
+class FeatureStore:
+    """
+    Read-only store of precomputed frame features.
+
+    The features of every frame are held in a single float16
+    array. The offset index records which rows belong to each
+    source file, and the keys map frame content hashes to rows.
+    The index also records the backend, layer and inference
+    precision the features were computed with.
+    """
+
+    def __init__(self, folder: str) -> None:
+        """
+        Opens the feature store. The features are memory-mapped,
+        so only the rows that are looked up are read from disk.
+
+        Args:
+            folder (str): The folder holding the feature store.
+        """
+        self._features = np.load(
+            os.path.join(folder, FEATURES_FILE),
+            mmap_mode='r'
+        )
+        keys = np.load(os.path.join(folder, KEYS_FILE))
+        self._rows: Dict[bytes, int] = {
+            key.tobytes(): row
+            for row, key in enumerate(keys)
+        }
+        with open(os.path.join(folder, INDEX_FILE)) as file:
+            index = json.load(file)
+        self.backend: str = index.get('backend', 'vgg')
+        self.layer: Optional[int] = index.get('layer')
+        self.precision: str = index.get('precision', 'fp32')
+        self._index: Dict[str, Tuple[int, int]] = {
+            entry['path']: (entry['offset'], entry['count'])
+            for entry in index['files']
+        }
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """
+        Retrieves the features of a frame by its content hash.
+
+        Args:
+            key (bytes): The frame content hash.
+
+        Returns:
+            Optional[np.ndarray]: The features, if precomputed.
+        """
+        row = self._rows.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._features[row].astype(np.float32)
+
+    def file_features(self, path: str) -> np.ndarray:
+        """
+        Retrieves the features of every frame of a source file.
+
+        Args:
+            path (str): The source file, relative to the video folder.
+
+        Raises:
+            KeyError: If the file is not in the store.
+
+        Returns:
+            np.ndarray: The features, one row per frame.
+        """
+        offset, count = self._index[path]
+        return self._features[offset:offset + count]
+
+    def __len__(self) -> int:
+        """ The number of frames in the store """
+        return len(self._features)
+
+
+def write_store(
+        folder: str,
+        shards: List[Tuple[str, str]],
+        backend: str,
+        layer: Optional[int],
+        precision: str
+) -> None:
+    """
+    Writes a feature store from per-file shards.
+
+    Each shard is a '.npz' file holding the 'keys' and 'features'
+    of every frame of one source file. Shards are copied into the
+    store one at a time, so the store never needs to fit in memory.
+
+    Args:
+        folder (str): The folder to write the feature store to.
+        shards (List[Tuple[str, str]]): The source file (relative to
+        the video folder) and shard path, for each source file.
+        backend (str): The similarity backend the features belong to.
+        layer (Optional[int]): The number of feature layers the
+        backend keeps, or None for the full network.
+        precision (str): The inference precision of the features.
+    """
+    os.makedirs(folder, exist_ok=True)
+    counts = []
+    size = 0
+    for _, shard in shards:
+        with np.load(shard) as data:
+            counts.append(len(data['keys']))
+            if len(data['keys']):
+                size = data['features'].shape[1]
+
+    total = sum(counts)
+    features = open_memmap(
+        os.path.join(folder, FEATURES_FILE),
+        mode='w+',
+        dtype=np.float16,
+        shape=(total, size)
+    )
+    keys = open_memmap(
+        os.path.join(folder, KEYS_FILE),
+        mode='w+',
+        dtype=np.uint8,
+        shape=(total, KEY_SIZE)
+    )
+    entries = []
+    offset = 0
+    for (path, shard), count in zip(shards, counts):
+        with np.load(shard) as data:
+            features[offset:offset + count] = data['features']
+            keys[offset:offset + count] = data['keys']
+        entries.append({'path': path, 'offset': offset, 'count': count})
+        offset += count
+    features.flush()
+    keys.flush()
+
+    with open(os.path.join(folder, INDEX_FILE), 'w') as file:
+        json.dump(
+            {
+                'backend': backend,
+                'layer': layer,
+                'precision': precision,
+                'size': size,
+                'files': entries
+            },
+            file,
+            indent=2
+        )
@@ -1,17 +1,43 @@
 # flake8: noqa
 
+from app.utils.ring import (
+    StaleFrameError,
+    FrameRing,
+    write_frame,
+    read_frame,
+    check_frame,
+)
+
+from app.utils.dedup import (
+    DEFINE_TAG,
+    REFERENCE_TAG,
+    frame_digest,
+    split_frame,
+    store_frame,
+    Deduplicator,
+    BlobCache,
+)
+
 from app.utils.payload import (
     dict_to_bytes,
     bytes_to_dict,
     image_to_str,
     str_to_image,
-    simplify
+    image_to_bytes,
+    bytes_to_image,
+    image_size,
+    frame_content,
+    check_image,
+    simplify,
+    simplify_batch
 )
 
 from app.utils.boilerplate import (
     setup_consumer,
+    setup_batch_consumer,
+    setup_async_consumer,
     update_path,
-    setup_publisher
+    setup_async_publisher,
 )
 
 from app.utils.state import (
@@ -24,4 +50,22 @@ from app.utils.resource import (
     get_resource,
     check_resource,
     read_data,
-)
\ No newline at end of file
+    source_files,
+)
+
+from app.utils.supervisor import (
+    supervise,
+)
+
+from app.utils.writer import (
+    WriteBehind,
+)
+
+from app.utils.join import (
+    StreamJoin,
+)
+
+from app.utils.window import (
+    Window,
+    WindowEngine,
+)
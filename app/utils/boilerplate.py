@@ -1,17 +1,30 @@
 import os
 import sys
+import asyncio
+import logging
 from app.utils import (
     PathHolder,
     FrameCount,
     simplify,
+    simplify_batch,
 )
 from app.messaging import (
     RabbitMQ,
+    AsyncRabbitMQ,
+    Acknowledger,
+    FlowController,
     RabbitMQModel,
     Queue,
+    LogMessage,
     PathMessage,
     PartialMessage,
-    AGGREGATE_QUEUE
+    AGGREGATE_QUEUE,
+    FLOW_QUEUES,
+    LOGS_EXCHANGE,
+    PUBLISH_REPORT_INTERVAL,
+    CONSUMER_PREFETCH,
+    ACK_BATCH_SIZE,
+    ACK_INTERVAL,
 )
 from app.config import (
     Files,
@@ -20,15 +33,13 @@ from typing import (
     TypeVar,
     Callable,
     Type,
+    List,
     Any,
     Union,
     Tuple,
+    Optional,
 )
-from time import sleep as wait
 
-path_holder = PathHolder()
-rabbit_mq = RabbitMQ()
-counter = FrameCount()
 T = TypeVar('T')
 
 
@@ -37,12 +48,22 @@ def setup_consumer(
         subscribe_queue: Queue,
         callback: Callable[[RabbitMQModel], Any],
         expected_format: Type[RabbitMQModel],
-        ack: bool = True
+        ack: bool = True,
+        manual_ack: bool = False,
+        prefetch: int = CONSUMER_PREFETCH,
+        ack_every: int = ACK_BATCH_SIZE,
+        ack_interval: int = ACK_INTERVAL
 ) -> None:
     """
     This method helps abstract the RabbitMQ
     boilerplate code to set up the consumer.
 
+    With 'manual_ack', messages are acknowledged once the callback
+    completes, in batches of 'ack_every' or every 'ack_interval'
+    milliseconds, and rejected if the callback raises. At most
+    'prefetch' messages are then held by the consumer, bounding
+    its memory.
+
     Args:
         client (RabbitMQ): The RabbitMQ client.
 
@@ -55,12 +76,31 @@ def setup_consumer(
         message, expected by the callback method.
 
         ack (bool, optional) = True: RabbitMQ queue acknowledgement.
+        Messages are acknowledged by the broker on delivery.
+
+        manual_ack (bool, optional) = False: Acknowledge messages
+        once the callback completes, in place of 'ack'.
+
+        prefetch (int, optional): The maximum number of
+        unacknowledged messages held by this consumer,
+        with 'manual_ack'.
+
+        ack_every (int, optional): The number of completed
+        messages acknowledged together.
+
+        ack_interval (int, optional): The maximum time (in
+        milliseconds) a completed message waits to be acknowledged.
     """
     client.declare_queue_exchange(subscribe_queue)
+    handler = simplify(callback, expected_format)
+    if manual_ack:
+        acknowledger = Acknowledger(client, ack_every, ack_interval / 1000)
+        handler = acknowledger.wrap(handler)
     client.consume(
         queue=subscribe_queue,
-        on_message_callback=simplify(callback, expected_format),
-        auto_ack=ack
+        callback=handler,
+        ack=ack and not manual_ack,
+        prefetch=prefetch if manual_ack else None
     )
     # Stops consuming once program is exited.
     try:
@@ -72,6 +112,155 @@ def setup_consumer(
             os._exit(0)
 
 
+def setup_batch_consumer(
+        client: RabbitMQ,
+        subscribe_queue: Queue,
+        callback: Callable[[List[RabbitMQModel]], Any],
+        expected_format: Type[RabbitMQModel],
+        size: int,
+        timeout: int,
+        prefetch: Optional[int] = None
+) -> None:
+    """
+    This method helps abstract the RabbitMQ boilerplate
+    code to set up a consumer that processes messages in batches.
+
+    Messages are collected until 'size' have arrived or 'timeout'
+    milliseconds have passed, and are then handed to the callback
+    together. The batch is acknowledged once the callback returns,
+    and rejected (to the queue's dead letter exchange) if it raises,
+    so a failing batch is not redelivered forever.
+
+    Args:
+        client (RabbitMQ): The RabbitMQ client.
+
+        subscribe_queue (Queue): The queue this node subscribes to.
+
+        callback (Callable[[List[RabbitMQModel]], Any]): Callback method
+        when a batch of messages has been collected.
+
+        expected_format (Type[RabbitMQModel]): The format of each
+        message, expected by the callback method.
+
+        size (int): The maximum number of messages in a batch.
+
+        timeout (int): The maximum time (in milliseconds) to wait
+        for a batch to fill.
+
+        prefetch (Optional[int], optional): The maximum number of
+        unacknowledged messages held by this consumer.
+    """
+    client.declare_queue_exchange(subscribe_queue)
+    handler = simplify_batch(callback, expected_format)
+    handler = Acknowledger(client, 1, 0).wrap_batch(handler)
+    # Stops consuming once program is exited.
+    try:
+        for batch in client.consume_batch(
+            queue=subscribe_queue,
+            size=size,
+            timeout=timeout / 1000,
+            prefetch=prefetch
+        ):
+            handler(batch)
+    except KeyboardInterrupt:
+        try:
+            sys.exit(0)
+        except SystemExit:
+            os._exit(0)
+
+
+async def setup_async_consumer(
+        client: AsyncRabbitMQ,
+        subscribe_queue: Queue,
+        callback: Callable[[RabbitMQModel], Any],
+        expected_format: Type[RabbitMQModel],
+        ack: bool = True,
+        manual_ack: bool = False,
+        prefetch: int = CONSUMER_PREFETCH
+) -> None:
+    """
+    The asyncio variant of 'setup_consumer'.
+
+    This returns once consuming has started, and messages are
+    then handled on the event loop. Callbacks may be coroutines,
+    which are run as tasks. With 'manual_ack', each message is
+    acknowledged once its callback, or task, completes and rejected
+    if it raises. Tasks complete out of order, so messages are
+    acknowledged one at a time.
+
+    Args:
+        client (AsyncRabbitMQ): The connected asyncio RabbitMQ client.
+
+        subscribe_queue (Queue): The queue this node subscribes to.
+
+        callback (Callable[[RabbitMQModel], Any]): Callback method
+        when the queue receives data.
+
+        expected_format (Type[RabbitMQModel]): The format of the
+        message, expected by the callback method.
+
+        ack (bool, optional) = True: RabbitMQ queue acknowledgement.
+        Messages are acknowledged by the broker on delivery.
+
+        manual_ack (bool, optional) = False: Acknowledge messages
+        once the callback completes, in place of 'ack'.
+
+        prefetch (int, optional): The maximum number of
+        unacknowledged messages held by this consumer,
+        with 'manual_ack'.
+    """
+    handler = simplify(callback, expected_format)
+    # Keeps the callback tasks alive until they complete.
+    tasks = set()
+
+    def settle(
+            channel: Any,
+            method: Any,
+            error: Optional[BaseException]
+    ) -> None:
+        if not manual_ack:
+            return
+        if error is None:
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            return
+        logging.getLogger('KURF_SIMULATION').error(
+            f'Rejected Message From {method.routing_key}',
+            exc_info=error
+        )
+        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+    def on_message(channel: Any, method: Any, *message: Any) -> None:
+        try:
+            result = handler(channel, method, *message)
+        except Exception as error:
+            if not manual_ack:
+                raise
+            settle(channel, method, error)
+            return
+        if not asyncio.iscoroutine(result):
+            settle(channel, method, None)
+            return
+        task = asyncio.ensure_future(result)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        task.add_done_callback(
+            lambda done: settle(
+                channel,
+                method,
+                asyncio.CancelledError() if done.cancelled()
+                else done.exception()
+            )
+        )
+
+    await client.declare_queue_exchange(subscribe_queue)
+    await client.consume(
+        queue=subscribe_queue,
+        callback=on_message,
+        ack=ack and not manual_ack,
+        prefetch=prefetch if manual_ack else None
+    )
+
+
 def update_path(
         path_holder: PathHolder,
         file: Files
@@ -99,22 +288,34 @@ def update_path(
     return wrapper
 
 
-def setup_publisher(
+async def setup_async_publisher(
+        client: AsyncRabbitMQ,
         resource: Callable[[str, Union[T, None]], Union[T, None]],
         read_data: Callable[[T], Tuple[bool, Any]],
         get_message: Callable[[FrameCount, Any], PartialMessage],
         handle_read_failure: Callable[[T], None] = None,
-        resource_hook: Callable[[T], bool] = None
+        resource_hook: Callable[[T], bool] = None,
+        name: str = ''
 ) -> None:
     """
     Boilerplate to set up the publisher nodes.
-    This method is often ran as a separate daemon thread.
 
     This is a tightly bound publisher helper that abstracts away
     common logic between the 'latency', 'reference' and 'streamed'
-    emitters.
+    emitters. It publishes on the event loop, over the same
+    connection as the node's consumer, so no publishing thread is
+    needed. Messages are published with confirms, and the publishing
+    statistics are logged every PUBLISH_REPORT_INTERVAL messages.
+
+    Publishing is paced by the depth of the FLOW_QUEUES, so the
+    emitters slow down or pause (by the FLOW_POLICY) whilst the
+    stages downstream fall behind. Under the 'drop' policy, the
+    emitters keep reading in real-time, and the sorter or the
+    stream join drops whole frames instead.
 
     Args:
+        client (AsyncRabbitMQ): The connected asyncio RabbitMQ client.
+
         resource (Callable[[str, Union[T, None]], Union[T, None]]): Method to
         retrieve the resource.
 
@@ -129,26 +330,47 @@ def setup_publisher(
 
         resource_hook (Callable[[T], bool], optional): Method to handle failure
         in accessing a resource.
+
+        name (str, optional): The name of the node's path holder
+        and frame counter.
     """
+    path_holder, counter = PathHolder(name), FrameCount(name)
+    flow = FlowController()
     current_path = path_holder.path
     source = resource(current_path, None)
 
     while True:
+        if flow.due():
+            flow.update(max([
+                await client.queue_depth(queue)
+                for queue in FLOW_QUEUES
+            ]))
+        if flow.paused:
+            await asyncio.sleep(flow.pause())
+            continue
         path_snapshot = path_holder.path
         if path_snapshot:
             if current_path != path_snapshot:
                 current_path = path_snapshot
                 source = resource(current_path, source)
             if resource_hook and not resource_hook(source):
-                wait(0.25)
+                await asyncio.sleep(0.25)
                 continue
             succeeded, result = read_data(source)
             if handle_read_failure and not succeeded:
                 handle_read_failure(source)
+                # Yields, so path updates are still consumed.
+                await asyncio.sleep(0)
                 continue
-            rabbit_mq.publish_to_queue(
-                AGGREGATE_QUEUE,
+            await client.publish_to_queue(
+                AGGREGATE_QUEUE.route(counter.count),
                 get_message(counter, result)
             )
             counter.increment()
-        wait(0.01)
+            if counter.count % PUBLISH_REPORT_INTERVAL == 0:
+                report = f'{client.report()}, {flow.report()}'
+                await client.publish(
+                    LOGS_EXCHANGE,
+                    LogMessage(terminal_message=report, file_message=report)
+                )
+        await asyncio.sleep(flow.delay(0.01))
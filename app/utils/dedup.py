@@ -0,0 +1,206 @@
+import hashlib
+from collections import OrderedDict
+from time import monotonic
+from typing import (
+    Callable,
+    Hashable,
+    Optional,
+    Tuple,
+)
+from app.database import (
+    BlobStore,
+)
+
+# The tags of deduplicated frames. These are clear of the codec
+# tags, which follow them in the defined frames.
+DEFINE_TAG = 0x80
+REFERENCE_TAG = 0x81
+# The size (in bytes) of the frame digest.
+DIGEST_SIZE = 16
+
+
+def frame_digest(frame: bytes) -> bytes:
+    """
+    Content hash of an encoded frame.
+
+    Args:
+        frame (bytes): The encoded frame.
+
+    Returns:
+        bytes: The digest of the frame.
+    """
+    return hashlib.blake2b(frame, digest_size=DIGEST_SIZE).digest()
+
+
+class Deduplicator:
+    """
+    Replaces frames that were already sent with their digest.
+
+    The first time a frame is sent it is defined, as its digest
+    followed by the frame. Afterwards it is sent as a reference,
+    holding only the digest. The digests of the last 'size'
+    distinct frames are remembered. With a 'ttl', frames are
+    defined again once their definition is older than it, so
+    a frame is never referenced after it expired from the store.
+
+    Frames are defined once per scope, such as the partition
+    they are routed to, so each consumer of a partition receives
+    the definition before the references that follow.
+    """
+
+    def __init__(self, size: int, ttl: Optional[float] = None) -> None:
+        """
+        Initialise the deduplicator.
+
+        Args:
+            size (int): The number of digests to remember.
+            Deduplication is disabled if this is 0.
+            ttl (Optional[float], optional): The time (in seconds)
+            a definition is referenced for.
+        """
+        self.size = size
+        self.ttl = ttl
+        # When each frame was last defined.
+        self._sent: OrderedDict[Tuple[Hashable, bytes], float] = (
+            OrderedDict()
+        )
+
+    def __call__(self, frame: bytes, scope: Hashable = None) -> bytes:
+        """
+        Deduplicates an encoded frame.
+
+        Args:
+            frame (bytes): The encoded frame.
+            scope (Hashable, optional): The scope the frame is
+            defined in, such as the routing key of its partition.
+
+        Returns:
+            bytes: The defined or referenced frame.
+        """
+        if not self.size:
+            return frame
+        digest = frame_digest(frame)
+        now = monotonic()
+        defined = self._sent.get((scope, digest))
+        if defined is not None and (
+            self.ttl is None or now - defined < self.ttl
+        ):
+            self._sent.move_to_end((scope, digest))
+            return bytes([REFERENCE_TAG]) + digest
+        self._sent.pop((scope, digest), None)
+        self._sent[(scope, digest)] = now
+        if len(self._sent) > self.size:
+            self._sent.popitem(last=False)
+        return bytes([DEFINE_TAG]) + digest + frame
+
+
+def split_frame(payload: bytes) -> Tuple[bytes, Optional[bytes]]:
+    """
+    Splits a frame into its reference and the frame,
+    so the frame can be stored once and referenced thereafter.
+
+    Args:
+        payload (bytes): The frame, as sent by the emitters.
+
+    Returns:
+        Tuple[bytes, Optional[bytes]]: The reference and the frame.
+        References are returned as they are, without a frame.
+        Frames that are not deduplicated are referenced by their
+        digest, so they are stored the same way.
+    """
+    if payload[0] == REFERENCE_TAG:
+        return payload, None
+    if payload[0] != DEFINE_TAG:
+        return bytes([REFERENCE_TAG]) + frame_digest(payload), payload
+    digest = payload[1:1 + DIGEST_SIZE]
+    return bytes([REFERENCE_TAG]) + digest, payload[1 + DIGEST_SIZE:]
+
+
+def store_frame(store: BlobStore, frame: bytes) -> bytes:
+    """
+    Stores frames sent by the emitters in the blob store,
+    so each frame is only stored once.
+
+    Args:
+        store (BlobStore): The blob store.
+        frame (bytes): The frame, as sent by the emitters.
+
+    Returns:
+        bytes: The reference to the frame, to store in its place.
+    """
+    reference, blob = split_frame(frame)
+    if blob is not None:
+        # The reference holds the digest after its tag.
+        store.put(reference[1:], blob)
+    return reference
+
+
+class BlobCache:
+    """
+    Bounded LRU cache resolving deduplicated frames.
+    Referenced frames missing from the cache are fetched.
+    """
+
+    def __init__(
+            self,
+            size: int,
+            fetch: Callable[[bytes], Optional[bytes]]
+    ) -> None:
+        """
+        Initialise the cache.
+
+        Args:
+            size (int): The maximum size (in bytes) of cached frames.
+            fetch (Callable[[bytes], Optional[bytes]]): Retrieves
+            the frame of a digest, or None if it is unknown.
+        """
+        self.size = size
+        self._fetch = fetch
+        self._blobs: OrderedDict[bytes, bytes] = OrderedDict()
+        self._stored = 0
+        self.hits = 0
+        self.fetches = 0
+
+    def _add(self, digest: bytes, frame: bytes) -> None:
+        """ Caches the frame, evicting the least recently used """
+        if digest in self._blobs:
+            self._blobs.move_to_end(digest)
+            return
+        self._blobs[digest] = frame
+        self._stored += len(frame)
+        while self._stored > self.size and self._blobs:
+            _, evicted = self._blobs.popitem(last=False)
+            self._stored -= len(evicted)
+
+    def resolve(self, payload: bytes) -> bytes:
+        """
+        Resolves a frame to its encoding.
+
+        Args:
+            payload (bytes): The frame, as sent by the emitters.
+
+        Raises:
+            KeyError: If a referenced frame cannot be fetched.
+
+        Returns:
+            bytes: The encoded frame.
+        """
+        if payload[0] == DEFINE_TAG:
+            frame = payload[1 + DIGEST_SIZE:]
+            self._add(payload[1:1 + DIGEST_SIZE], frame)
+            return frame
+        if payload[0] != REFERENCE_TAG:
+            return payload
+
+        digest = payload[1:1 + DIGEST_SIZE]
+        frame = self._blobs.get(digest)
+        if frame is not None:
+            self.hits += 1
+            self._blobs.move_to_end(digest)
+            return frame
+        self.fetches += 1
+        frame = self._fetch(digest)
+        if frame is None:
+            raise KeyError('Unknown Frame Digest')
+        self._add(digest, frame)
+        return frame
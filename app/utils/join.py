@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import (
+    Dict,
+    Optional,
+)
+from app.messaging import (
+    FrameMessage,
+    PartialMessage,
+)
+
+# The fields of a frame, each sent in its own partial message.
+PARTS = ('streamed_frame', 'reference_frame', 'latency')
+
+
+class StreamJoin:
+    """
+    Joins the partial messages of each frame, by frame number.
+
+    Partial frames are held in a bounded table, in order of their
+    first part's arrival. Frames are evicted once the table is full,
+    or once they wait more than 'ttl' seconds for their other parts.
+    """
+
+    def __init__(self, size: int, ttl: float) -> None:
+        """
+        Initialise the join.
+
+        Args:
+            size (int): The maximum number of partial frames held.
+            ttl (float): The maximum time (in seconds) a partial
+            frame waits for its other parts.
+        """
+        self.size = size
+        self.ttl = ttl
+        # The parts and arrival time of each partial frame.
+        self._pending: OrderedDict[int, Dict[str, object]] = OrderedDict()
+        self._arrived: Dict[int, float] = {}
+        self.joined = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def _evict(self, now: float) -> None:
+        """ Evicts expired partial frames, then the oldest if full """
+        while self._pending:
+            frame_number = next(iter(self._pending))
+            if now - self._arrived[frame_number] > self.ttl:
+                self.expired += 1
+            elif len(self._pending) > self.size:
+                self.evicted += 1
+            else:
+                break
+            del self._pending[frame_number]
+            del self._arrived[frame_number]
+
+    def add(self, payload: PartialMessage) -> Optional[FrameMessage]:
+        """
+        Adds a partial message to its frame.
+
+        Args:
+            payload (PartialMessage): The partial frame.
+
+        Returns:
+            Optional[FrameMessage]: The frame, once all of its
+            parts have arrived.
+        """
+        now = monotonic()
+        frame_number = payload.frame_number
+        if frame_number not in self._pending:
+            self._pending[frame_number] = {}
+            self._arrived[frame_number] = now
+        parts = self._pending[frame_number]
+        for part in PARTS:
+            value = getattr(payload, part)
+            if value is not None:
+                parts[part] = value
+
+        if len(parts) < len(PARTS):
+            self._evict(now)
+            return None
+        del self._pending[frame_number]
+        del self._arrived[frame_number]
+        self.joined += 1
+        self._evict(now)
+        return FrameMessage(frame_number=frame_number, **parts)
+
+    def report(self) -> str:
+        """
+        Summarises the joined and evicted frames.
+
+        Returns:
+            str: The summary.
+        """
+        return (
+            f'joined {self.joined}, pending {len(self._pending)}, '
+            f'{self.expired} expired, {self.evicted} evicted'
+        )
@@ -1,9 +1,13 @@
 import json
 import cv2
 import base64
+import struct
 import numpy as np
 import functools
-from app.messaging import RabbitMQModel
+from app.messaging import (
+    RabbitMQModel,
+    decode_message,
+)
 from pika.channel import Channel
 from pika.spec import (
     Basic,
@@ -13,12 +17,67 @@ from typing import (
     Dict,
     Any,
     Callable,
+    Optional,
     Type,
+    List,
+    Tuple,
+)
+from app.config import (
+    FRAME_CODEC,
+    PNG_COMPRESSION,
+    JPEG_QUALITY,
+    FrameCodec,
+)
+from app.utils import (
+    write_frame,
+    read_frame,
+    check_frame,
 )
 
 ENCODING = 'utf-8'
 FILE_ENCODING = '.png'
 
+# The byte prefixed to each encoded frame, naming its codec,
+# so decoders never have to guess.
+CODEC_TAGS = {
+    FrameCodec.RAW: 0,
+    FrameCodec.PNG: 1,
+    FrameCodec.WEBP: 2,
+    FrameCodec.JPEG: 3,
+    FrameCodec.SHM: 4,
+}
+TAG_CODECS = {tag: codec for codec, tag in CODEC_TAGS.items()}
+
+# The file extension, level parameter and default level of the
+# compressed codecs. WebP qualities above 100 are lossless.
+CODEC_PARAMETERS = {
+    FrameCodec.PNG: ('.png', cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION),
+    FrameCodec.WEBP: ('.webp', cv2.IMWRITE_WEBP_QUALITY, 101),
+    FrameCodec.JPEG: ('.jpg', cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY),
+}
+
+# The shape of raw frames: height, width and channels.
+RAW_HEADER = struct.Struct('<HHB')
+
+# The width and height in the header of PNG frames,
+# after the signature and the IHDR chunk's length and type.
+PNG_SIZE = struct.Struct('>16xII')
+# The height and width in a JPEG start of frame segment, after
+# its length and sample precision.
+JPEG_SIZE = struct.Struct('>3xHH')
+# The JPEG start of frame markers. The other markers in
+# this range are the Huffman, arithmetic coding and extension
+# markers, which do not hold the frame's size.
+JPEG_FRAME_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# The size reduction of each reduced decoding flag, so
+# raw and shared memory frames honour the same flags as the codecs.
+RAW_REDUCTION = {
+    cv2.IMREAD_REDUCED_COLOR_2: 2,
+    cv2.IMREAD_REDUCED_COLOR_4: 4,
+    cv2.IMREAD_REDUCED_COLOR_8: 8,
+}
+
 
 def dict_to_bytes(payload: Dict[str, Any]) -> bytes:
     """
@@ -64,20 +123,185 @@ def image_to_str(payload: np.ndarray) -> str:
     return base64.b64encode(image_bytes)
 
 
-def str_to_image(payload: str) -> np.ndarray:
+def str_to_image(
+        payload: str,
+        flags: int = cv2.IMREAD_COLOR
+) -> np.ndarray:
     """
     Converts base64 string into a frame.
     This is a loseless operation.
 
     Args:
         payload (str): The base64 representation of the image.
+        flags (int, optional): The OpenCV decoding flags, such as
+        'cv2.IMREAD_REDUCED_COLOR_2' to decode at a reduced size.
 
     Returns:
         np.ndarray: The decoded frame from the base64 string.
     """
     image_str = base64.b64decode(payload)
     arr_1d = np.frombuffer(image_str, np.uint8)
-    return cv2.imdecode(arr_1d, cv2.IMREAD_COLOR)
+    return cv2.imdecode(arr_1d, flags)
+
+
+def image_to_bytes(
+        payload: np.ndarray,
+        codec: str = FRAME_CODEC,
+        level: Optional[int] = None
+) -> bytes:
+    """
+    Converts frame image to its encoded bytes, prefixed with
+    the tag of the codec. Only JPEG is a lossy codec.
+
+    The 'shm' codec writes the frame into this process's shared
+    memory ring, so the bytes only hold the handle of the frame.
+
+    Unlike 'image_to_str', the encoding is not base64 wrapped,
+    so it is carried as is by the binary frame messages.
+
+    Args:
+        payload (np.ndarray): The frame/image to convert.
+        codec (str, optional): The codec to encode with.
+        level (Optional[int], optional): The PNG compression level
+        or the JPEG quality. Defaults to the configured level.
+
+    Raises:
+        ValueError: If the codec does not exist.
+
+    Returns:
+        bytes: The tagged, encoded image.
+    """
+    codec = FrameCodec(codec)
+    tag = bytes([CODEC_TAGS[codec]])
+    if codec == FrameCodec.RAW:
+        channels = payload.shape[2] if payload.ndim == 3 else 1
+        header = RAW_HEADER.pack(*payload.shape[:2], channels)
+        return tag + header + np.ascontiguousarray(payload).tobytes()
+    if codec == FrameCodec.SHM:
+        return tag + write_frame(payload)
+
+    extension, parameter, default = CODEC_PARAMETERS[codec]
+    _, encoded_image = cv2.imencode(
+        extension,
+        payload,
+        [parameter, default if level is None else level]
+    )
+    return tag + encoded_image.tobytes()
+
+
+def bytes_to_image(
+        payload: bytes,
+        flags: int = cv2.IMREAD_COLOR
+) -> np.ndarray:
+    """
+    Converts encoded image bytes into a frame, decoding
+    with the codec named by the tag of the image.
+
+    Args:
+        payload (bytes): The tagged, encoded image.
+        flags (int, optional): The OpenCV decoding flags, such as
+        'cv2.IMREAD_REDUCED_COLOR_2' to decode at a reduced size.
+
+    Raises:
+        KeyError: If the codec tag does not exist.
+        StaleFrameError: If a shared memory frame was overwritten.
+
+    Returns:
+        np.ndarray: The decoded frame. Raw and shared memory frames
+        are read-only views of the payload and the ring respectively.
+    """
+    codec = TAG_CODECS[payload[0]]
+    reduction = RAW_REDUCTION.get(flags, 1)
+    if codec == FrameCodec.RAW:
+        height, width, channels = RAW_HEADER.unpack_from(payload, 1)
+        image = np.frombuffer(
+            payload,
+            np.uint8,
+            offset=1 + RAW_HEADER.size
+        ).reshape(height, width, channels)
+        return image[::reduction, ::reduction]
+    if codec == FrameCodec.SHM:
+        return read_frame(payload[1:])[::reduction, ::reduction]
+    return cv2.imdecode(np.frombuffer(payload, np.uint8, offset=1), flags)
+
+
+def image_size(payload: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Reads the size of an encoded image from its header,
+    without decoding it.
+
+    Args:
+        payload (bytes): The tagged, encoded image.
+
+    Returns:
+        Optional[Tuple[int, int]]: The height and width of the image,
+        if the codec's header holds them.
+    """
+    codec = TAG_CODECS.get(payload[0])
+    if codec == FrameCodec.RAW:
+        height, width, _ = RAW_HEADER.unpack_from(payload, 1)
+        return height, width
+    if codec == FrameCodec.PNG and len(payload) >= 1 + PNG_SIZE.size:
+        width, height = PNG_SIZE.unpack_from(payload, 1)
+        return height, width
+    if codec != FrameCodec.JPEG:
+        return None
+    # Walk the segments after the start of image marker,
+    # up to the start of frame.
+    offset = 3
+    while offset + 4 <= len(payload):
+        if payload[offset] != 0xFF:
+            return None
+        marker = payload[offset + 1]
+        if marker == 0xFF:
+            # A fill byte before the marker.
+            offset += 1
+            continue
+        if marker in JPEG_FRAME_MARKERS:
+            if offset + 2 + JPEG_SIZE.size > len(payload):
+                return None
+            return JPEG_SIZE.unpack_from(payload, offset + 2)
+        offset += 2 + struct.unpack_from('>H', payload, offset + 2)[0]
+    return None
+
+
+def frame_content(payload: bytes) -> bytes:
+    """
+    Retrieves the bytes identifying the content of an encoded image.
+    Shared memory frames only carry their ring handle, which is
+    reused by later frames and across restarts, so they are
+    identified by the raw encoding of their pixels instead.
+
+    Args:
+        payload (bytes): The tagged, encoded image.
+
+    Raises:
+        StaleFrameError: If a shared memory frame was overwritten.
+
+    Returns:
+        bytes: The bytes identifying the image.
+    """
+    if TAG_CODECS.get(payload[0]) != FrameCodec.SHM:
+        return payload
+    content = image_to_bytes(read_frame(payload[1:]), FrameCodec.RAW)
+    check_frame(payload[1:])
+    return content
+
+
+def check_image(payload: bytes) -> None:
+    """
+    Checks an image decoded by 'bytes_to_image' is still valid.
+    Shared memory frames are views of the ring, so they must be
+    checked once they have been consumed.
+
+    Args:
+        payload (bytes): The tagged, encoded image.
+
+    Raises:
+        StaleFrameError: If a shared memory frame was overwritten.
+    """
+    if TAG_CODECS.get(payload[0]) == FrameCodec.SHM:
+        check_frame(payload[1:])
 
 
 def simplify(
@@ -90,7 +314,8 @@ def simplify(
 
     So as opposed to callback function having multiple uncessary
     arguments, the new callback only required a payload argument
-    in the expected format.
+    in the expected format. The payload is decoded with the codec
+    named by the message's content type.
 
     Args:
         func (Callable[[dict], Any]): The function to decorate.
@@ -108,5 +333,35 @@ def simplify(
         properties: BasicProperties,
         body: bytes
     ) -> Any:
-        return func(format(**bytes_to_dict(body)))
+        return func(format(**decode_message(body, properties.content_type)))
+    return wrapper
+
+
+def simplify_batch(
+        func: Callable[[List[RabbitMQModel]], Any],
+        format: Type[RabbitMQModel]
+) -> Callable[[List[Tuple[Basic.Deliver, BasicProperties, bytes]]], Any]:
+    """
+    Simplifies a batch of payloads for the RabbitMQ batch consumer.
+    This is the batched counterpart of 'simplify'.
+
+    Args:
+        func (Callable[[List[RabbitMQModel]], Any]): The function to
+        decorate.
+        format (Type[RabbitMQModel]): The format of each message in
+        the batch.
+
+    Returns:
+        Callable[[List[Tuple[Basic.Deliver, BasicProperties, bytes]]], Any]:
+        Wrapper for the callback method, which receives the batch of
+        messages in the expected format.
+    """
+    @functools.wraps(func)
+    def wrapper(
+        batch: List[Tuple[Basic.Deliver, BasicProperties, bytes]]
+    ) -> Any:
+        return func([
+            format(**decode_message(body, properties.content_type))
+            for _, properties, body in batch
+        ])
     return wrapper
@@ -1,6 +1,14 @@
+import os
 import cv2
-from typing import Tuple
+from typing import (
+    Tuple,
+    List,
+)
 import numpy as np
+from app.config import (
+    Folder,
+    Files,
+)
 
 
 def get_resource(
@@ -70,3 +78,33 @@ def handle_read_failure(
         with which there is an issue.
     """
     resource.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+
+def source_files(folder: str) -> List[str]:
+    """
+    Lists every reference and streamed file in the video folder.
+    The folder follows the numbered layout that the source switcher
+    picks its random paths from.
+
+    Args:
+        folder (str): The base video folder.
+
+    Returns:
+        List[str]: The files, relative to the video folder.
+    """
+    paths = []
+    for source in Folder:
+        base = os.path.join(folder, source.value)
+        if not os.path.isdir(base):
+            continue
+        count = sum(
+            1
+            for p in os.listdir(base)
+            if os.path.isdir(os.path.join(base, p))
+        )
+        for number in range(1, count + 1):
+            for file in (Files.REFERENCE, Files.STREAMED):
+                path = os.path.join(source.value, str(number), file.value)
+                if os.path.isfile(os.path.join(folder, path)):
+                    paths.append(path)
+    return paths
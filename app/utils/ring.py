@@ -0,0 +1,282 @@
+import atexit
+import os
+import struct
+import numpy as np
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import (
+    Dict,
+    Optional,
+    Tuple,
+)
+from app.config import (
+    FRAME_RING,
+    FRAME_RING_SLOTS,
+    FRAME_RING_SLOT_SIZE,
+    FRAME_RING_MEMORY,
+)
+
+# The ring layout: the number of slots, the size of each slot
+# and the nonce of the ring.
+RING_LAYOUT = struct.Struct('<QQQ')
+# A frame in a ring: the writer's process id, the nonce of its
+# ring, the slot and the generation of the slot.
+RING_HANDLE = struct.Struct('<IQIQ')
+# The slots start on a cache line.
+ALIGNMENT = 64
+
+
+class StaleFrameError(LookupError):
+    """ Raised when a ring slot was reused before it was read """
+
+
+class FrameRing:
+    """
+    Fixed size slots of decoded frames, in named shared memory.
+
+    Each slot is guarded by a sequence counter (a seqlock): the
+    writer makes it odd whilst writing and even once written, so
+    the generation of a slot is half its counter. Readers check
+    the generation of their handle, so a slot reused before a slow
+    reader arrives is detected rather than silently read.
+
+    Each ring is created with a random nonce, so readers tell apart
+    the rings of a writer that restarted with the same process id.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            slots: Optional[int] = None,
+            slot_size: Optional[int] = None
+    ) -> None:
+        """
+        Creates the ring if the layout is given, otherwise
+        attaches to the ring created by the writer.
+
+        Args:
+            name (str): The name of the shared memory.
+            slots (Optional[int], optional): The number of slots.
+            slot_size (Optional[int], optional): The size (in bytes)
+            of each slot.
+        """
+        self.owner = slots is not None
+        if self.owner:
+            size = self._slots_offset(slots) + slots * slot_size
+            try:
+                self._memory = SharedMemory(name, create=True, size=size)
+            except FileExistsError:
+                # Left behind by a writer that crashed.
+                stale = SharedMemory(name)
+                stale.close()
+                stale.unlink()
+                self._memory = SharedMemory(name, create=True, size=size)
+            nonce = int.from_bytes(os.urandom(8), 'little')
+            RING_LAYOUT.pack_into(
+                self._memory.buf, 0, slots, slot_size, nonce
+            )
+        else:
+            self._memory = SharedMemory(name)
+            # Readers must not unlink the writer's memory on exit.
+            resource_tracker.unregister(self._memory._name, 'shared_memory')
+            slots, slot_size, nonce = RING_LAYOUT.unpack_from(
+                self._memory.buf
+            )
+
+        self.slots = slots
+        self.slot_size = slot_size
+        self.nonce = nonce
+        self._next = 0
+        buffer = self._memory.buf
+        self._sequence = np.ndarray(
+            (slots,), np.uint64, buffer, RING_LAYOUT.size
+        )
+        self._shape = np.ndarray(
+            (slots, 3), np.uint16, buffer, RING_LAYOUT.size + 8 * slots
+        )
+        self._data = np.ndarray(
+            (slots, slot_size), np.uint8, buffer, self._slots_offset(slots)
+        )
+
+    @staticmethod
+    def _slots_offset(slots: int) -> int:
+        """ The offset of the first slot, after the slot headers """
+        header = RING_LAYOUT.size + slots * (8 + 3 * 2)
+        return -(-header // ALIGNMENT) * ALIGNMENT
+
+    def write(self, frame: np.ndarray) -> Tuple[int, int]:
+        """
+        Copies the frame into the next slot, overwriting
+        the oldest frame in the ring.
+
+        Args:
+            frame (np.ndarray): The decoded frame.
+
+        Raises:
+            ValueError: If the frame does not fit in a slot.
+
+        Returns:
+            Tuple[int, int]: The slot and its new generation.
+        """
+        if frame.nbytes > self.slot_size:
+            raise ValueError('Frame Exceeds Ring Slot')
+        slot = self._next
+        self._next = (slot + 1) % self.slots
+        sequence = int(self._sequence[slot]) + 1
+        self._sequence[slot] = sequence
+        height, width = frame.shape[:2]
+        self._shape[slot] = (height, width, frame.size // (height * width))
+        self._data[slot, :frame.nbytes] = frame.reshape(-1)
+        self._sequence[slot] = sequence + 1
+        return slot, (sequence + 1) // 2
+
+    def current(self, slot: int, generation: int) -> bool:
+        """
+        Checks the slot still holds the given generation.
+
+        Args:
+            slot (int): The slot of the frame.
+            generation (int): The generation of the frame.
+
+        Returns:
+            bool: If the frame has not been overwritten.
+        """
+        return int(self._sequence[slot]) == 2 * generation
+
+    def read(self, slot: int, generation: int) -> np.ndarray:
+        """
+        Retrieves the frame as a read-only view of the slot,
+        without copying it.
+
+        The view is only valid until the writer wraps around
+        to the slot, so frames that are kept must be copied.
+
+        Args:
+            slot (int): The slot of the frame.
+            generation (int): The generation of the frame.
+
+        Raises:
+            StaleFrameError: If the slot has been reused.
+
+        Returns:
+            np.ndarray: The decoded frame.
+        """
+        if not self.current(slot, generation):
+            raise StaleFrameError('Frame Overwritten In Ring')
+        height, width, channels = (int(size) for size in self._shape[slot])
+        frame = self._data[slot, :height * width * channels].reshape(
+            height, width, channels
+        )
+        frame.flags.writeable = False
+        # The shape may have been read whilst the slot was rewritten.
+        if not self.current(slot, generation):
+            raise StaleFrameError('Frame Overwritten In Ring')
+        return frame
+
+    def release(self) -> None:
+        """ Detaches from the ring, removing it if it is owned """
+        del self._sequence, self._shape, self._data
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
+
+
+# The ring written by this process, created on first use.
+writer: Optional[FrameRing] = None
+# The rings read by this process, by the writer's process id.
+readers: Dict[int, FrameRing] = {}
+
+
+def release_writer() -> None:
+    """ Removes the ring written by this process, if any """
+    global writer
+    if writer is not None:
+        writer.release()
+        writer = None
+
+
+def write_frame(frame: np.ndarray) -> bytes:
+    """
+    Writes the frame into this process's ring.
+
+    The ring is created on the first frame, with slots sized to
+    hold it, and as many slots as fit in FRAME_RING_MEMORY. The
+    ring is created again, with larger slots, for a larger frame.
+
+    Args:
+        frame (np.ndarray): The decoded frame.
+
+    Returns:
+        bytes: The handle of the frame.
+    """
+    global writer
+    if writer is None or frame.nbytes > writer.slot_size:
+        if writer is None:
+            atexit.register(release_writer)
+        release_writer()
+        slot_size = max(FRAME_RING_SLOT_SIZE, frame.nbytes)
+        writer = FrameRing(
+            f'{FRAME_RING}_{os.getpid()}',
+            max(2, min(
+                FRAME_RING_SLOTS,
+                FRAME_RING_MEMORY * 2 ** 20 // slot_size
+            )),
+            slot_size
+        )
+    slot, generation = writer.write(frame)
+    return RING_HANDLE.pack(os.getpid(), writer.nonce, slot, generation)
+
+
+def read_frame(handle: bytes) -> np.ndarray:
+    """
+    Reads a frame from the ring of the process that wrote it.
+    The ring is attached again once the writer has replaced it.
+
+    Args:
+        handle (bytes): The handle of the frame.
+
+    Raises:
+        StaleFrameError: If the frame has been overwritten,
+        or its ring no longer exists.
+
+    Returns:
+        np.ndarray: A read-only view of the frame.
+    """
+    pid, nonce, slot, generation = RING_HANDLE.unpack_from(handle)
+    if pid not in readers or readers[pid].nonce != nonce:
+        stale = readers.pop(pid, None)
+        if stale:
+            try:
+                stale.release()
+            except BufferError:
+                # Views of the old ring are still held, so it is
+                # closed once they are freed.
+                pass
+        try:
+            readers[pid] = FrameRing(f'{FRAME_RING}_{pid}')
+        except FileNotFoundError:
+            raise StaleFrameError('Frame Ring Removed')
+    if readers[pid].nonce != nonce:
+        raise StaleFrameError('Frame Ring Replaced')
+    return readers[pid].read(slot, generation)
+
+
+def check_frame(handle: bytes) -> None:
+    """
+    Checks a frame read from a ring was not overwritten since,
+    so a view that has been consumed can be trusted.
+
+    Args:
+        handle (bytes): The handle of the frame.
+
+    Raises:
+        StaleFrameError: If the frame has been overwritten.
+    """
+    pid, nonce, slot, generation = RING_HANDLE.unpack_from(handle)
+    ring = readers.get(pid)
+    if (
+        ring is None or
+        ring.nonce != nonce or
+        not ring.current(slot, generation)
+    ):
+        raise StaleFrameError('Frame Overwritten In Ring')
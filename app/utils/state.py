@@ -1,18 +1,23 @@
 import threading
+from typing import Dict
 
 
 class PathHolder:
-    """ Singleton mutable object to hold the current path """
-    _instance = None
+    """ Singleton (per name) mutable object to hold the current path """
+    _instances: Dict[str, 'PathHolder'] = {}
 
-    def __new__(cls):
-        """ Method to ensure singleton """
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
+    def __new__(cls, name: str = ''):
+        """
+        Method to ensure singleton per name, so nodes sharing
+        a process each hold their own path.
+        """
+        if name not in cls._instances:
+            instance = super().__new__(cls)
             # Initialise the path and threading lock.
-            cls._instance._path = ''
-            cls._instance._lock = threading.Lock()
-        return cls._instance
+            instance._path = ''
+            instance._lock = threading.Lock()
+            cls._instances[name] = instance
+        return cls._instances[name]
 
     @property
     def path(self) -> str:
@@ -40,16 +45,20 @@ class PathHolder:
 
 
 class FrameCount:
-    """ Singleton mutable object to hold the frame count """
-    _instance = None
+    """ Singleton (per name) mutable object to hold the frame count """
+    _instances: Dict[str, 'FrameCount'] = {}
 
-    def __new__(cls):
-        """ Method to ensure singleton """
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
+    def __new__(cls, name: str = ''):
+        """
+        Method to ensure singleton per name, so nodes sharing
+        a process each keep their own count.
+        """
+        if name not in cls._instances:
+            instance = super().__new__(cls)
             # Initialise the count.
-            cls._instance._count = 0
-        return cls._instance
+            instance._count = 0
+            cls._instances[name] = instance
+        return cls._instances[name]
 
     @property
     def count(self) -> int:
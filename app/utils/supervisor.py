@@ -0,0 +1,70 @@
+import signal
+import sys
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
+from typing import (
+    Callable,
+    Dict,
+)
+from time import sleep as wait
+
+
+def run_worker(target: Callable[[int], None], index: int) -> None:
+    """
+    Runs a worker, exiting normally when it is terminated,
+    so the worker's exit handlers still flush buffered work.
+
+    Args:
+        target (Callable[[int], None]): The worker, given its index.
+        index (int): The index of the worker.
+    """
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    target(index)
+
+
+def supervise(
+        target: Callable[[int], None],
+        workers: int,
+        interval: float = 1.0
+) -> None:
+    """
+    Runs several copies of a worker, each in its own process.
+    Workers that exit are restarted, until the program is exited.
+
+    Workers are started with 'spawn', so each worker opens its own
+    RabbitMQ and MongoDB connections and loads its own resources.
+
+    Args:
+        target (Callable[[int], None]): The worker, given its index.
+        This must be a module level function.
+        workers (int): The number of workers to run.
+        interval (float, optional): The time (in seconds) between
+        checks on the workers.
+    """
+    context = get_context('spawn')
+    processes: Dict[int, BaseProcess] = {}
+
+    def start(index: int) -> None:
+        """ Starts the worker with the given index """
+        process = context.Process(
+            target=run_worker,
+            args=(target, index),
+            name=f'{target.__name__}-{index}'
+        )
+        process.start()
+        processes[index] = process
+
+    for index in range(workers):
+        start(index)
+    # Stops the workers once program is exited.
+    try:
+        while True:
+            for index, process in list(processes.items()):
+                if not process.is_alive():
+                    start(index)
+            wait(interval)
+    except KeyboardInterrupt:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
@@ -0,0 +1,90 @@
+import math
+from collections import deque
+from typing import (
+    Any,
+    Deque,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+
+class Window(NamedTuple):
+    """ The result of a closed window """
+    mean: float
+    count: int
+    # The key of the oldest value in the window.
+    first_key: Any
+
+
+class WindowEngine:
+    """
+    Incremental count-based windows over a stream of values.
+
+    The window holds the last 'size' values, and closes every
+    'slide' values once it is full. Windows tumble if 'slide'
+    equals 'size', and overlap if it is smaller. The running sum
+    is updated as values arrive, so each value costs O(1).
+    """
+
+    def __init__(self, size: int, slide: Optional[int] = None) -> None:
+        """
+        Initialise the engine.
+
+        Args:
+            size (int): The number of values in a window.
+            slide (Optional[int], optional): The number of values
+            between windows. Defaults to 'size' (tumbling windows).
+
+        Raises:
+            ValueError: If the slide is not between 1 and the size.
+        """
+        slide = slide or size
+        if not 0 < slide <= size:
+            raise ValueError('Window Slide Out Of Range')
+        self.size = size
+        self.slide = slide
+        self._values: Deque[Tuple[Any, float]] = deque(maxlen=size)
+        self._sum = 0.0
+        self._added = 0
+        self._since = 0
+        self.windows = 0
+
+    def add(self, value: float, key: Any = None) -> Optional[Window]:
+        """
+        Adds a value to the window.
+
+        Args:
+            value (float): The value.
+            key (Any, optional): Identifies the value, such as
+            the _id of its document.
+
+        Returns:
+            Optional[Window]: The window, if this value closed it.
+        """
+        if len(self._values) == self.size:
+            self._sum -= self._values[0][1]
+        self._values.append((key, value))
+        self._sum += value
+        self._added += 1
+        if self._added % self.size == 0:
+            # Resynchronised once every 'size' values, so rounding
+            # cannot drift, at an amortised O(1) per value.
+            self._sum = math.fsum(value for _, value in self._values)
+        self._since += 1
+        if len(self._values) < self.size or self._since < self.slide:
+            return None
+        self._since = 0
+        self.windows += 1
+        return Window(
+            mean=self._sum / self.size,
+            count=self.size,
+            first_key=self._values[0][0]
+        )
+
+    def reset(self) -> None:
+        """ Discards the values of the current window """
+        self._values.clear()
+        self._sum = 0.0
+        self._added = 0
+        self._since = 0
@@ -0,0 +1,220 @@
+import atexit
+import logging
+import threading
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+from app.database import (
+    MongoDB,
+    MongoModel,
+)
+from app.messaging import (
+    RabbitMQ,
+    Exchange,
+    LogMessage,
+)
+from app.config import (
+    WRITE_RETRIES,
+)
+
+
+class WriteBehind:
+    """
+    Write-behind buffer for documents and log messages.
+
+    Documents are written with one 'insert_many' per flush, and the
+    log messages of a flush are grouped into a single message. Flushes
+    happen on a background thread once 'size' documents are buffered,
+    every 'interval' seconds and on shutdown, so the caller never waits
+    on a database round trip.
+
+    A failed flush is retried, an 'interval' apart, up to 'retries'
+    times. Its documents are then dropped, and counted in 'dropped'.
+    """
+
+    def __init__(
+            self,
+            mongo_client: MongoDB,
+            rabbit_mq: RabbitMQ,
+            collection: Optional[Type[MongoModel]],
+            exchange: Exchange,
+            size: int,
+            interval: float,
+            write: Optional[Callable[[List[Any]], None]] = None,
+            retries: int = WRITE_RETRIES
+    ) -> None:
+        """
+        Initialise the buffer and start the background writer.
+
+        Args:
+            mongo_client (MongoDB): The MongoDB client.
+            rabbit_mq (RabbitMQ): The RabbitMQ client owned by the
+            calling thread.
+            collection (Optional[Type[MongoModel]]): The collection
+            to write to.
+            exchange (Exchange): The exchange to publish logs to.
+            size (int): The number of documents that triggers a flush.
+            interval (float): The maximum time (in seconds) documents
+            are buffered.
+            write (Optional[Callable[[List[Any]], None]], optional):
+            Writes the buffered items, in place of inserting them
+            into the collection.
+            retries (int, optional): The number of times a failed
+            flush is retried.
+        """
+        self._mongo_client = mongo_client
+        self._rabbit_mq = rabbit_mq
+        self._collection = collection
+        self._write_items = write or partial(
+            mongo_client.insert_documents,
+            collection
+        )
+        self._exchange = exchange
+        self._size = size
+        self._interval = interval
+        self._documents: List[MongoModel] = []
+        self._logs: List[LogMessage] = []
+        self._retries = retries
+        self._attempts = 0
+        self.dropped = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(
+            self,
+            documents: List[MongoModel],
+            logs: List[LogMessage]
+    ) -> None:
+        """
+        Buffers documents and log messages to be written.
+
+        Args:
+            documents (List[MongoModel]): The documents to insert.
+            logs (List[LogMessage]): The log messages to publish.
+
+        Raises:
+            RuntimeError: If the background writer has stopped,
+            so nothing buffered would be written.
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError('Write Behind Writer Stopped')
+        with self._condition:
+            self._documents.extend(documents)
+            self._logs.extend(logs)
+            if len(self._documents) >= self._size:
+                self._condition.notify()
+
+    def _take(self) -> Tuple[List[MongoModel], List[LogMessage]]:
+        """ Empties the buffer, returning its contents """
+        documents, self._documents = self._documents, []
+        logs, self._logs = self._logs, []
+        return documents, logs
+
+    def _run(self) -> None:
+        """ Flushes the buffer until the writer is closed """
+        failed = False
+        while True:
+            with self._condition:
+                if failed:
+                    # Backs off before retrying the failed flush.
+                    self._condition.wait_for(
+                        lambda: self._closed,
+                        timeout=self._interval
+                    )
+                else:
+                    self._condition.wait_for(
+                        lambda: (
+                            self._closed or
+                            len(self._documents) >= self._size
+                        ),
+                        timeout=self._interval
+                    )
+                documents, logs = self._take()
+                closed = self._closed
+            failed = not self._write(documents, logs)
+            if closed:
+                # Nothing is retried once closed.
+                with self._condition:
+                    self.dropped += len(self._documents)
+                return
+
+    def _write(
+            self,
+            documents: List[MongoModel],
+            logs: List[LogMessage]
+    ) -> bool:
+        """
+        Writes the documents and publishes the grouped logs.
+        Documents that fail to be written are buffered again,
+        until they have been retried 'retries' times.
+
+        The RabbitMQ connection is not thread safe, so the publish
+        is handed to the thread that owns the connection.
+
+        Args:
+            documents (List[MongoModel]): The documents to insert.
+            logs (List[LogMessage]): The log messages to publish.
+
+        Returns:
+            bool: If the documents were written.
+        """
+        logger = logging.getLogger('KURF_SIMULATION')
+        written = True
+        try:
+            if documents:
+                self._write_items(documents)
+            self._attempts = 0
+        except Exception:
+            written = False
+            self._attempts += 1
+            if self._attempts <= self._retries:
+                logger.exception(
+                    f'Retrying {len(documents)} Unwritten Documents'
+                )
+                with self._condition:
+                    self._documents[:0] = documents
+            else:
+                logger.exception(
+                    f'Dropped {len(documents)} Unwritten Documents'
+                )
+                self.dropped += len(documents)
+                self._attempts = 0
+        if logs:
+            message = LogMessage(
+                terminal_message='\n'.join(
+                    log.terminal_message for log in logs
+                ),
+                file_message='\n'.join(log.file_message for log in logs)
+            )
+            try:
+                self._rabbit_mq.conn.add_callback_threadsafe(partial(
+                    self._rabbit_mq.publish,
+                    exchange=self._exchange,
+                    message=message
+                ))
+            except Exception:
+                logger.exception(f'Dropped {len(logs)} Unpublished Logs')
+        return written
+
+    def close(self) -> None:
+        """
+        Flushes the buffer and stops the background writer.
+        This must be called from the thread owning the connection.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        # Runs the publishes handed over by the background writer.
+        self._rabbit_mq.conn.process_data_events(time_limit=0)
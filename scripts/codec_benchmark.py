@@ -0,0 +1,76 @@
+import numpy as np
+from app.config import (
+    VIDEO_FOLDER,
+    FrameCodec,
+    setup_logging,
+    stdout_logging_config,
+)
+from app.utils import (
+    image_to_bytes,
+    bytes_to_image,
+)
+from app.reward import (
+    BENCHMARK_FRAMES,
+    sample_frames,
+    throughput,
+)
+
+# The codecs and levels compared, as (codec, level).
+SETTINGS = [
+    (FrameCodec.RAW, None),
+    (FrameCodec.PNG, 0),
+    (FrameCodec.PNG, 1),
+    (FrameCodec.PNG, 3),
+    (FrameCodec.PNG, 6),
+    (FrameCodec.PNG, 9),
+    (FrameCodec.WEBP, None),
+    (FrameCodec.JPEG, 75),
+    (FrameCodec.JPEG, 90),
+    (FrameCodec.JPEG, 95),
+]
+
+
+if __name__ == '__main__':
+    """
+    Benchmarks every frame codec on frames sampled from the video
+    folder. Reports the encoding and decoding time per frame, the
+    size of each encoded frame and the largest pixel error.
+    """
+    logger = setup_logging(stdout_logging_config)
+    streamed, reference = sample_frames(VIDEO_FOLDER, BENCHMARK_FRAMES)
+    frames = streamed + reference
+    height, width = frames[0].shape[:2]
+    logger.info(f'benchmarking on {len(frames)} {width}x{height} frames')
+
+    logger.info(
+        f'{"codec":<12}{"encode ms":>12}{"decode ms":>12}'
+        f'{"KB/frame":>12}{"max error":>12}'
+    )
+    for codec, level in SETTINGS:
+        encoded = [image_to_bytes(frame, codec, level) for frame in frames]
+        encode = throughput(
+            lambda start, end: [
+                image_to_bytes(frame, codec, level)
+                for frame in frames[start:end]
+            ],
+            len(frames),
+            1
+        )
+        decode = throughput(
+            lambda start, end: [
+                bytes_to_image(frame)
+                for frame in encoded[start:end]
+            ],
+            len(frames),
+            1
+        )
+        size = np.mean([len(frame) for frame in encoded]) / 1024
+        error = max(
+            int(np.abs(bytes_to_image(data).astype(np.int16) - frame).max())
+            for data, frame in zip(encoded, frames)
+        )
+        name = codec.value if level is None else f'{codec.value}-{level}'
+        logger.info(
+            f'{name:<12}{1000 / encode:>12.3f}{1000 / decode:>12.3f}'
+            f'{size:>12.1f}{error:>12}'
+        )
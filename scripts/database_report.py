@@ -0,0 +1,10 @@
+from app.database import (
+    MongoDB,
+)
+
+if __name__ == '__main__':
+    """
+    Bootstraps the database, then reports the indexes of each
+    collection and whether each hot query uses one.
+    """
+    print(MongoDB().index_report())
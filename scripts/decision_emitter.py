@@ -1,12 +1,18 @@
+from time import (
+    monotonic,
+    time,
+)
 from mab_algo import (
     SimpleAverage,
     EpsilonGreedy
 )
-from typing import List
 from app.database import (
     MongoDB,
     Results,
     Event,
+    BLOB_STORE,
+    BLOB_TTL,
+    get_blob_store,
 )
 from app.messaging import (
     RabbitMQ,
@@ -15,13 +21,18 @@ from app.messaging import (
     LogMessage,
     LOGS_EXCHANGE,
 )
+from app.utils import (
+    WindowEngine,
+)
 from app.config import (
     PROCESS_FRAMES,
+    WINDOW_SLIDE,
     Decision
 )
 
 mongo_client = MongoDB()
 rabbit_mq = RabbitMQ()
+blob_store = get_blob_store(BLOB_STORE, mongo_client)
 
 
 def publish_to_relay(action: str) -> None:
@@ -38,51 +49,79 @@ def publish_to_relay(action: str) -> None:
     )
 
 
-# Set up the Reinforcement learning algorithm.
-algo = EpsilonGreedy(
-    actions=['0', '1'],
-    averager=SimpleAverage(),
-    epsilon=0.5
-)
-
-action = algo.step()
-# Publish initial data to start the sequence.
-publish_to_relay(action)
-current_action = action
-
-# Watch the 'Results' collection for updates.
-# Once a set amount (as denoted by the env 'PROCESS_FRAMES')
-# is reached. THe average reward is calculated and passed to
-# the reinforcement learning algorithm, which decides the next
-# action. This next action is then published to the relay and log queue.
-for change in mongo_client.watch_collection(Results, Event.INSERT):
-    if mongo_client.get_collection_size(Results) > PROCESS_FRAMES:
-        documents: List[Results] = mongo_client.get_documents(
-            Results,
-            oldest=True,
-            quantity=PROCESS_FRAMES,
-            delete=True
-        )
-        # Average the reward to aid in making a decision.
-        avg_reward = sum(
-            document.result
-            for document in documents
-        ) / PROCESS_FRAMES
-        action = algo.step(reward=avg_reward)
-        publish_to_relay(action)
-        change_msg = (
-            f'{Decision(int(current_action)).name} ',
-            f' -> {Decision(int(action)).name}'
-        )
+def expire_blobs() -> None:
+    """
+    Deletes the frames no longer referenced from the blob store,
+    so it is bounded by the frames sent within the BLOB_TTL.
+    """
+    expired = blob_store.expire(time() - BLOB_TTL)
+    if expired:
+        message = f'Expired {expired} frames from the blob store'
         rabbit_mq.publish(
             LOGS_EXCHANGE,
-            LogMessage(
-                terminal_message=change_msg,
-                file_message=change_msg
-            )
+            LogMessage(terminal_message=message, file_message=message)
         )
-        if current_action != action:
-            current_action = action
-            # If the stream is swapped, then the databases have to
-            # be flushed to process the next set of data.
-            mongo_client.flush_database()
+
+
+def main() -> None:
+    """
+    Decides the source of each set of frames, from the
+    average reward of the previous window of frames.
+    """
+    # Set up the Reinforcement learning algorithm.
+    algo = EpsilonGreedy(
+        actions=['0', '1'],
+        averager=SimpleAverage(),
+        epsilon=0.5
+    )
+
+    action = algo.step()
+    # Publish initial data to start the sequence.
+    publish_to_relay(action)
+    current_action = action
+    # Averages the rewards of the last 'PROCESS_FRAMES' results,
+    # every 'WINDOW_SLIDE' results, as the results arrive.
+    windows = WindowEngine(PROCESS_FRAMES, WINDOW_SLIDE)
+    # When the blob store was last swept.
+    swept = monotonic()
+
+    # Watch the 'Results' collection for inserts. Once a window
+    # of results closes, the average reward is passed to the
+    # reinforcement learning algorithm, which decides the next
+    # action. This next action is then published to the relay and log queue.
+    for document in mongo_client.watch_collection(
+        Results,
+        Event.INSERT,
+        full_document=True
+    ):
+        window = windows.add(document.result, document.id)
+        if window:
+            # Results before the window are never read again.
+            mongo_client.delete_before(Results, window.first_key)
+            action = algo.step(reward=window.mean)
+            publish_to_relay(action)
+            change_msg = (
+                f'{Decision(int(current_action)).name}'
+                f' -> {Decision(int(action)).name}'
+            )
+            rabbit_mq.publish(
+                LOGS_EXCHANGE,
+                LogMessage(
+                    terminal_message=change_msg,
+                    file_message=change_msg
+                )
+            )
+            if current_action != action:
+                current_action = action
+                # If the stream is swapped, then the databases have to
+                # be flushed to process the next set of data.
+                mongo_client.flush_database()
+                windows.reset()
+            if monotonic() - swept > BLOB_TTL / 2:
+                expire_blobs()
+                swept = monotonic()
+
+
+if __name__ == '__main__':
+    """ Runs the decision emitter """
+    main()
@@ -0,0 +1,53 @@
+from app.config import (
+    VIDEO_FOLDER,
+    setup_logging,
+    stdout_logging_config,
+)
+from app.reward import (
+    BENCHMARK_BATCH,
+    CALIBRATION_FRAMES,
+    INFERENCE_ENGINE,
+    INFERENCE_PRECISION,
+    CHANNELS_LAST,
+    load_vgg,
+    build_engine,
+    extract_features,
+    calibrate,
+    sample_frames,
+    throughput,
+)
+
+
+if __name__ == '__main__':
+    """
+    One-shot check of the configured inference engine.
+    Reports how far the cosine similarity drifts from the float32
+    baseline, and the frames per second of both extractors.
+    """
+    logger = setup_logging(stdout_logging_config)
+    streamed, reference = sample_frames(VIDEO_FOLDER, CALIBRATION_FRAMES)
+    frames = streamed + reference
+
+    baseline = load_vgg()
+    optimised = build_engine(load_vgg(), calibration=frames)
+    mean_drift, max_drift = calibrate(
+        baseline,
+        optimised,
+        streamed,
+        reference
+    )
+    logger.info(
+        f'engine={INFERENCE_ENGINE} precision={INFERENCE_PRECISION} '
+        f'channels_last={CHANNELS_LAST}'
+    )
+    logger.info(
+        f'similarity drift from fp32: mean {mean_drift:.5f}, '
+        f'max {max_drift:.5f}'
+    )
+    for name, model in (('fp32', baseline), ('optimised', optimised)):
+        rate = throughput(
+            lambda start, end: extract_features(model, frames[start:end]),
+            len(frames),
+            BENCHMARK_BATCH
+        )
+        logger.info(f'{name}: {rate:.1f} frames/sec')
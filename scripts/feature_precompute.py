@@ -0,0 +1,149 @@
+import os
+import sys
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Tuple
+from app.config import (
+    VIDEO_FOLDER,
+    setup_logging,
+    stdout_logging_config,
+)
+from app.utils import (
+    image_to_bytes,
+    get_resource,
+    read_data,
+    source_files,
+)
+from app.reward import (
+    KEY_SIZE,
+    FEATURE_STORE,
+    PRECOMPUTE_WORKERS,
+    PRECOMPUTE_BATCH,
+    SIMILARITY_BACKEND,
+    INFERENCE_PRECISION,
+    BACKENDS,
+    frame_key,
+    is_feature_backend,
+    backend_layer,
+    limit_threads,
+    get_backend,
+    write_store,
+)
+
+# The feature backend, loaded once per worker process.
+backend = None
+
+
+def init_worker(threads: int) -> None:
+    """
+    Prepares a worker process by loading the model once.
+
+    Args:
+        threads (int): The number of threads the worker may use.
+    """
+    global backend
+    limit_threads(threads)
+    backend = get_backend(SIMILARITY_BACKEND, cached=False)
+
+
+def precompute_file(path: str, shard: str) -> Tuple[str, str]:
+    """
+    Extracts the features of every frame of a source file
+    and writes them to a shard.
+
+    Frames are keyed by the content hash of their encoding, as
+    sent by the emitters, so the reward calculator can find them.
+
+    Args:
+        path (str): The source file, relative to the video folder.
+        shard (str): The '.npz' file to write the features to.
+
+    Returns:
+        Tuple[str, str]: The source file and the written shard.
+    """
+    source = get_resource(os.path.join(VIDEO_FOLDER, path), None)
+    keys, features, frames = [], [], []
+
+    def flush() -> None:
+        """ Passes the pending frames through the model """
+        features.append(backend.extract(frames).astype(np.float16))
+        frames.clear()
+
+    while True:
+        succeeded, frame = read_data(source)
+        if not succeeded:
+            break
+        keys.append(np.frombuffer(frame_key(image_to_bytes(frame)), np.uint8))
+        frames.append(frame)
+        if len(frames) >= PRECOMPUTE_BATCH:
+            flush()
+    if frames:
+        flush()
+    source.release()
+
+    np.savez(
+        shard,
+        keys=np.array(keys, dtype=np.uint8).reshape(-1, KEY_SIZE),
+        features=(
+            np.concatenate(features)
+            if features else np.empty((0, 0), np.float16)
+        )
+    )
+    return path, shard
+
+
+def check_settings() -> None:
+    """
+    Checks the settings before any work starts, exiting with
+    a message naming the first setting that is missing or wrong.
+    """
+    if not FEATURE_STORE:
+        sys.exit('FEATURE_STORE must name the folder to write the store to')
+    if not VIDEO_FOLDER or not os.path.isdir(VIDEO_FOLDER):
+        sys.exit(f'SOURCE must name the video folder, not {VIDEO_FOLDER!r}')
+    if SIMILARITY_BACKEND not in BACKENDS:
+        sys.exit(f'Unknown Similarity Backend: {SIMILARITY_BACKEND}')
+    if not is_feature_backend(SIMILARITY_BACKEND):
+        sys.exit(f'{SIMILARITY_BACKEND} has no features to store')
+    if not source_files(VIDEO_FOLDER):
+        sys.exit(f'SOURCE folder {VIDEO_FOLDER} holds no video files')
+
+
+if __name__ == '__main__':
+    """ Precomputes the feature store for the whole video folder """
+    logger = setup_logging(stdout_logging_config)
+    check_settings()
+    paths = source_files(VIDEO_FOLDER)
+    threads = max(1, os.cpu_count() // PRECOMPUTE_WORKERS)
+    logger.info(
+        f'extracting {len(paths)} files across '
+        f'{PRECOMPUTE_WORKERS} workers'
+    )
+    with tempfile.TemporaryDirectory() as shard_folder:
+        with ProcessPoolExecutor(
+            max_workers=PRECOMPUTE_WORKERS,
+            mp_context=get_context('spawn'),
+            initializer=init_worker,
+            initargs=(threads,)
+        ) as pool:
+            shards = []
+            for path, shard in pool.map(
+                precompute_file,
+                paths,
+                [
+                    os.path.join(shard_folder, f'{number}.npz')
+                    for number in range(len(paths))
+                ]
+            ):
+                logger.info(f'extracted {path}')
+                shards.append((path, shard))
+        write_store(
+            FEATURE_STORE,
+            shards,
+            SIMILARITY_BACKEND,
+            backend_layer(SIMILARITY_BACKEND),
+            INFERENCE_PRECISION
+        )
+    logger.info(f'feature store written to {FEATURE_STORE}')
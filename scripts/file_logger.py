@@ -26,7 +26,7 @@ def log_to_file(payload: LogMessage) -> None:
     logger.info(payload.file_message)
 
 
-if __name__ == '__main__':
+def main() -> None:
     """ Boilerplate for the RabbitMQ consumer """
     setup_consumer(
         client=RabbitMQ(),
@@ -34,3 +34,8 @@ if __name__ == '__main__':
         callback=log_to_file,
         expected_format=LogMessage
     )
+
+
+if __name__ == '__main__':
+    """ Runs the consumer """
+    main()
@@ -1,35 +1,70 @@
+from collections import OrderedDict
+from typing import List
 from app.database import (
     MongoDB,
     Frames,
     Event,
+    field,
 )
 from app.messaging import (
     RabbitMQ,
     FrameMessage,
     REWARD_QUEUE,
 )
+from app.config import (
+    POLL_BATCH_SIZE,
+    POLL_BATCH_TIMEOUT,
+)
 
 mongo_client = MongoDB()
 rabbit_mq = RabbitMQ()
 
-# Polls from the MongoDB 'Frames' collection to collect documents
-# with complete frame data. This is because frame data is gathered
-# asnychronously in the MongoDB database.
-for key in mongo_client.watch_collection(Frames, Event.UPDATE):
-    document: FrameMessage = mongo_client.get_document_by_id(key)
-    if (
-        document.streamed_frame and
-        document.reference_frame and
-        document.latency
+# A frame is complete once the sorter has recorded every part.
+# This is matched by the server, so only complete frames are
+# delivered.
+COMPLETE = {
+    field(Frames, 'parts'): {'$size': len(Frames.partial_fields)}
+}
+# The number of published frame numbers remembered, as a frame
+# updated again before its lookup is delivered more than once.
+RECENT_FRAMES = 4096
+
+
+def main() -> None:
+    """ Publishes the frames whose data is complete """
+    published: OrderedDict[int, None] = OrderedDict()
+    # Watches the MongoDB 'Frames' collection for documents with
+    # complete frame data. This is because frame data is gathered
+    # asnychronously in the MongoDB database. The stream resumes
+    # after the last published batch when the poller restarts.
+    for batch in mongo_client.watch_batches(
+        Frames,
+        Event.UPDATE,
+        match=COMPLETE,
+        size=POLL_BATCH_SIZE,
+        timeout=POLL_BATCH_TIMEOUT / 1000,
+        resume='frame_poller'
     ):
-        # Publish to the reward calculation queue after
-        # complete frame data is gathered.
-        rabbit_mq.publish_to_queue(
-            REWARD_QUEUE,
-            FrameMessage(
-                frame_number=document.frame_number,
-                streamed_frame=document.streamed_frame,
-                reference_frame=document.reference_frame,
-                latency=document.latency
+        documents: List[Frames] = batch
+        for document in documents:
+            if document.frame_number in published:
+                continue
+            published[document.frame_number] = None
+            if len(published) > RECENT_FRAMES:
+                published.popitem(last=False)
+            # Publish to the reward calculation queue after
+            # complete frame data is gathered.
+            rabbit_mq.publish_to_queue(
+                REWARD_QUEUE,
+                FrameMessage(
+                    frame_number=document.frame_number,
+                    streamed_frame=document.streamed_frame,
+                    reference_frame=document.reference_frame,
+                    latency=document.frame_latency
+                )
             )
-        )
+
+
+if __name__ == '__main__':
+    """ Runs the frame poller """
+    main()
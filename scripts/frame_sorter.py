@@ -1,78 +1,228 @@
-from functools import partial
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 from app.messaging import (
     AGGREGATE_QUEUE,
+    FLOW_QUEUES,
+    LOGS_EXCHANGE,
+    PUBLISH_REPORT_INTERVAL,
+    FlowController,
+    LogMessage,
     PartialMessage,
     RabbitMQ,
 )
 from app.database import (
     MongoDB,
     Frames,
+    BLOB_STORE,
     field,
-    get_other_fields
+    get_other_fields,
+    get_blob_store,
 )
 from app.utils import (
     setup_consumer,
+    setup_batch_consumer,
+    split_frame,
+    supervise,
+)
+from app.config import (
+    SORT_BATCH_SIZE,
+    SORT_BATCH_TIMEOUT,
+    DEDUP_SIZE,
 )
 
 mongo_client = MongoDB()
+rabbit_mq: RabbitMQ = None
+# Holds the frames, so the 'Frames' documents only hold references,
+# if the emitters deduplicate frames.
+blob_store = get_blob_store(BLOB_STORE, mongo_client)
+# Drops whole frames whilst the pipeline is backlogged,
+# under the 'drop' flow policy.
+flow = FlowController()
+# The number of partial frames sorted, for the periodic report.
+sorted_frames = 0
 
+# A MongoDB upsert: the filter and the update operations.
+Upsert = Tuple[Dict[str, Any], Dict[str, Any]]
 
-def upsert_to_database(payload: PartialMessage) -> None:
+FRAME_NUMBER = field(Frames, 'frame_number')
+PARTS = field(Frames, 'parts')
+# The field set by each kind of partial frame, and the defaults
+# of the other fields, compiled once rather than per message.
+# The frame number is set by the filter, so it has no default.
+UPDATE_PLANS = {
+    part: (
+        field(Frames, name),
+        {
+            other: default
+            for other, default in get_other_fields(Frames, name).items()
+            if other != FRAME_NUMBER
+        }
+    )
+    for part, name in (
+        ('latency', 'frame_latency'),
+        ('reference_frame', 'reference_frame'),
+        ('streamed_frame', 'streamed_frame'),
+    )
+}
+
+
+def plan_upsert(
+        payload: PartialMessage,
+        blobs: Dict[bytes, Optional[bytes]]
+) -> Upsert:
     """
-    Upserts partail frames to the database.
+    Plans the upsert of a partial frame.
     This aids in aggregating frames and their correlated data
-    by gruoping frames based on their frame number.
+    by grouping frames based on their frame number.
 
     This matches the referenced frames, streamed frames and
-    the latency values.
+    the latency values. By using '$setOnInsert' the collection
+    schema is adhered to. The field is added to the frame's parts,
+    which marks the frame complete once every part is set.
 
     Args:
         payload (PartialMessage): The partial data to upsert.
+        blobs (Dict[bytes, Optional[bytes]]): Collects the frames
+        sent by the emitters, by digest, to store in the blob store.
+        Referenced frames are collected without a frame, so they
+        are marked as referenced. Frames are kept in the document
+        if deduplication is disabled.
 
     Raises:
         KeyError: If no data is sent in the payload.
-    """
-    # Partial function for the MongoDB upsert.
-    upsert = partial(
-        mongo_client.upsert_document,
-        Frames,
-        {field(Frames, 'frame_number'): payload.frame_number}
-    )
 
-    # By using '$setOnInsert' the collection schema is adhered to.
-    if payload.latency:
-        latency_field = field(Frames, 'latency')
-        upsert(
+    Returns:
+        Upsert: The upsert of the partial frame.
+    """
+    for part, (name, defaults) in UPDATE_PLANS.items():
+        value = getattr(payload, part)
+        if value is None:
+            continue
+        if isinstance(value, bytes) and DEDUP_SIZE:
+            value, blob = split_frame(value)
+            # The reference holds the digest after its tag.
+            if blob is not None or value[1:] not in blobs:
+                blobs[value[1:]] = blob
+        return (
+            {FRAME_NUMBER: payload.frame_number},
             {
-                '$set': {latency_field: payload.latency},
-                '$setOnInsert': get_other_fields(Frames, latency_field)
+                '$set': {name: value},
+                '$setOnInsert': defaults,
+                '$addToSet': {PARTS: name}
             }
         )
-    elif payload.reference_frame:
-        reference_field = field(Frames, 'reference_frame')
-        upsert(
-            {
-                '$set': {reference_field: payload.reference_frame},
-                '$setOnInsert': get_other_fields(Frames, reference_field)
-            }
+    raise KeyError('Malformed Request: Frame Sorter')
+
+
+def upsert_batch(payloads: List[PartialMessage]) -> None:
+    """
+    Upserts a batch of partial frames to the database,
+    with one ordered bulk write. The frames sent in the
+    batch are stored first, so their references resolve,
+    and the frames referenced are kept from expiring.
+
+    The parts of frames dropped by the flow controller are not
+    upserted, though their frames are still stored, as later
+    frames may reference them.
+
+    Args:
+        payloads (List[PartialMessage]): The partial data to upsert.
+    """
+    global sorted_frames
+    if flow.due():
+        flow.update(max(
+            rabbit_mq.queue_depth(queue)
+            for queue in FLOW_QUEUES
+        ))
+    blobs: Dict[bytes, Optional[bytes]] = {}
+    upserts = [
+        upsert
+        for payload, upsert in (
+            (payload, plan_upsert(payload, blobs))
+            for payload in payloads
         )
-    elif payload.streamed_frame:
-        streamed_field = field(Frames, 'streamed_frame')
-        upsert(
-            {
-                '$set': {streamed_field: payload.streamed_frame},
-                '$setOnInsert': get_other_fields(Frames, streamed_field)
-            }
+        if flow.admit(payload.frame_number)
+    ]
+    blob_store.put_many({
+        digest: blob
+        for digest, blob in blobs.items()
+        if blob is not None
+    })
+    blob_store.touch_many(
+        digest
+        for digest, blob in blobs.items()
+        if blob is None
+    )
+    if upserts:
+        mongo_client.upsert_documents(Frames, upserts)
+
+    report_at = sorted_frames // PUBLISH_REPORT_INTERVAL
+    sorted_frames += len(payloads)
+    if sorted_frames // PUBLISH_REPORT_INTERVAL > report_at:
+        report = flow.report()
+        rabbit_mq.publish(
+            LOGS_EXCHANGE,
+            LogMessage(terminal_message=report, file_message=report)
+        )
+
+
+def upsert_to_database(payload: PartialMessage) -> None:
+    """
+    Upserts partial frames to the database.
+
+    Args:
+        payload (PartialMessage): The partial data to upsert.
+
+    Raises:
+        KeyError: If no data is sent in the payload.
+    """
+    upsert_batch([payload])
+
+
+def sorter_worker(index: int) -> None:
+    """
+    Runs a sorter worker, consuming from its partition of the
+    aggregate queue. Every partial frame of a frame number is
+    routed to the same partition.
+
+    Args:
+        index (int): The index of the partition.
+    """
+    global rabbit_mq
+    rabbit_mq = RabbitMQ()
+    if SORT_BATCH_SIZE > 1:
+        # Messages are acknowledged once their batch is written.
+        setup_batch_consumer(
+            client=rabbit_mq,
+            subscribe_queue=AGGREGATE_QUEUE.partition(index),
+            callback=upsert_batch,
+            expected_format=PartialMessage,
+            size=SORT_BATCH_SIZE,
+            timeout=SORT_BATCH_TIMEOUT
+        )
+    else:
+        setup_consumer(
+            client=rabbit_mq,
+            subscribe_queue=AGGREGATE_QUEUE.partition(index),
+            callback=upsert_to_database,
+            expected_format=PartialMessage,
+            manual_ack=True
         )
+
+
+def main() -> None:
+    """ Boilerplate for RabbitMQ consumer """
+    if AGGREGATE_QUEUE.partitions > 1:
+        supervise(sorter_worker, AGGREGATE_QUEUE.partitions)
     else:
-        raise KeyError('Malformed Request: Frame Sorter')
+        sorter_worker(0)
 
 
 if __name__ == '__main__':
-    """ Boilerplate for RabbitMQ consumer """
-    setup_consumer(
-        client=RabbitMQ(),
-        subscribe_queue=AGGREGATE_QUEUE,
-        callback=upsert_to_database,
-        expected_format=PartialMessage
-    )
+    """ Runs the consumer """
+    main()
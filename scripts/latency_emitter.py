@@ -3,7 +3,7 @@ from typing import (
     Tuple,
 )
 from app.messaging import (
-    RabbitMQ,
+    AsyncRabbitMQ,
     PartialMessage,
     PathMessage,
     LATENCY_QUEUE,
@@ -11,14 +11,14 @@ from app.messaging import (
 from app.utils import (
     FrameCount,
     PathHolder,
-    setup_consumer,
-    setup_publisher,
+    setup_async_consumer,
+    setup_async_publisher,
     update_path,
 )
 from app.config import (
     Files,
 )
-import threading
+import asyncio
 import pandas as pd
 from pandas import DataFrame
 
@@ -31,7 +31,7 @@ def get_resource(
 ) -> DataFrame:
     """
     Retrieves the resource as requested by the
-    'setup_publisher' method.
+    'setup_async_publisher' method.
 
     In the case of the latency node, this retrieves
     the pandas dataframe from the latency csv.
@@ -76,7 +76,7 @@ def get_message(
     """
     Sends the message to publish.
 
-    This is requested by the 'setup_publisher' method.
+    This is requested by the 'setup_async_publisher' method.
     THe latency emitter sends the latency and frame_count
     values.
 
@@ -96,22 +96,32 @@ def get_message(
     )
 
 
-if __name__ == '__main__':
-    """ Boilerplate for RabbitMQ publisher and consumer """
-    threading.Thread(
-        target=setup_publisher,
-        kwargs={
-            'resource': get_resource,
-            'read_data': read_data,
-            'get_message': get_message,
-            'handle_read_failure': None,
-            'resource_hook': None
-        },
-        daemon=True
-    ).start()
-    setup_consumer(
-        client=RabbitMQ(),
+async def main() -> None:
+    """
+    Consumes the new paths and publishes the data concurrently,
+    over a single connection on the event loop.
+    """
+    client = await AsyncRabbitMQ().connect()
+    await setup_async_consumer(
+        client=client,
         subscribe_queue=LATENCY_QUEUE,
-        callback=update_path(PathHolder(), Files.LATENCY),
+        callback=update_path(PathHolder(Files.LATENCY), Files.LATENCY),
         expected_format=PathMessage
     )
+    await setup_async_publisher(
+        client=client,
+        resource=get_resource,
+        read_data=read_data,
+        get_message=get_message,
+        handle_read_failure=None,
+        name=Files.LATENCY,
+        resource_hook=None
+    )
+
+
+if __name__ == '__main__':
+    """ Boilerplate for RabbitMQ publisher and consumer """
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
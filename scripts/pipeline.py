@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from functools import partial
+from typing import (
+    Callable,
+    List,
+)
+from app.messaging import (
+    AGGREGATE_QUEUE,
+    BROKER,
+    Broker,
+)
+
+if BROKER != Broker.MEMORY:
+    raise ValueError('The Pipeline Requires BROKER=memory')
+
+# The stages are imported once the broker is known,
+# as their clients connect on import.
+from scripts import (  # noqa: E402
+    decision_emitter,
+    file_logger,
+    frame_emitter,
+    frame_poller,
+    frame_sorter,
+    latency_emitter,
+    reference_emitter,
+    reward_calculator,
+    shed_monitor,
+    source_switcher,
+    terminal_logger,
+)
+
+
+def run_stage(name: str, target: Callable[[], None]) -> threading.Thread:
+    """
+    Runs a stage of the pipeline on a daemon thread.
+
+    Args:
+        name (str): The name of the stage.
+        target (Callable[[], None]): The entry point of the stage.
+
+    Returns:
+        threading.Thread: The thread running the stage.
+    """
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    """
+    Runs every stage in this process, over the in-process broker,
+    so the pipeline can be profiled without the network between
+    stages. MongoDB is still required.
+    """
+    # The consumers are started before the publishers,
+    # so the first frames and decisions are not dropped.
+    stages: List[threading.Thread] = [
+        run_stage('terminal_logger', terminal_logger.main),
+        run_stage('file_logger', file_logger.main),
+        run_stage(
+            'reward_calculator',
+            partial(reward_calculator.reward_worker, 0)
+        ),
+        run_stage('source_switcher', source_switcher.main),
+        run_stage('shed_monitor', shed_monitor.main),
+        run_stage('frame_poller', frame_poller.main),
+    ]
+    # The sorter partitions run on threads, rather than processes,
+    # so they share the in-process broker.
+    for index in range(AGGREGATE_QUEUE.partitions):
+        stages.append(run_stage(
+            f'frame_sorter-{index}',
+            partial(frame_sorter.sorter_worker, index)
+        ))
+    for module in (frame_emitter, reference_emitter, latency_emitter):
+        stages.append(run_stage(
+            module.__name__,
+            lambda module=module: asyncio.run(module.main())
+        ))
+    # Allows the emitters to subscribe to the file exchange.
+    time.sleep(1)
+    stages.append(run_stage('decision_emitter', decision_emitter.main))
+    try:
+        while all(stage.is_alive() for stage in stages):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
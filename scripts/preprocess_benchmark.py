@@ -0,0 +1,49 @@
+import torch
+from app.config import (
+    VIDEO_FOLDER,
+    setup_logging,
+    stdout_logging_config,
+)
+from app.utils import (
+    image_to_bytes,
+    bytes_to_image,
+)
+from app.reward import (
+    BENCHMARK_FRAMES,
+    BENCHMARK_BATCH,
+    Preprocessor,
+    transform,
+    sample_frames,
+    throughput,
+)
+
+
+if __name__ == '__main__':
+    """
+    Benchmarks the preprocessing of encoded frames into the model
+    input, comparing the PIL based 'transform' with the OpenCV
+    'Preprocessor'. Reports the time spent per frame by each.
+    """
+    logger = setup_logging(stdout_logging_config)
+    streamed, reference = sample_frames(VIDEO_FOLDER, BENCHMARK_FRAMES)
+    # Frames are preprocessed from their encoding, as sent by the emitters.
+    frames = [image_to_bytes(frame) for frame in streamed + reference]
+    preprocess = Preprocessor(224)
+    pipelines = {
+        'transform': lambda start, end: torch.stack([
+            transform(bytes_to_image(frame))
+            for frame in frames[start:end]
+        ]),
+        'preprocessor': lambda start, end: preprocess(frames[start:end]),
+    }
+
+    logger.info(f'benchmarking on {len(frames)} frames')
+    costs = {
+        name: 1000 / throughput(pipeline, len(frames), BENCHMARK_BATCH)
+        for name, pipeline in pipelines.items()
+    }
+    for name, cost in costs.items():
+        logger.info(f'{name:<16}{cost:>10.3f} ms/frame')
+    logger.info(
+        f'saving: {costs["transform"] - costs["preprocessor"]:.3f} ms/frame'
+    )
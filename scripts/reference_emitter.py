@@ -1,9 +1,10 @@
 from app.utils import (
     FrameCount,
     PathHolder,
-    image_to_str,
-    setup_publisher,
-    setup_consumer,
+    Deduplicator,
+    image_to_bytes,
+    setup_async_publisher,
+    setup_async_consumer,
     get_resource,
     read_data,
     handle_read_failure,
@@ -11,16 +12,25 @@ from app.utils import (
     update_path
 )
 from app.messaging import (
-    RabbitMQ,
+    AsyncRabbitMQ,
     PartialMessage,
     PathMessage,
+    AGGREGATE_QUEUE,
     REFERENCE_QUEUE,
 )
+from app.database import (
+    BLOB_TTL,
+)
 from app.config import (
     Files,
+    DEDUP_SIZE,
 )
 import numpy as np
-import threading
+import asyncio
+
+# Frames already sent are only sent by their digest. Frames are
+# defined again well before they expire from the blob store.
+deduplicate = Deduplicator(DEDUP_SIZE, BLOB_TTL / 2)
 
 
 def get_message(
@@ -31,7 +41,7 @@ def get_message(
     Sends the method to publish.
 
     This is a requirement of the tighly bound
-    'setup_publisher' method.
+    'setup_async_publisher' method.
 
     Args:
         counter (FrameCount): Mutable helper to keep track
@@ -44,26 +54,39 @@ def get_message(
     """
     return PartialMessage(
         frame_number=counter.count,
-        reference_frame=image_to_str(frame)
+        reference_frame=deduplicate(
+            image_to_bytes(frame),
+            AGGREGATE_QUEUE.route(counter.count).routing
+        )
     )
 
 
-if __name__ == '__main__':
-    """ Boilerplate for RabbitMQ publisher and consumer """
-    threading.Thread(
-        target=setup_publisher,
-        kwargs={
-            'resource': get_resource,
-            'read_data': read_data,
-            'get_message': get_message,
-            'handle_read_failure': handle_read_failure,
-            'resource_hook': check_resource
-        },
-        daemon=True
-    ).start()
-    setup_consumer(
-        client=RabbitMQ(),
+async def main() -> None:
+    """
+    Consumes the new paths and publishes the data concurrently,
+    over a single connection on the event loop.
+    """
+    client = await AsyncRabbitMQ().connect()
+    await setup_async_consumer(
+        client=client,
         subscribe_queue=REFERENCE_QUEUE,
-        callback=update_path(PathHolder(), Files.REFERENCE),
+        callback=update_path(PathHolder(Files.REFERENCE), Files.REFERENCE),
         expected_format=PathMessage
     )
+    await setup_async_publisher(
+        client=client,
+        resource=get_resource,
+        read_data=read_data,
+        get_message=get_message,
+        handle_read_failure=handle_read_failure,
+        name=Files.REFERENCE,
+        resource_hook=check_resource
+    )
+
+
+if __name__ == '__main__':
+    """ Boilerplate for RabbitMQ publisher and consumer """
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,8 +1,8 @@
 import numpy as np
-import torch
-import torchvision.models as models
-import torchvision.transforms as transforms
-from torchvision.models import VGG16_Weights
+from typing import (
+    List,
+    Tuple,
+)
 from app.messaging import (
     RabbitMQ,
     FrameMessage,
@@ -13,109 +13,231 @@ from app.messaging import (
 from app.database import (
     MongoDB,
     Results,
+    BlobStore,
+    BLOB_STORE,
+    get_blob_store,
 )
 from app.utils import (
+    StaleFrameError,
+    BlobCache,
+    WriteBehind,
     setup_consumer,
-    str_to_image,
+    setup_batch_consumer,
+    supervise,
 )
 from app.config import (
     LATENCY_WEIGHT,
     SIM_WEIGHT,
+    REWARD_BATCH_SIZE,
+    REWARD_BATCH_TIMEOUT,
+    REWARD_WORKERS,
+    REWARD_THREADS,
+    REWARD_PREFETCH,
+    WRITE_BATCH_SIZE,
+    WRITE_INTERVAL,
+    BLOB_CACHE_SIZE,
+)
+from app.reward import (
+    SimilarityBackend,
+    get_backend,
+    limit_threads,
+    CACHE_REPORT_INTERVAL,
+    SIMILARITY_BACKEND,
 )
 
+# The clients and the model are set up by each worker process,
+# so that a supervising process never loads the model.
+mongo_client: MongoDB = None
+rabbit_mq: RabbitMQ = None
+# Buffers the results and logs, so scoring never waits on a write.
+writer: WriteBehind = None
+# Resolves the frames deduplicated by the emitters, or stored
+# out of the 'Frames' documents, through the blob store.
+blobs: BlobCache = None
+blob_store: BlobStore = None
+# The metric scoring the similarity of the streamed and reference frames.
+backend: SimilarityBackend = None
+# The number of frames scored, in total and at the last report.
+scored = 0
+last_report = 0
+# The number of frames dropped, as they could no longer be read.
+dropped = 0
+
+
+def setup_worker(threads: int) -> None:
+    """
+    Prepares this process to calculate rewards.
+    The model is loaded once per process.
 
-mongo_client = MongoDB()
-rabbit_mq = RabbitMQ()
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-vgg = models.vgg16(
-    weights=VGG16_Weights.IMAGENET1K_V1
-).features.to(device).eval()
-
-transform = transforms.Compose([
-    transforms.ToPILImage(),
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-])
+    Args:
+        threads (int): The number of threads this process may use.
+    """
+    global mongo_client, rabbit_mq, writer, blobs, blob_store, backend
+    limit_threads(threads)
+    mongo_client = MongoDB()
+    rabbit_mq = RabbitMQ()
+    writer = WriteBehind(
+        mongo_client=mongo_client,
+        rabbit_mq=rabbit_mq,
+        collection=Results,
+        exchange=LOGS_EXCHANGE,
+        size=WRITE_BATCH_SIZE,
+        interval=WRITE_INTERVAL / 1000
+    )
+    blob_store = get_blob_store(BLOB_STORE, mongo_client)
+    blobs = BlobCache(BLOB_CACHE_SIZE * 2 ** 20, blob_store.get)
+    backend = get_backend(SIMILARITY_BACKEND)
 
 
-def extract_vgg_features(frame: np.ndarray) -> np.ndarray:
+def calculate_reward(payload: FrameMessage) -> None:
     """
-    Extract features from the given frame.
+    Calculate the reward for the given frame, by comparing the
+    streamed frame to the reference frame and subtracting a score
+    for the latency.
 
     Args:
-        frame (np.ndarray): A frame (stream/reference) from
-        the source.
-
-    Returns:
-        np.ndarray: extracted features.
+        payload (FrameMessage): The message containing all related joined
+        data for the streamed frame, reference frame and latency.
     """
-    frame = transform(frame).unsqueeze(0).to(device)
-    with torch.no_grad():
-        features = vgg(frame)
-    return features.cpu().numpy().flatten()
+    calculate_rewards([payload])
 
 
-def cosine_similarity(
-        vec1: np.ndarray,
-        vec2: np.ndarray
-) -> float:
+def score_frames(
+        payloads: List[FrameMessage]
+) -> Tuple[List[FrameMessage], np.ndarray]:
     """
-    Calculate the similarity between frames.
-    This calculation is often done between the streamed
-    and the reference frames.
+    Scores the similarity of the frames, dropping the frames that
+    can no longer be read: references to frames that were never
+    stored, and shared memory frames overwritten in their ring.
 
     Args:
-        vec1 (np.ndarray): Frame to compare.
-        vec2 (np.ndarray): Frame to compare with.
+        payloads (List[FrameMessage]): The frames to score.
 
     Returns:
-        float: Cosine similarity of the frames.
+        Tuple[List[FrameMessage], np.ndarray]: The frames scored,
+        and the similarity of each.
     """
-    return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+    global dropped
+    resolved = []
+    for payload in payloads:
+        try:
+            resolved.append((
+                payload,
+                blobs.resolve(payload.streamed_frame),
+                blobs.resolve(payload.reference_frame)
+            ))
+        except KeyError:
+            dropped += 1
+    if not resolved:
+        return [], np.empty(0)
+    try:
+        return [payload for payload, _, _ in resolved], backend.similarity(
+            [streamed for _, streamed, _ in resolved],
+            [reference for _, _, reference in resolved]
+        )
+    except StaleFrameError:
+        if len(resolved) == 1:
+            dropped += 1
+            return [], np.empty(0)
+    # Scored one at a time, so only the overwritten frames are dropped.
+    scores = [score_frames([payload]) for payload, _, _ in resolved]
+    return (
+        [payload for kept, _ in scores for payload in kept],
+        np.concatenate([similarities for _, similarities in scores])
+    )
 
 
-def calculate_reward(payload: FrameMessage) -> None:
+def calculate_rewards(payloads: List[FrameMessage]) -> None:
     """
-    Calculate the reward for the given frame, by comparing the
-    streamed frame to the reference frame and subtracting a score
-    for the latency.
+    Calculate the rewards for a batch of frames.
+
+    The streamed and reference frames of the whole batch are
+    scored together, so feature backends run a single forward
+    pass per batch rather than two per frame.
 
     Args:
-        payload (FrameMessage): The message containing all related joined
-        data for the streamed frame, reference frame and latency.
+        payloads (List[FrameMessage]): The messages containing all
+        related joined data for each frame in the batch.
     """
-    streamed_frame = str_to_image(payload.streamed_frame)
-    reference_frame = str_to_image(payload.reference_frame)
-    similarity = cosine_similarity(
-        extract_vgg_features(streamed_frame),
-        extract_vgg_features(reference_frame)
+    global last_report, scored
+    payloads, similarities = score_frames(payloads)
+    if not payloads:
+        return
+    latencies = np.array([payload.latency for payload in payloads])
+    results = (SIM_WEIGHT * similarities) - (LATENCY_WEIGHT * latencies)
+
+    # Buffering the rewards for the 'Results' database collection
+    # and the LOGS_EXCHANGE.
+    writer.add(
+        [
+            Results(
+                frame_number=payload.frame_number,
+                result=float(result)
+            )
+            for payload, result in zip(payloads, results)
+        ],
+        [
+            LogMessage(
+                terminal_message=(
+                    f'reward for {payload.frame_number} is {result}'
+                ),
+                file_message=f'{payload.frame_number}: {result}'
+            )
+            for payload, result in zip(payloads, results)
+        ]
     )
+    # Periodically reports how much inference the cache saves,
+    # and how many frames and results were dropped.
+    scored += len(payloads)
+    report = ', '.join(filter(None, [
+        backend.report(),
+        f'{dropped} frames dropped' if dropped else '',
+        f'{writer.dropped} results dropped' if writer.dropped else ''
+    ]))
+    if report and scored - last_report >= CACHE_REPORT_INTERVAL:
+        last_report = scored
+        writer.add([], [
+            LogMessage(terminal_message=report, file_message=report)
+        ])
+
+
+def reward_worker(index: int) -> None:
+    """
+    Runs a reward worker, consuming from the shared reward queue.
+    Each worker holds at most REWARD_PREFETCH unacknowledged frames.
 
-    # Publishing the reward in the 'Results' database collection.
-    result = (SIM_WEIGHT * similarity) - (LATENCY_WEIGHT * payload.latency)
-    mongo_client.insert_document(
-        Results,
-        Results(
-            frame_number=payload.frame_number,
-            result=result
-        )
+    Args:
+        index (int): The index of the worker in the pool.
+    """
+    setup_worker(REWARD_THREADS)
+    setup_batch_consumer(
+        client=rabbit_mq,
+        subscribe_queue=REWARD_QUEUE,
+        callback=calculate_rewards,
+        expected_format=FrameMessage,
+        size=REWARD_BATCH_SIZE,
+        timeout=REWARD_BATCH_TIMEOUT,
+        prefetch=REWARD_PREFETCH
     )
-    # Publishing the reward in the LOGS_EXCHANGE.
-    rabbit_mq.publish(
-        exchange=LOGS_EXCHANGE,
-        message=LogMessage(
-            terminal_message=f'reward for {payload.frame_number} is {result}',
-            file_message=f'{payload.frame_number}: {result}'
+
+
+def main() -> None:
+    """ Boilerplate for the RabbitMQ consumer """
+    if REWARD_WORKERS > 1:
+        supervise(reward_worker, REWARD_WORKERS)
+    elif REWARD_BATCH_SIZE > 1:
+        reward_worker(0)
+    else:
+        setup_worker(REWARD_THREADS)
+        setup_consumer(
+            client=rabbit_mq,
+            subscribe_queue=REWARD_QUEUE,
+            callback=calculate_reward,
+            expected_format=FrameMessage,
+            manual_ack=True
         )
-    )
 
 
 if __name__ == '__main__':
-    """ Boilerplate for the RabbitMQ consumer """
-    setup_consumer(
-        client=RabbitMQ(),
-        subscribe_queue=REWARD_QUEUE,
-        callback=calculate_reward,
-        expected_format=FrameMessage
-    )
+    """ Runs the consumer """
+    main()
@@ -0,0 +1,75 @@
+import os
+import sys
+from collections import Counter
+from time import monotonic
+from pika.channel import Channel
+from pika.spec import (
+    Basic,
+    BasicProperties,
+)
+from typing import Tuple
+from app.messaging import (
+    RabbitMQ,
+    LogMessage,
+    DEAD_LETTER_QUEUE,
+    LOGS_EXCHANGE,
+    SHED_REPORT_INTERVAL,
+)
+
+rabbit_mq = RabbitMQ()
+# The messages shed, by their queue and the reason.
+shed: Counter[Tuple[str, str]] = Counter()
+last_report = monotonic()
+
+
+def count_shed(
+        ch: Channel,
+        method: Basic.Deliver,
+        properties: BasicProperties,
+        body: bytes
+) -> None:
+    """
+    Counts a dead lettered message, by the queue that shed it
+    and why, reporting the counts every SHED_REPORT_INTERVAL
+    seconds. The message itself is discarded.
+
+    Args:
+        ch (Channel): The channel delivering the message.
+        method (Basic.Deliver): The delivery of the message.
+        properties (BasicProperties): The message's properties.
+        body (bytes): The shed message.
+    """
+    global last_report
+    deaths = (properties.headers or {}).get('x-death') or [{}]
+    # The first death is the most recent.
+    death = deaths[0]
+    shed[(death.get('queue', 'unknown'), death.get('reason', 'unknown'))] += 1
+    if monotonic() - last_report >= SHED_REPORT_INTERVAL:
+        last_report = monotonic()
+        report = 'shed ' + ', '.join(
+            f'{queue} ({reason}): {count}'
+            for (queue, reason), count in sorted(shed.items())
+        )
+        rabbit_mq.publish(
+            LOGS_EXCHANGE,
+            LogMessage(terminal_message=report, file_message=report)
+        )
+
+
+def main() -> None:
+    """ Boilerplate for RabbitMQ consumer """
+    rabbit_mq.declare_queue_exchange(DEAD_LETTER_QUEUE)
+    rabbit_mq.consume(DEAD_LETTER_QUEUE, count_shed)
+    # Stops consuming once program is exited.
+    try:
+        rabbit_mq.channel.start_consuming()
+    except KeyboardInterrupt:
+        try:
+            sys.exit(0)
+        except SystemExit:
+            os._exit(0)
+
+
+if __name__ == '__main__':
+    """ Runs the consumer """
+    main()
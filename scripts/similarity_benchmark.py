@@ -0,0 +1,58 @@
+import numpy as np
+from app.config import (
+    VIDEO_FOLDER,
+    setup_logging,
+    stdout_logging_config,
+)
+from app.utils import (
+    image_to_bytes,
+)
+from app.reward import (
+    BACKENDS,
+    BENCHMARK_FRAMES,
+    BENCHMARK_BATCH,
+    get_backend,
+    sample_frames,
+    rank_correlation,
+    throughput,
+)
+
+# The backend every other backend is compared against.
+BASELINE = 'vgg'
+
+
+if __name__ == '__main__':
+    """
+    Benchmarks every similarity backend on frames sampled from
+    the video folder. Reports the frame pairs scored per second
+    and the rank correlation with the full VGG16 similarity.
+    """
+    logger = setup_logging(stdout_logging_config)
+    streamed, reference = sample_frames(VIDEO_FOLDER, BENCHMARK_FRAMES)
+    # Backends are given the frames encoded, as sent by the emitters.
+    streamed = [image_to_bytes(frame) for frame in streamed]
+    reference = [image_to_bytes(frame) for frame in reference]
+    count = len(streamed)
+    logger.info(f'benchmarking on {count} frame pairs')
+
+    scores = {}
+    rates = {}
+    for name in [BASELINE] + [name for name in BACKENDS if name != BASELINE]:
+        # The cache would hide the cost of scoring repeated frames.
+        backend = get_backend(name, cached=False)
+        results = []
+
+        def score(start: int, end: int) -> None:
+            results.append(backend.similarity(
+                streamed[start:end],
+                reference[start:end]
+            ))
+
+        rates[name] = throughput(score, count, BENCHMARK_BATCH)
+        # The warm up batch is dropped from the scores.
+        scores[name] = np.concatenate(results[1:])
+
+    logger.info(f'{"backend":<16}{"frames/sec":>12}{"rank corr":>12}')
+    for name, rate in rates.items():
+        correlation = rank_correlation(scores[name], scores[BASELINE])
+        logger.info(f'{name:<16}{rate:>12.1f}{correlation:>12.3f}')
@@ -65,7 +65,7 @@ def emit_new_path(payload: DecisionMessage) -> None:
     )
 
 
-if __name__ == '__main__':
+def main() -> None:
     """ Boilerplate for RabbitMQ consumer """
     setup_consumer(
         client=rabbit_mq,
@@ -73,3 +73,8 @@ if __name__ == '__main__':
         callback=emit_new_path,
         expected_format=DecisionMessage,
     )
+
+
+if __name__ == '__main__':
+    """ Runs the consumer """
+    main()
@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import (
+    List,
+    Optional,
+)
+from app.messaging import (
+    RabbitMQ,
+    FlowController,
+    LogMessage,
+    PartialMessage,
+    AGGREGATE_QUEUE,
+    REWARD_QUEUE,
+    FLOW_QUEUES,
+    LOGS_EXCHANGE,
+    PUBLISH_REPORT_INTERVAL,
+)
+from app.database import (
+    MongoDB,
+    Frames,
+    BlobStore,
+    field,
+    BLOB_STORE,
+    BLOB_TTL,
+    get_blob_store,
+)
+from app.utils import (
+    REFERENCE_TAG,
+    StreamJoin,
+    BlobCache,
+    WriteBehind,
+    setup_consumer,
+    split_frame,
+    supervise,
+)
+from app.config import (
+    JOIN_SIZE,
+    JOIN_TTL,
+    JOIN_AUDIT,
+    WRITE_BATCH_SIZE,
+    WRITE_INTERVAL,
+    DEDUP_SIZE,
+    BLOB_CACHE_SIZE,
+)
+
+# The clients are opened by each worker.
+mongo_client: MongoDB = None
+rabbit_mq: RabbitMQ = None
+blob_store: BlobStore = None
+# Pairs the partial frames in memory, in place of the
+# 'frame_sorter' and 'frame_poller' round trip through MongoDB.
+join = StreamJoin(JOIN_SIZE, JOIN_TTL / 1000)
+# Drops whole frames whilst the pipeline is backlogged,
+# under the 'drop' flow policy.
+flow = FlowController()
+# Resolves the frames deduplicated by the emitters. The emitters
+# define each frame in every partition, so the definitions reach
+# this worker before their references.
+frames: BlobCache = None
+# The digests of the frames already written to the blob store,
+# and when they were written.
+persisted: OrderedDict[bytes, float] = OrderedDict()
+# Writes frames to the blob store, off the path of the join.
+blobs: WriteBehind = None
+# Buffers the joined frames for audit, if enabled.
+audit: WriteBehind = None
+# The number of partial frames dropped, as their frames
+# could not be resolved.
+unresolved = 0
+
+
+def resolve_frame(frame: Optional[bytes]) -> Optional[bytes]:
+    """
+    Resolves a frame sent by the emitters to its encoding.
+
+    Frames that are referenced again are written behind to the
+    blob store, so their later references still resolve once
+    they are evicted from the cache. Frames sent once are never
+    written. Frames still referenced are written again before
+    they expire from the blob store.
+
+    Args:
+        frame (Optional[bytes]): The frame, as sent by the emitters.
+
+    Raises:
+        KeyError: If a referenced frame cannot be resolved.
+
+    Returns:
+        Optional[bytes]: The encoded frame.
+    """
+    if frame is None:
+        return None
+    encoded = frames.resolve(frame)
+    if frame[0] != REFERENCE_TAG:
+        return encoded
+    now = monotonic()
+    written = persisted.get(frame[1:])
+    if written is None or now - written > BLOB_TTL / 2:
+        persisted.pop(frame[1:], None)
+        persisted[frame[1:]] = now
+        if len(persisted) > DEDUP_SIZE:
+            persisted.popitem(last=False)
+        blobs.add([(frame[1:], encoded)], [])
+    return encoded
+
+
+def join_frame(payload: PartialMessage) -> None:
+    """
+    Joins a partial frame, publishing the frame to the reward
+    queue once all of its parts have arrived.
+
+    Frames are published resolved, so the reward workers never
+    wait on the blob store. Partial frames are acknowledged once
+    they are held by the join, so the frames pending in the join
+    are lost if the worker stops.
+
+    Args:
+        payload (PartialMessage): The partial frame.
+    """
+    global unresolved
+    try:
+        payload = payload.model_copy(update={
+            'streamed_frame': resolve_frame(payload.streamed_frame),
+            'reference_frame': resolve_frame(payload.reference_frame),
+        })
+    except KeyError:
+        # The other parts of the frame expire in the join.
+        unresolved += 1
+        return
+
+    joined = join.add(payload)
+    if joined is None:
+        return
+    if flow.due():
+        flow.update(max(
+            rabbit_mq.queue_depth(queue)
+            for queue in FLOW_QUEUES
+        ))
+    if flow.admit(joined.frame_number):
+        rabbit_mq.publish_to_queue(REWARD_QUEUE, joined)
+    if audit:
+        streamed, reference = joined.streamed_frame, joined.reference_frame
+        if DEDUP_SIZE:
+            # The audited frames are written to the blob store,
+            # and referenced by the audit documents.
+            streamed, streamed_blob = split_frame(streamed)
+            reference, reference_blob = split_frame(reference)
+            blobs.add(
+                [
+                    (streamed[1:], streamed_blob),
+                    (reference[1:], reference_blob)
+                ],
+                []
+            )
+        audit.add([
+            Frames(
+                frame_number=joined.frame_number,
+                streamed_frame=streamed,
+                reference_frame=reference,
+                frame_latency=joined.latency,
+                parts=Frames.partial_fields
+            )
+        ], [])
+    if join.joined % PUBLISH_REPORT_INTERVAL == 0:
+        report = (
+            f'{join.report()}, {unresolved} unresolved, {flow.report()}'
+        )
+        rabbit_mq.publish(
+            LOGS_EXCHANGE,
+            LogMessage(terminal_message=report, file_message=report)
+        )
+
+
+def audit_frames(documents: List[Frames]) -> None:
+    """
+    Upserts the audited frames by their frame number, so frames
+    joined again after a restart replace their earlier audit.
+
+    Args:
+        documents (List[Frames]): The joined frames.
+    """
+    mongo_client.upsert_documents(
+        Frames,
+        [
+            (
+                {field(Frames, 'frame_number'): document.frame_number},
+                {'$set': document.model_dump(exclude_none=True)}
+            )
+            for document in documents
+        ],
+        ordered=False
+    )
+
+
+def join_worker(index: int) -> None:
+    """
+    Runs a join worker, consuming from its partition of the
+    aggregate queue. Every partial frame of a frame number is
+    routed to the same partition.
+
+    Args:
+        index (int): The index of the partition.
+    """
+    global mongo_client, rabbit_mq, blob_store, frames, blobs, audit
+    mongo_client = MongoDB()
+    rabbit_mq = RabbitMQ()
+    blob_store = get_blob_store(BLOB_STORE, mongo_client)
+    frames = BlobCache(BLOB_CACHE_SIZE * 2 ** 20, blob_store.get)
+    blobs = WriteBehind(
+        mongo_client=mongo_client,
+        rabbit_mq=rabbit_mq,
+        collection=None,
+        exchange=LOGS_EXCHANGE,
+        size=WRITE_BATCH_SIZE,
+        interval=WRITE_INTERVAL / 1000,
+        write=lambda items: blob_store.put_many(dict(items))
+    )
+    if JOIN_AUDIT:
+        audit = WriteBehind(
+            mongo_client=mongo_client,
+            rabbit_mq=rabbit_mq,
+            collection=Frames,
+            exchange=LOGS_EXCHANGE,
+            size=WRITE_BATCH_SIZE,
+            interval=WRITE_INTERVAL / 1000,
+            write=audit_frames
+        )
+    setup_consumer(
+        client=rabbit_mq,
+        subscribe_queue=AGGREGATE_QUEUE.partition(index),
+        callback=join_frame,
+        expected_format=PartialMessage,
+        manual_ack=True
+    )
+
+
+def main() -> None:
+    """ Boilerplate for RabbitMQ consumer """
+    if AGGREGATE_QUEUE.partitions > 1:
+        supervise(join_worker, AGGREGATE_QUEUE.partitions)
+    else:
+        join_worker(0)
+
+
+if __name__ == '__main__':
+    """ Runs the consumer """
+    main()
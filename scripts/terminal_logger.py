@@ -27,7 +27,7 @@ def log_to_terminal(payload: LogMessage) -> None:
     logger.info(payload.terminal_message)
 
 
-if __name__ == '__main__':
+def main() -> None:
     """ Boilerplate for RabbitMQ consumer """
     setup_consumer(
         client=RabbitMQ(),
@@ -35,3 +35,8 @@ if __name__ == '__main__':
         callback=log_to_terminal,
         expected_format=LogMessage
     )
+
+
+if __name__ == '__main__':
+    """ Runs the consumer """
+    main()